@@ -0,0 +1,71 @@
+"""
+Benchmark the surface overlays of the screenshots module.
+
+Renders a screenshot with four panels (two sagittal, one coronal, one axial
+cross-section) of norm.mgz with the lh.white and lh.pial contours of a
+subject, and reports the best total and per-panel time of several runs. The
+volume is loaded once beforehand, such that the time is dominated by the
+intersection of the surfaces with the slices, the chaining of the contours,
+and the rendering.
+
+Usage::
+
+    python benchmarks/bench_screenshots.py <subjects_dir> <subject> [--runs N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from fsqc.createScreenshots import createScreenshots
+from fsqc.fsqcUtils import VolumeCache
+
+VIEWS = [("x", -10), ("x", 10), ("y", 0), ("z", 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("subjects_dir", help="subjects directory")
+    parser.add_argument("subject", help="subject with surf/lh.white, surf/lh.pial")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs")
+    args = parser.parse_args()
+
+    surf_dir = os.path.join(args.subjects_dir, args.subject, "surf")
+
+    volume_cache = VolumeCache()
+    volume_cache.load(os.path.join(args.subjects_dir, args.subject, "mri", "norm.mgz"))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kwargs = dict(
+            SUBJECT=args.subject,
+            SUBJECTS_DIR=args.subjects_dir,
+            OUTFILE=os.path.join(tmp_dir, "screenshot.png"),
+            INTERACTIVE=False,
+            OVERLAY=None,
+            SURF=[
+                os.path.join(surf_dir, "lh.white"),
+                os.path.join(surf_dir, "lh.pial"),
+            ],
+            VIEWS=VIEWS,
+            LAYOUT=(1, len(VIEWS)),
+            VOLUME_CACHE=volume_cache,
+        )
+
+        # warm-up run (imports, font cache)
+        createScreenshots(**kwargs)
+
+        times = list()
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            createScreenshots(**kwargs)
+            times.append(time.perf_counter() - start)
+
+    print(
+        f"best of {args.runs} runs: {min(times):.2f} s total, "
+        f"{min(times) / len(VIEWS):.2f} s per panel"
+    )
+
+
+if __name__ == "__main__":
+    main()
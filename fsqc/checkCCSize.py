@@ -2,10 +2,11 @@
 This module provides a function to check the relative size of the corpus callosum
 
 """
+
 # -----------------------------------------------------------------------------
 
 
-def checkCCSize(subjects_dir, subject):
+def checkCCSize(subjects_dir, subject, read=None):
     """
     Check the relative size of the corpus callosum.
 
@@ -19,6 +20,10 @@ def checkCCSize(subjects_dir, subject):
         The directory containing subject data.
     subject : str
         The name of the subject.
+    read : callable, optional
+        Function that reads an input file, given its path and a reader function
+        (e.g., SubjectContext.read, which keeps the parsed inputs of a
+        subject). By default, the reader function is called directly.
 
     Returns
     -------
@@ -33,7 +38,7 @@ def checkCCSize(subjects_dir, subject):
     import logging
     import os
 
-    import numpy as np
+    from fsqc.fsqcUtils import readAsegStatsFile
 
     # Message
     logging.info("Checking size of the corpus callosum ...")
@@ -41,8 +46,10 @@ def checkCCSize(subjects_dir, subject):
     # Get file name and read contents
     path_stats_file = os.path.join(subjects_dir, subject, "stats", "aseg.stats")
 
-    with open(path_stats_file) as stats_file:
-        aseg_stats = stats_file.read().splitlines()
+    if read is None:
+        aseg_stats = readAsegStatsFile(path_stats_file)
+    else:
+        aseg_stats = read(path_stats_file, readAsegStatsFile)
 
     # Initialize
     cc_elements = [
@@ -53,19 +60,10 @@ def checkCCSize(subjects_dir, subject):
         "CC_Anterior",
     ]
 
-    relative_cc = np.nan
-
-    sum_cc = 0.0
+    # Compute the sum of the cc elements relative to the intracranial volume
+    sum_cc = sum(aseg_stats.structures[cc_element] for cc_element in cc_elements)
 
-    # Loop through the cc elements
-    for cc_segmentation in cc_elements:
-        # Look for the element in the aseg.stats line
-        for aseg_stat_line in aseg_stats:
-            # If the segmentation is found, compute the sum and return it.
-            if cc_segmentation in aseg_stat_line:
-                sum_cc += float(aseg_stat_line.split()[3])
-            elif "EstimatedTotalIntraCranialVol" in aseg_stat_line:
-                intracranial_volume = float(aseg_stat_line.split(",")[3])
+    intracranial_volume = aseg_stats.measures["EstimatedTotalIntraCranialVol"]
 
     relative_cc = sum_cc / intracranial_volume
 
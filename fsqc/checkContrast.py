@@ -4,7 +4,7 @@ This module provides a function to compute the WM/GM contrast SNR.
 
 
 # -----------------------------------------------------------------------------
-def checkContrast(subjects_dir, subject):
+def checkContrast(subjects_dir, subject, read=None):
     """
     Compute the WM/GM contrast SNR.
 
@@ -17,6 +17,10 @@ def checkContrast(subjects_dir, subject):
         The directory containing subject data.
     subject : str
         The name of the subject.
+    read : callable, optional
+        Function that reads an input file, given its path and a reader function
+        (e.g., SubjectContext.read, which keeps the parsed inputs of a
+        subject). By default, the reader function is called directly.
 
     Returns
     -------
@@ -76,11 +80,14 @@ def checkContrast(subjects_dir, subject):
         return numpy.nan
 
     # Get the data from the mgh files
-    con_lh = importMGH(path_pct_lh)
-    con_rh = importMGH(path_pct_rh)
+    def _read(path, reader):
+        return reader(path) if read is None else read(path, reader)
 
-    label_array_lh = nibabel.freesurfer.io.read_label(path_label_cortex_lh)
-    label_array_rh = nibabel.freesurfer.io.read_label(path_label_cortex_rh)
+    con_lh = _read(path_pct_lh, importMGH)
+    con_rh = _read(path_pct_rh, importMGH)
+
+    label_array_lh = _read(path_label_cortex_lh, nibabel.freesurfer.io.read_label)
+    label_array_rh = _read(path_label_cortex_rh, nibabel.freesurfer.io.read_label)
 
     # Only take the values of the cortex to compute the contrast control
     con_lh = numpy.take(con_lh, label_array_lh)
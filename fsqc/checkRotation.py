@@ -5,7 +5,7 @@ This module provides a function to determine rotation angles of the Talairach tr
 # -------------------------------------------------------------------------------------
 
 
-def checkRotation(subjects_dir, subject):
+def checkRotation(subjects_dir, subject, read=None):
     """
     CheckRotation determines rotation angles of the Talairach transform.
 
@@ -15,6 +15,10 @@ def checkRotation(subjects_dir, subject):
         The directory containing subject data.
     subject : str
         The name of the subject.
+    read : callable, optional
+        Function that reads an input file, given its path and a reader function
+        (e.g., SubjectContext.read, which keeps the parsed inputs of a
+        subject). By default, the reader function is called directly.
 
     Returns
     -------
@@ -35,7 +39,6 @@ def checkRotation(subjects_dir, subject):
     import importlib.util
     import logging
     import os
-    import re
     import warnings
 
     import numpy as np
@@ -58,37 +61,16 @@ def checkRotation(subjects_dir, subject):
 
     # read talairach.lta
 
-    if not os.path.isfile(
-        os.path.join(subjects_dir, subject, "mri", "transforms", "talairach.lta")
-    ):
-        warnings.warn(
-            "WARNING: could not open "
-            + os.path.join(subjects_dir, subject, "mri", "transforms", "talairach.lta")
-            + ", returning NaNs."
-        )
-        return np.nan, np.nan, np.nan
-
-    with open(
-        os.path.join(subjects_dir, subject, "mri", "transforms", "talairach.lta"), "r"
-    ) as datafile:
-        lines = datafile.readlines()
+    path_lta = os.path.join(subjects_dir, subject, "mri", "transforms", "talairach.lta")
 
-    # get first four rows with three entries in exp notation
+    if not os.path.isfile(path_lta):
+        warnings.warn("WARNING: could not open " + path_lta + ", returning NaNs.")
+        return np.nan, np.nan, np.nan
 
-    mat = list()
-    for line in lines:
-        res = re.search(
-            "^[\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+",
-            line,
-        )
-        if res is not None:
-            mat.append(
-                [
-                    float(x)
-                    for x in res.group().replace("\n", "").replace(";", "").split()
-                ]
-            )
-    mat = np.array(mat)
+    if read is None:
+        mat = _readTalairach(path_lta)
+    else:
+        mat = read(path_lta, _readTalairach)
 
     # get translation, rotation, scale/zoom, and shear matrices
 
@@ -111,3 +93,47 @@ def checkRotation(subjects_dir, subject):
     )
 
     return rot_x, rot_y, rot_z
+
+
+# -------------------------------------------------------------------------------------
+
+
+def _readTalairach(path_lta):
+    """
+    Read the matrix of the Talairach transform.
+
+    Parameters
+    ----------
+    path_lta : str
+        Path of the talairach.lta file.
+
+    Returns
+    -------
+    mat : numpy.ndarray
+        The 4x4 transformation matrix.
+    """
+    import re
+
+    import numpy as np
+
+    with open(path_lta, "r") as datafile:
+        lines = datafile.readlines()
+
+    # get first four rows with three entries in exp notation
+
+    mat = list()
+    for line in lines:
+        res = re.search(
+            "^[\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+ [\\-0-9]+\\.[0-9]+e[\\-\\+][0-9]+",
+            line,
+        )
+        if res is not None:
+            mat.append(
+                [
+                    float(x)
+                    for x in res.group().replace("\n", "").replace(";", "").split()
+                ]
+            )
+    mat = np.array(mat)
+
+    return mat
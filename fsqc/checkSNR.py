@@ -12,6 +12,7 @@ def checkSNR(
     nb_erode=3,
     ref_image="norm.mgz",
     aparc_image="aparc+aseg.mgz",
+    volume_cache=None,
 ):
     """
     A function to check the SNR of the white and gray matter.
@@ -31,11 +32,15 @@ def checkSNR(
         The name of the subject.
     nb_erode : int, optional
         The number of erosions, default is 3.
-    ref_image : str, optional
+    ref_image : str or list of str, optional
         The reference image, default is "norm.mgz", can be changed to "orig.mgz".
+        If a list of images is given, the SNR is computed for each of them,
+        while the white and gray matter masks are computed only once.
     aparc_image : str, optional
         The aparc+aseg image, default is "aparc+aseg.mgz", can
         be changed to "aparc+aseg.orig.mgz" for FastSurfer output.
+    volume_cache : VolumeCache, optional
+        Cache to load the images from, default is None (read from disk).
 
     Returns
     -------
@@ -44,6 +49,9 @@ def checkSNR(
     gm_snr : float
         The signal-to-noise ratio of the gray matter.
 
+    If ref_image is a list, a list of (wm_snr, gm_snr) tuples is returned
+    instead, one for each reference image.
+
     Notes
     -----
     It requires valid mri/norm.mgz, mri/aseg.mgz, and mri/aparc+aseg.mgz files for
@@ -57,93 +65,89 @@ def checkSNR(
     import os
     import warnings
 
-    import nibabel as nib
     import numpy as np
-    from skimage.morphology import binary_erosion
+
+    from fsqc.fsqcUtils import erodeMask, loadLabelMask, loadVolume
 
     # Settings
 
     logging.captureWarnings(True)
 
-    # Message
+    # Check if a single or multiple reference images are given
 
-    logging.info("Computing white and gray matter SNR for " + ref_image + " ...")
+    single_ref = isinstance(ref_image, str)
+    if single_ref:
+        ref_image = [ref_image]
 
-    # Get data
+    nan_result = (np.nan, np.nan) if single_ref else [(np.nan, np.nan)] * len(ref_image)
 
-    path_reference_image = os.path.join(subjects_dir, subject, "mri", ref_image)
-    if os.path.exists(path_reference_image):
-        norm = nib.load(path_reference_image)
-        norm_data = norm.get_fdata()
-    else:
-        warnings.warn(
-            "WARNING: could not open " + path_reference_image + ", returning NaNs."
-        )
-        return np.nan, np.nan
+    # The following keys represent the white matter labels in the aparc+aseg image
+    wm_labels = [2, 41, 7, 46, 251, 252, 253, 254, 255, 77, 78, 79]
 
+    # The following keys represent the gray matter labels in the aseg image
+    gm_labels = [3, 42]
+
+    # Create binary masks of the white and gray matter; these are computed
+    # once and shared by all reference images
     path_aseg = os.path.join(subjects_dir, subject, "mri", "aseg.mgz")
     if os.path.exists(path_aseg):
-        aseg = nib.load(path_aseg)
-        data_aseg = aseg.get_fdata()
+        b_gm_data = loadLabelMask(path_aseg, gm_labels, volume_cache=volume_cache)
     else:
         warnings.warn("WARNING: could not open " + path_aseg + ", returning NaNs.")
-        return np.nan, np.nan
+        return nan_result
 
     path_aparc_aseg = os.path.join(subjects_dir, subject, "mri", aparc_image)
     if os.path.exists(path_aparc_aseg):
-        inseg = nib.load(path_aparc_aseg)
-        data_aparc_aseg = inseg.get_fdata()
+        b_wm_data = loadLabelMask(path_aparc_aseg, wm_labels, volume_cache=volume_cache)
     else:
         warnings.warn(
             "WARNING: could not open " + path_aparc_aseg + ", returning NaNs."
         )
-        return np.nan, np.nan
-
-    # Process white matter image
+        return nan_result
 
-    # Create 3D binary data where the white matter locations are encoded with 1, all the others with zero
-    b_wm_data = np.zeros(norm.shape)
+    # Erode white matter image
+    b_wm_data = erodeMask(b_wm_data, nb_erode)
 
-    # The following keys represent the white matter labels in the aparc+aseg image
-    wm_labels = [2, 41, 7, 46, 251, 252, 253, 254, 255, 77, 78, 79]
+    # Compute the SNR for each reference image
 
-    # Find the wm labels in the aparc+aseg image and set the locations in the binary image to one
-    for i in wm_labels:
-        x, y, z = np.where(data_aparc_aseg == i)
-        b_wm_data[x, y, z] = 1
+    snr = list()
 
-    # Erode white matter image
-    nb_erode = nb_erode
-    b_wm_data = binary_erosion(b_wm_data, np.ones((nb_erode, nb_erode, nb_erode)))
+    for ref_image_i in ref_image:
+        # Message
 
-    # Computation of the SNR of the white matter
-    x, y, z = np.where(b_wm_data == 1)
-    signal_wm = norm_data[x, y, z]
-    signal_wm_mean = np.mean(signal_wm)
-    signal_wm_std = np.std(signal_wm)
-    wm_snr = signal_wm_mean / signal_wm_std
-    logging.info("White matter signal to noise ratio: " + "{:.4}".format(wm_snr))
+        logging.info("Computing white and gray matter SNR for " + ref_image_i + " ...")
 
-    # Process gray matter image
+        # Get data
 
-    # Create 3D binary data where the gray matter locations are encoded with 1, all the others with zero
-    b_gm_data = np.zeros(norm.shape)
+        path_reference_image = os.path.join(subjects_dir, subject, "mri", ref_image_i)
+        if os.path.exists(path_reference_image):
+            norm, norm_data = loadVolume(
+                path_reference_image, volume_cache=volume_cache
+            )
+        else:
+            warnings.warn(
+                "WARNING: could not open " + path_reference_image + ", returning NaNs."
+            )
+            snr.append((np.nan, np.nan))
+            continue
 
-    # The following keys represent the gray matter labels in the aseg image
-    gm_labels = [3, 42]
+        # Computation of the SNR of the white matter
+        signal_wm = norm_data[b_wm_data]
+        signal_wm_mean = np.mean(signal_wm, dtype=np.float64)
+        signal_wm_std = np.std(signal_wm, dtype=np.float64)
+        wm_snr = signal_wm_mean / signal_wm_std
+        logging.info("White matter signal to noise ratio: " + "{:.4}".format(wm_snr))
 
-    # Find the gm labels in the aseg image and set the locations in the binary image to one
-    for i in gm_labels:
-        x, y, z = np.where(data_aseg == i)
-        b_gm_data[x, y, z] = 1
+        # Computation of the SNR of the gray matter
+        signal_gm = norm_data[b_gm_data]
+        signal_gm_mean = np.mean(signal_gm, dtype=np.float64)
+        signal_gm_std = np.std(signal_gm, dtype=np.float64)
+        gm_snr = signal_gm_mean / signal_gm_std
+        logging.info("Gray matter signal to noise ratio: " + "{:.4}".format(gm_snr))
 
-    # Computation of the SNR of the gray matter
-    x, y, z = np.where(b_gm_data == 1)
-    signal_gm = norm_data[x, y, z]
-    signal_gm_mean = np.mean(signal_gm)
-    signal_gm_std = np.std(signal_gm)
-    gm_snr = signal_gm_mean / signal_gm_std
-    logging.info("Gray matter signal to noise ratio: " + "{:.4}".format(gm_snr))
+        snr.append((wm_snr, gm_snr))
 
     # Return
-    return wm_snr, gm_snr
+    if single_ref:
+        return snr[0]
+    return snr
@@ -6,7 +6,7 @@ This module provides a function to check the topology of left and right surfaces
 # -----------------------------------------------------------------------------
 
 
-def checkTopology(subjects_dir, subject):
+def checkTopology(subjects_dir, subject, read=None):
     """
     Check the topology of left and right surfaces.
 
@@ -19,6 +19,10 @@ def checkTopology(subjects_dir, subject):
         The directory containing subject data.
     subject : str
         The name of the subject.
+    read : callable, optional
+        Function that reads the logfile, given its path and a reader function
+        (e.g., SubjectContext.read, which keeps the parsed inputs of a
+        subject). By default, the reader function is called directly.
 
     Returns
     -------
@@ -38,7 +42,15 @@ def checkTopology(subjects_dir, subject):
     Notes
     -----
     Requires a valid scripts/recon-all.log file. If not found, NaNs will be
-    returned.
+    returned. If recon-all was run several times, the values are taken from
+    the last run that contains all of them. If no run contains all values,
+    each measure is taken from the last run that contains it, such that the
+    left and right hemisphere values of a measure come from the same run.
+    The number of defects and the fixing time are attributed to a hemisphere
+    by the '#@# Fix Topology lh|rh' sections of the logfile; if there are no
+    such sections, the last two values of a run are taken as the left and
+    right hemisphere values, and a single value is returned as NaN since its
+    hemisphere is unknown.
     """
     # Imports
 
@@ -60,67 +72,180 @@ def checkTopology(subjects_dir, subject):
 
     path_log_file = os.path.join(subjects_dir, subject, "scripts", "recon-all.log")
 
-    if os.path.exists(path_log_file):
-        with open(path_log_file, "r") as logfile:
-            lines_log_file = logfile.read().splitlines()
-    else:
+    if not os.path.exists(path_log_file):
         warnings.warn("WARNING: could not find " + path_log_file + ", returning NaNs.")
         return np.nan, np.nan, np.nan, np.nan, np.nan, np.nan
 
-    # Initialize
-
-    lh_holes = np.nan
-    rh_holes = np.nan
-    lh_defects = np.nan
-    rh_defects = np.nan
-    topo_time_lh = np.nan
-    topo_time_rh = np.nan
-
-    # Extract info from logfile
-
-    foundDefectsLH = False
-    foundTopoLH = False
-
-    for line_log_file in lines_log_file:
-        # Look for the number of holes in the left and right hemisphere
-        if "orig.nofix lhholes" in line_log_file:
-            lh_holes = line_log_file.split()[3]
-            lh_holes = lh_holes[:-1]
-            lh_holes = int(lh_holes)
-            rh_holes = line_log_file.split()[6]
-            logging.info("Number of holes in the left hemisphere: " + str(lh_holes))
-            logging.info("Number of holes in the right hemisphere: " + str(rh_holes))
-
-        # Look for the number of defects
-        if "defects found" in line_log_file and foundDefectsLH is False:
-            lh_defects = line_log_file.split()[0]
-            lh_defects = int(lh_defects)
-            logging.info("Number of defects in the left hemisphere: " + str(lh_defects))
-            foundDefectsLH = True
-        elif "defects found" in line_log_file and foundDefectsLH is True:
-            rh_defects = line_log_file.split()[0]
-            rh_defects = int(rh_defects)
-            logging.info(
-                "Number of defects in the right hemisphere: " + str(rh_defects)
-            )
-
-        # Look for the topological fixing time in the log file
-        if "topology fixing took" in line_log_file and foundTopoLH is False:
-            topo_time_lh = line_log_file.split()[3]
-            logging.info(
-                "Topological fixing time for the left hemisphere: "
-                + str(topo_time_lh)
-                + " min"
-            )
-            foundTopoLH = True
-        elif "topology fixing took" in line_log_file and foundTopoLH is True:
-            topo_time_rh = line_log_file.split()[3]
-            logging.info(
-                "Topological fixing time for the right hemisphere: "
-                + str(topo_time_rh)
-                + " min"
-            )
+    if read is None:
+        holes, defects, topo = _readReconAllLog(path_log_file)
+    else:
+        holes, defects, topo = read(path_log_file, _readReconAllLog)
+
+    lh_holes, rh_holes = holes
+    lh_defects, rh_defects = defects
+    topo_time_lh, topo_time_rh = topo
+
+    logging.info("Number of holes in the left hemisphere: " + str(lh_holes))
+    logging.info("Number of holes in the right hemisphere: " + str(rh_holes))
+    logging.info("Number of defects in the left hemisphere: " + str(lh_defects))
+    logging.info("Number of defects in the right hemisphere: " + str(rh_defects))
+    logging.info(
+        "Topological fixing time for the left hemisphere: " + str(topo_time_lh) + " min"
+    )
+    logging.info(
+        "Topological fixing time for the right hemisphere: "
+        + str(topo_time_rh)
+        + " min"
+    )
 
     # Return
 
     return lh_holes, rh_holes, lh_defects, rh_defects, topo_time_lh, topo_time_rh
+
+
+# -----------------------------------------------------------------------------
+
+
+def _readReconAllLog(path_log_file):
+    """
+    Extract the topology measures from a recon-all.log file.
+
+    Parameters
+    ----------
+    path_log_file : str
+        Path of the logfile.
+
+    Returns
+    -------
+    holes : list
+        Number of holes in the left and right hemisphere.
+    defects : list
+        Number of defects in the left and right hemisphere.
+    topo : list
+        Topological fixing time for the left and right hemisphere.
+
+    Notes
+    -----
+    Missing values are NaN, see checkTopology().
+    """
+    import mmap
+    import os
+    import re
+
+    import numpy as np
+
+    # A single pattern for the lines with the number of holes, the number of
+    # defects, and the topological fixing time; these lines are located with
+    # a fast substring search, and then parsed with the pattern
+
+    markers = [b"orig.nofix lhholes", b"defects found", b"topology fixing took"]
+
+    pattern = re.compile(
+        rb"orig\.nofix lhholes\s*=\s*(?P<lh_holes>-?\d+),\s*rhholes\s*=\s*(?P<rh_holes>-?\d+)"
+        rb"|^\s*(?P<defects>\d+)\s.*defects found"
+        rb"|topology fixing took\s+(?P<topo>[0-9.eE+-]+)"
+    )
+
+    def _rscan(log, marker, start, end):
+        # yield the positions and matches of the lines with a marker within a
+        # part of the logfile, searching backwards
+        while True:
+            pos = log.rfind(marker, start, end)
+            if pos < 0:
+                return
+            line_start = log.rfind(b"\n", 0, pos) + 1
+            line_end = log.find(b"\n", pos)
+            match = pattern.search(
+                log[line_start : len(log) if line_end < 0 else line_end]
+            )
+            if match is not None:
+                yield pos, match
+            end = pos
+
+    def _hemisphere(log, start, pos):
+        # hemisphere of the "#@# Fix Topology" section that contains a line
+        header = log.rfind(b"#@# Fix Topology ", start, pos)
+        if header < 0:
+            return None
+        hemi = log[header + 17 : header + 19]
+        return hemi.decode() if hemi in (b"lh", b"rh") else None
+
+    def _hemispheres(log, marker, group, cast, start, end):
+        # values of the left and right hemisphere within a part of the
+        # logfile; lines are attributed to the hemisphere of their section,
+        # or, if there are no sections, the last two lines are taken as the
+        # left and right hemisphere, and a single line is ambiguous
+        values = dict()
+        unattributed = list()
+        for pos, match in _rscan(log, marker, start, end):
+            hemi = _hemisphere(log, start, pos)
+            if hemi is None:
+                unattributed.insert(0, cast(match.group(group)))
+                if len(unattributed) == 2:
+                    break
+            else:
+                values.setdefault(hemi, cast(match.group(group)))
+                if len(values) == 2:
+                    break
+        if not values and len(unattributed) == 2:
+            values = {"lh": unattributed[0], "rh": unattributed[1]}
+        return [values.get("lh", np.nan), values.get("rh", np.nan)]
+
+    def _scan(log, start, end):
+        # extract the values from a part of the logfile
+        holes = next(_rscan(log, markers[0], start, end), None)
+        holes = (
+            [int(holes[1].group("lh_holes")), int(holes[1].group("rh_holes"))]
+            if holes is not None
+            else [np.nan, np.nan]
+        )
+        defects = _hemispheres(log, markers[1], "defects", int, start, end)
+        topo = _hemispheres(log, markers[2], "topo", float, start, end)
+        return holes, defects, topo
+
+    def _complete(values):
+        return not np.isnan(values).any()
+
+    # Extract info from logfile. The logfile is memory-mapped rather than read
+    # into memory, and searched from the end, such that earlier parts of long
+    # logfiles are not read at all. If recon-all was run several times, the
+    # last run that contains all values is used. If there is no such run,
+    # each measure is taken from the last run that contains it for both
+    # hemispheres, or else from the last run that contains it for one
+    # hemisphere; the left and right hemisphere values of a measure are thus
+    # never taken from different runs.
+
+    with open(path_log_file, "rb") as logfile:
+        if os.fstat(logfile.fileno()).st_size == 0:
+            log = b""
+        else:
+            log = mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # scans of the runs, starting with the last one
+        scans = list()
+        end = len(log)
+        while True:
+            start = max(log.rfind(b"New invocation of recon-all", 0, end), 0)
+            scans.append(_scan(log, start, end))
+            if all(_complete(values) for values in scans[-1]) or start == 0:
+                break
+            end = start
+
+        if isinstance(log, mmap.mmap):
+            log.close()
+
+    if all(_complete(values) for values in scans[-1]):
+        holes, defects, topo = scans[-1]
+    else:
+        holes, defects, topo = [
+            next(
+                (scan[k] for scan in scans if _complete(scan[k])),
+                next(
+                    (scan[k] for scan in scans if not np.isnan(scan[k]).all()),
+                    [np.nan, np.nan],
+                ),
+            )
+            for k in range(3)
+        ]
+
+    return holes, defects, topo
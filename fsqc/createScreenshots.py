@@ -22,6 +22,7 @@ def createScreenshots(
     YLIM=None,
     BINARIZE=False,
     ORIENTATION=["radiological"],
+    VOLUME_CACHE=None,
 ):
     """
     Function to create screenshots.
@@ -58,6 +59,8 @@ def createScreenshots(
         Flag for binarization, default is False.
     ORIENTATION : list, optional
         The orientation, default is ["radiological"].
+    VOLUME_CACHE : VolumeCache, optional
+        Cache to load the images from, default is None (read from disk).
 
     Notes
     -----
@@ -86,18 +89,19 @@ def createScreenshots(
 
     import logging
     import os
-    import warnings
 
     import matplotlib
     import nibabel as nb
     import numpy as np
-
-    if not INTERACTIVE:
-        matplotlib.use("Agg")
-
-    from matplotlib import pyplot as plt
-
-    from fsqc.fsqcUtils import levelsetsTria, returnFreeSurferColorLUT
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    from fsqc.fsqcUtils import (
+        levelsetsChain,
+        levelsetsTria,
+        loadVolume,
+        returnFreeSurferColorLUT,
+    )
 
     # -----------------------------------------------------------------------------
     # settings
@@ -116,16 +120,22 @@ def createScreenshots(
     # import image data
 
     if BASE == ["default"]:
-        norm = nb.load(os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "norm.mgz"))
+        norm, normData = loadVolume(
+            os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "norm.mgz"),
+            volume_cache=VOLUME_CACHE,
+        )
     else:
-        norm = nb.load(BASE[0])
+        norm, normData = loadVolume(BASE[0], volume_cache=VOLUME_CACHE)
 
     if OVERLAY is None:
         aseg = None
     elif OVERLAY == ["default"]:
-        aseg = nb.load(os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "aseg.mgz"))
+        aseg, asegData = loadVolume(
+            os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "aseg.mgz"),
+            volume_cache=VOLUME_CACHE,
+        )
     else:
-        aseg = nb.load(OVERLAY[0])
+        aseg, asegData = loadVolume(OVERLAY[0], volume_cache=VOLUME_CACHE)
 
     # -----------------------------------------------------------------------------
     # import surface data
@@ -214,7 +224,8 @@ def createScreenshots(
     if VIEWS == ["default"]:
         CutsRRAS = [("x", -10), ("x", 10), ("y", 0), ("z", 0)]
     else:
-        CutsRRAS = VIEWS
+        # copy, since the cut values may be adjusted below
+        CutsRRAS = list(VIEWS)
 
     # -----------------------------------------------------------------------------
     # check if the chosen VIEWS are feasible. If not feasible changing to the nearest feasible values
@@ -222,16 +233,19 @@ def createScreenshots(
     m = norm.header.get_vox2ras_tkr()
     n = norm.header.get_data_shape()
 
-    xyzIdx = np.array(
-        np.meshgrid(
-            np.linspace(0, n[0] - 1, n[0]),
-            np.linspace(0, n[1] - 1, n[1]),
-            np.linspace(0, n[2] - 1, n[2]),
-        )
-    )
-    xyzIdxFlat3 = np.reshape(xyzIdx, (3, np.prod(n))).transpose()
-    xyzIdxFlat4 = np.hstack((xyzIdxFlat3, np.ones((np.prod(n), 1))))
-    rasIdxFlat3 = np.matmul(m, xyzIdxFlat4.transpose()).transpose()[:, 0:3]
+    # the vox2ras-tkr matrix only permutes and scales the voxel axes, so each
+    # RAS axis corresponds to a single voxel axis, and the RAS coordinates of
+    # the voxel planes along that axis can be computed directly, i.e. without
+    # setting up a grid of coordinates for the whole volume
+
+    # RAS coordinates of the first and the last voxel, used for the extent
+    rasIdxCorners = np.matmul(
+        m, np.array([[0, 0, 0, 1], [n[0] - 1, n[1] - 1, n[2] - 1, 1]]).transpose()
+    ).transpose()[:, 0:3]
+
+    # voxel axis and voxel index of each cut
+    CutsVoxAxis = list()
+    CutsVoxIdx = list()
 
     for i, icr in enumerate(CutsRRAS):
         if icr[0] == "x":
@@ -241,10 +255,22 @@ def createScreenshots(
         elif icr[0] == "z":
             iDim = 2
 
-        if not np.any(rasIdxFlat3[:, iDim] == icr[1]):
-            closestCutValue = rasIdxFlat3[
-                np.abs(rasIdxFlat3[:, iDim] - icr[1]).argmin(), iDim
-            ]
+        voxAxis = np.flatnonzero(np.abs(m[iDim, 0:3]) > tol)
+        if len(voxAxis) != 1:
+            raise ValueError(
+                "ERROR: cannot create screenshots for images whose voxel axes "
+                "are not aligned with the RAS axes"
+            )
+        voxAxis = voxAxis[0]
+
+        rasCoords = m[iDim, voxAxis] * np.arange(n[voxAxis]) + m[iDim, 3]
+        voxIdx = np.abs(rasCoords - icr[1]).argmin()
+
+        CutsVoxAxis.append(voxAxis)
+        CutsVoxIdx.append(voxIdx)
+
+        if not np.any(rasCoords == icr[1]):
+            closestCutValue = rasCoords[voxIdx]
             logging.info(
                 f"INFO: the VIEW {icr} will be changed to ('{icr[0]}', {closestCutValue:.2f}) so it is not"
                 " necessary to interpolate volumetric data"
@@ -258,52 +284,33 @@ def createScreenshots(
 
     # will not run if surf is empty (intended)
     for s in range(len(surf)):
-        sLVL = list()
-
-        for i in range(len(CutsRRAS)):
-            # determine dimension
-            if CutsRRAS[i][0] == "x":
-                iDim = 0
-            elif CutsRRAS[i][0] == "y":
-                iDim = 1
-            elif CutsRRAS[i][0] == "z":
-                iDim = 2
-
-            # compute levelsets: e.g., LVL[SURF][VIEWS][vLVL|tLVL|iLVL][0][elementDim1][elementDim2]
-            sLVL.append(
-                levelsetsTria(
-                    surf[s][0], surf[s][1], surf[s][0][:, iDim], CutsRRAS[i][1]
-                )
+        sLVL = [None] * len(CutsRRAS)
+
+        # compute levelsets for all cuts along the same dimension at once
+        for iDim, iDimName in enumerate(["x", "y", "z"]):
+            cutIdx = [i for i in range(len(CutsRRAS)) if CutsRRAS[i][0] == iDimName]
+
+            if len(cutIdx) == 0:
+                continue
+
+            vLVL, lLVL, iLVL = levelsetsTria(
+                surf[s][0],
+                surf[s][1],
+                surf[s][0][:, iDim],
+                [np.asarray(CutsRRAS[i][1]).item() for i in cutIdx],
             )
 
+            # store levelsets: e.g., LVL[SURF][VIEWS][vLVL|tLVL|iLVL][0][elementDim1][elementDim2]
+            for k, i in enumerate(cutIdx):
+                sLVL[i] = ([vLVL[k]], [lLVL[k]], [iLVL[k]])
+
         LVL.append(sLVL)
 
     # -----------------------------------------------------------------------------
     # get data for norm
 
-    normData = norm.get_fdata()
-
     normVals = normData
 
-    # -----------------------------------------------------------------------------
-    # get data for aseg and change to enumerated aseg so that it can be used as
-    # index to lutMap
-
-    if aseg is not None:
-        asegData = aseg.get_fdata()
-
-        if LABELS is not None:
-            asegData = asegData * np.isin(asegData, LABELS)
-
-        if BINARIZE is True:
-            asegData = (asegData > 0).astype(int)
-
-        asegUnique, asegIdx = np.unique(asegData, return_inverse=True)
-
-        asegEnum = np.array([lutEnum[x] for x in asegUnique])
-
-        asegVals = np.reshape(asegEnum[asegIdx], (aseg.shape))
-
     # -----------------------------------------------------------------------------
     # compile image data for plotting
 
@@ -319,57 +326,44 @@ def createScreenshots(
     # x_S y_S z_S c_S
     #   0   0   0   1
 
-    # m = norm.header.get_vox2ras_tkr()
-    # n = norm.header.get_data_shape()
-
-    # xyzIdx = np.array(np.meshgrid(np.linspace(0, n[0] - 1, n[0]), np.linspace(0, n[1] - 1, n[1]), np.linspace(0, n[2] - 1, n[2])))
-    # xyzIdxFlat3 = np.reshape(xyzIdx, (3, np.prod(n))).transpose()
-    # xyzIdxFlat4 = np.hstack((xyzIdxFlat3, np.ones((np.prod(n), 1))))
-    # rasIdxFlat3 = np.matmul(m, xyzIdxFlat4.transpose()).transpose()[:, 0:3]
-
     normValsRAS = list()
     if aseg is not None:
         asegValsRAS = list()
 
     for i in range(len(CutsRRAS)):
-        # determine dimension
-        if CutsRRAS[i][0] == "x":
-            iDim = 0
-        elif CutsRRAS[i][0] == "y":
-            iDim = 1
-        elif CutsRRAS[i][0] == "z":
-            iDim = 2
+        # select the voxel plane of the cut
+        sel = [slice(None), slice(None), slice(None)]
+        sel[CutsVoxAxis[i]] = slice(CutsVoxIdx[i], CutsVoxIdx[i] + 1)
+        sel = tuple(sel)
 
-        sel = np.array(
-            xyzIdxFlat3[rasIdxFlat3[:, iDim] == CutsRRAS[i][1], :], dtype="int"
-        )
-        normValsRAS.append(
-            np.squeeze(
-                normVals[
-                    np.min(sel[:, 0]) : np.max(sel[:, 0]) + 1,
-                    np.min(sel[:, 1]) : np.max(sel[:, 1]) + 1,
-                    np.min(sel[:, 2]) : np.max(sel[:, 2]) + 1,
-                ]
-            )
-        )
+        normValsRAS.append(np.squeeze(normVals[sel]))
         if aseg is not None:
-            asegValsRAS.append(
-                np.squeeze(
-                    asegVals[
-                        np.min(sel[:, 0]) : np.max(sel[:, 0]) + 1,
-                        np.min(sel[:, 1]) : np.max(sel[:, 1]) + 1,
-                        np.min(sel[:, 2]) : np.max(sel[:, 2]) + 1,
-                    ]
-                )
-            )
+            asegValsRAS.append(np.squeeze(asegData[sel]))
 
     # -----------------------------------------------------------------------------
-    # plotting: create a new figure, plot into it, then close it so it never gets
-    # displayed
+    # get data for aseg and change to enumerated aseg so that it can be used as
+    # index to lutMap; this is done for the selected slices only
 
-    # turn interactive plotting off unless interactive
-    if not INTERACTIVE:
-        plt.ioff()
+    if aseg is not None:
+        for i in range(len(asegValsRAS)):
+            asegSlice = asegValsRAS[i]
+
+            if LABELS is not None:
+                asegSlice = asegSlice * np.isin(asegSlice, LABELS)
+
+            if BINARIZE is True:
+                asegSlice = (asegSlice > 0).astype(int)
+
+            asegUnique, asegIdx = np.unique(asegSlice, return_inverse=True)
+
+            asegEnum = np.array([lutEnum[x] for x in asegUnique])
+
+            asegValsRAS[i] = np.reshape(asegEnum[asegIdx], asegSlice.shape)
+
+    # -----------------------------------------------------------------------------
+    # plotting: unless interactive, create a standalone figure that is not
+    # managed by pyplot, such that it never gets displayed and screenshots can
+    # be created concurrently in several threads
 
     # compute layout
     if LAYOUT is None:
@@ -384,7 +378,13 @@ def createScreenshots(
             myLayoutList.append((axsx, axsy))
 
     # create subplots
-    fig, axs = plt.subplots(myLayout[0], myLayout[1])
+    if INTERACTIVE:
+        from matplotlib import pyplot as plt
+
+        fig = plt.figure()
+    else:
+        fig = Figure()
+    axs = fig.subplots(myLayout[0], myLayout[1])
     axs = np.reshape(axs, myLayout)
 
     # adjust layout
@@ -409,10 +409,10 @@ def createScreenshots(
             dims = (1, 2)
             # determine extent
             extent = (
-                rasIdxFlat3[0, dims[0]],
-                rasIdxFlat3[-1, dims[0]],
-                rasIdxFlat3[0, dims[1]],
-                rasIdxFlat3[-1, dims[1]],
+                rasIdxCorners[0, dims[0]],
+                rasIdxCorners[-1, dims[0]],
+                rasIdxCorners[0, dims[1]],
+                rasIdxCorners[-1, dims[1]],
             )
             # imshow puts the first dimension (rows) of the data on the y axis, and the second (columns) on the x axis
             cor = np.where(m[dims[0], 0:3])[0]
@@ -454,10 +454,10 @@ def createScreenshots(
             dims = (0, 2)
             # determine extent
             extent = (
-                rasIdxFlat3[0, dims[0]],
-                rasIdxFlat3[-1, dims[0]],
-                rasIdxFlat3[0, dims[1]],
-                rasIdxFlat3[-1, dims[1]],
+                rasIdxCorners[0, dims[0]],
+                rasIdxCorners[-1, dims[0]],
+                rasIdxCorners[0, dims[1]],
+                rasIdxCorners[-1, dims[1]],
             )
             # imshow puts the first dimension (rows) of the data on the y axis, and the second (columns) on the x axis
             sag = np.where(m[dims[0], 0:3])[0]
@@ -499,10 +499,10 @@ def createScreenshots(
             dims = (0, 1)
             # determine extent
             extent = (
-                rasIdxFlat3[0, dims[0]],
-                rasIdxFlat3[-1, dims[0]],
-                rasIdxFlat3[0, dims[1]],
-                rasIdxFlat3[-1, dims[1]],
+                rasIdxCorners[0, dims[0]],
+                rasIdxCorners[-1, dims[0]],
+                rasIdxCorners[0, dims[1]],
+                rasIdxCorners[-1, dims[1]],
             )
             # imshow puts the first dimension (rows) of the data on the y axis, and the second (columns) on the x axis
             sag = np.where(m[dims[0], 0:3])[0]
@@ -540,9 +540,9 @@ def createScreenshots(
                     )
 
         # prepare plot
-        if rasIdxFlat3[0, dims[0]] > rasIdxFlat3[-1, dims[0]]:
+        if rasIdxCorners[0, dims[0]] > rasIdxCorners[-1, dims[0]]:
             axs[axsx, axsy].invert_xaxis()
-        if rasIdxFlat3[0, dims[1]] > rasIdxFlat3[-1, dims[1]]:
+        if rasIdxCorners[0, dims[1]] > rasIdxCorners[-1, dims[1]]:
             axs[axsx, axsy].invert_yaxis()
 
         axs[axsx, axsy].set_axis_off()
@@ -559,141 +559,27 @@ def createScreenshots(
             if CutsRRAS[p][0] == "y" or CutsRRAS[p][0] == "z":
                 axs[axsx, axsy].invert_xaxis()
 
-        # now plot
+        # now plot: link the line segments of each levelset into polylines,
+        # and draw all polylines of a surface as a single collection
         for s in range(len(surf)):
             if len(LVL[s][p][0][0]) > 0:
-                logging.info("Surface " + str(s))
-
-                # create array of line segments
-                tmpx = list()
-                tmpy = list()
-
-                for i in range(len(LVL[s][p][1][0])):
-                    tmpx.append(
-                        (
-                            LVL[s][p][0][0][LVL[s][p][1][0][i][0] - 1][dims[0]],
-                            LVL[s][p][0][0][LVL[s][p][1][0][i][1] - 1][dims[0]],
-                        )
-                    )
-                    tmpy.append(
-                        (
-                            LVL[s][p][0][0][LVL[s][p][1][0][i][0] - 1][dims[1]],
-                            LVL[s][p][0][0][LVL[s][p][1][0][i][1] - 1][dims[1]],
-                        )
-                    )
+                vxy = np.array(LVL[s][p][0][0])[:, dims]
 
-                tmpx = np.array(tmpx)
-                tmpy = np.array(tmpy)
+                lines = [vxy[idx, :] for idx in levelsetsChain(LVL[s][p][1][0])]
 
-                # remove duplicate points
-                tmpxy = np.unique(np.concatenate((tmpx, tmpy), axis=1), axis=0)
-                tmpx = tmpxy[:, 0:2]
-                tmpy = tmpxy[:, 2:4]
-
-                # remove segments which are de-facto points
-                tmpIdx = np.logical_or(
-                    np.abs(tmpx[:, 0] - tmpx[:, 1]) > tol,
-                    np.abs(tmpy[:, 0] - tmpy[:, 1]) > tol,
-                )
-                tmpx = tmpx[tmpIdx, :]
-                tmpy = tmpy[tmpIdx, :]
-
-                # need to order array of line segments; whenever we encounter a
-                # closed loop, we will already plot; otherwise, plot in the end
-                sortIdx = np.array(range(0, len(tmpx)))
-
-                tmpxSort = np.array(tmpx[sortIdx[0],], ndmin=2)
-                tmpySort = np.array(tmpy[sortIdx[0],], ndmin=2)
-
-                sortIdx = np.delete(sortIdx, sortIdx[0])
-
-                while len(sortIdx) > 1:
-                    findIdx = np.array(
-                        np.where(
-                            np.logical_and(
-                                np.abs(
-                                    tmpx[sortIdx,] - tmpxSort[tmpxSort.shape[0] - 1, 1]
-                                )
-                                < tol,
-                                np.abs(
-                                    tmpy[sortIdx,] - tmpySort[tmpySort.shape[0] - 1, 1]
-                                )
-                                < tol,
-                            )
-                        ),
-                        ndmin=2,
-                    ).T
-
-                    # delete existing finds
-                    findIdxKeep = list()
-                    for k in range(findIdx.shape[0]):
-                        if not np.any(
-                            np.all(
-                                np.logical_or(
-                                    tmpx[sortIdx[findIdx[k, 0]], 0] == tmpxSort,
-                                    tmpx[sortIdx[findIdx[k, 0]], 1] == tmpxSort,
-                                ),
-                                axis=1,
-                            )
-                        ):
-                            findIdxKeep.append(k)
-                    findIdx = findIdx[findIdxKeep,]
-
-                    if findIdx.shape[0] == 0:
-                        # close loop and plot already
-                        axs[axsx, axsy].plot(
-                            tmpxSort,
-                            tmpySort,
-                            color=surfcolor[s],
-                            linewidth=np.round(FIGSIZE / 8),
-                        )
-                        # reset (start new loop)
-                        tmpxSort = np.array(tmpx[sortIdx[0],], ndmin=2)
-                        tmpySort = np.array(tmpy[sortIdx[0],], ndmin=2)
-                        sortIdx = np.delete(sortIdx, 0)
-                    elif findIdx.shape[0] == 1:
-                        # add to current set
-                        if findIdx[0, 1] == 0:
-                            tmpxSort = np.append(
-                                tmpxSort,
-                                np.array(tmpx[sortIdx[findIdx[0, 0]], ::1], ndmin=2),
-                                axis=0,
-                            )
-                            tmpySort = np.append(
-                                tmpySort,
-                                np.array(tmpy[sortIdx[findIdx[0, 0]], ::1], ndmin=2),
-                                axis=0,
-                            )
-                        elif findIdx[0, 1] == 1:
-                            tmpxSort = np.append(
-                                tmpxSort,
-                                np.array(tmpx[sortIdx[findIdx[0, 0]], ::-1], ndmin=2),
-                                axis=0,
-                            )
-                            tmpySort = np.append(
-                                tmpySort,
-                                np.array(tmpy[sortIdx[findIdx[0, 0]], ::-1], ndmin=2),
-                                axis=0,
-                            )
-                        sortIdx = np.delete(sortIdx, findIdx[0, 0])
-                    elif findIdx.shape[0] > 1:
-                        warnings.warn(
-                            "WARNING: a problem occurred with the surface overlays"
-                        )
-                # now final plot
-                axs[axsx, axsy].plot(
-                    tmpxSort,
-                    tmpySort,
-                    color=surfcolor[s],
-                    linewidth=np.round(FIGSIZE / 8),
+                axs[axsx, axsy].add_collection(
+                    LineCollection(
+                        lines,
+                        colors=surfcolor[s],
+                        linewidths=np.round(FIGSIZE / 8),
+                    )
                 )
 
     # -----------------------------------------------------------------------------
     # output
 
     if not INTERACTIVE:
-        plt.savefig(OUTFILE, facecolor=fig.get_facecolor())
-        plt.close(fig)
+        fig.savefig(OUTFILE, facecolor=fig.get_facecolor())
 
     # -----------------------------------------------------------------------------
     #
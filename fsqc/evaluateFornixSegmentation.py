@@ -13,6 +13,7 @@ def evaluateFornixSegmentation(
     SCREENSHOTS_OUTFILE=[],
     RUN_SHAPEDNA=True,
     N_EIGEN=15,
+    VOLUME_CACHE=None,
 ):
     """
     Evaluate potential missegmentation of the fornix.
@@ -46,6 +47,8 @@ def evaluateFornixSegmentation(
         Whether to run shape analysis.
     N_EIGEN : int, optional (default: 30)
         Number of Eigenvalues for shape analysis.
+    VOLUME_CACHE : VolumeCache, optional (default: None)
+        Cache to load the images from; if None, images are read from disk.
 
     Returns
     -------
@@ -59,11 +62,10 @@ def evaluateFornixSegmentation(
     import os
     import warnings
 
-    import nibabel as nb
     import numpy as np
 
     from fsqc.createScreenshots import createScreenshots
-    from fsqc.fsqcUtils import applyTransform, binarizeImage
+    from fsqc.fsqcUtils import applyTransform, binarizeImage, loadVolume
 
     # --------------------------------------------------------------------------
     # check files
@@ -119,6 +121,7 @@ def evaluateFornixSegmentation(
         os.path.join(OUTPUT_DIR, "asegCCup.mgz"),
         mat_file=os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "transforms", "cc_up.lta"),
         interp="nearest",
+        volume_cache=VOLUME_CACHE,
     )
 
     # when using 'make_upright', conducting the transform for norm.mgz is no
@@ -129,6 +132,7 @@ def evaluateFornixSegmentation(
         os.path.join(OUTPUT_DIR, "normCCup.mgz"),
         mat_file=os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "transforms", "cc_up.lta"),
         interp="cubic",
+        volume_cache=VOLUME_CACHE,
     )
 
     # create fornix mask
@@ -137,13 +141,16 @@ def evaluateFornixSegmentation(
         os.path.join(OUTPUT_DIR, "asegCCup.mgz"),
         os.path.join(OUTPUT_DIR, "cc.mgz"),
         match=[251, 252, 253, 254, 255],
+        volume_cache=VOLUME_CACHE,
     )
 
     # --------------------------------------------------------------------------
     # create screenshot
 
     if CREATE_SCREENSHOT is True:
-        hdr = nb.load(os.path.join(OUTPUT_DIR, "asegCCup.mgz"))
+        hdr, _ = loadVolume(
+            os.path.join(OUTPUT_DIR, "asegCCup.mgz"), volume_cache=VOLUME_CACHE
+        )
         x_coord = np.matmul(
             hdr.header.get_vox2ras_tkr(), np.array((128, 128, 128, 1))[:, np.newaxis]
         )[0]
@@ -158,6 +165,7 @@ def evaluateFornixSegmentation(
             OVERLAY=[os.path.join(OUTPUT_DIR, "cc.mgz")],
             SURF=None,
             OUTFILE=SCREENSHOTS_OUTFILE,
+            VOLUME_CACHE=VOLUME_CACHE,
         )
 
     # --------------------------------------------------------------------------
@@ -14,6 +14,7 @@ def evaluateHippocampalSegmentation(
     SCREENSHOTS_ORIENTATION=["radiological"],
     HEMI="lh",
     LABEL="T1.v21",
+    VOLUME_CACHE=None,
 ):
     """
     Evaluate potential missegmentation of the hippocampus and amygdala.
@@ -44,6 +45,8 @@ def evaluateHippocampalSegmentation(
         Hemisphere to evaluate, either 'lh' or 'rh'.
     LABEL : str, optional, default: "T1.v21"
         Label for hippocampal and amygdala segmentation.
+    VOLUME_CACHE : VolumeCache, optional, default: None
+        Cache to load the images from; if None, images are read from disk.
 
     Returns
     -------
@@ -61,12 +64,11 @@ def evaluateHippocampalSegmentation(
     import logging
     import os
 
-    import nibabel as nb
     import numpy as np
     from scipy import ndimage
 
     from fsqc.createScreenshots import createScreenshots
-    from fsqc.fsqcUtils import binarizeImage
+    from fsqc.fsqcUtils import binarizeImage, loadVolume
 
     # --------------------------------------------------------------------------
     # check files
@@ -116,20 +118,21 @@ def evaluateHippocampalSegmentation(
         ),
         os.path.join(OUTPUT_DIR, "hippocampus-" + HEMI + ".mgz"),
         match=None,
+        volume_cache=VOLUME_CACHE,
     )
 
     # --------------------------------------------------------------------------
     # get centroids
 
-    seg = nb.load(
+    seg, seg_data = loadVolume(
         os.path.join(
             SUBJECTS_DIR,
             SUBJECT,
             "mri",
             HEMI + ".hippoAmygLabels-" + LABEL + ".FSvoxelSpace.mgz",
-        )
+        ),
+        volume_cache=VOLUME_CACHE,
     )
-    seg_data = seg.get_fdata()
     seg_labels = np.setdiff1d(np.unique(seg_data), 0)
 
     centroids = np.array(ndimage.center_of_mass(seg_data, seg_data, seg_labels))
@@ -188,4 +191,5 @@ def evaluateHippocampalSegmentation(
             ORIENTATION=SCREENSHOTS_ORIENTATION,
             XLIM=XLIM,
             YLIM=YLIM,
+            VOLUME_CACHE=VOLUME_CACHE,
         )
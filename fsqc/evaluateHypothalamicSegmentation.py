@@ -13,6 +13,7 @@ def evaluateHypothalamicSegmentation(
     CREATE_SCREENSHOT=True,
     SCREENSHOTS_OUTFILE=[],
     SCREENSHOTS_ORIENTATION=["radiological"],
+    VOLUME_CACHE=None,
 ):
     """
     Evaluate potential missegmentation of the hypothalamus.
@@ -39,6 +40,8 @@ def evaluateHypothalamicSegmentation(
         File or list of files for screenshots.
     SCREENSHOTS_ORIENTATION : str or list, optional, default: ["radiological"]
         Orientation or list of orientations for screenshots.
+    VOLUME_CACHE : VolumeCache, optional, default: None
+        Cache to load the images from; if None, images are read from disk.
 
     Returns
     -------
@@ -56,12 +59,11 @@ def evaluateHypothalamicSegmentation(
     import logging
     import os
 
-    import nibabel as nb
     import numpy as np
     from scipy import ndimage
 
     from fsqc.createScreenshots import createScreenshots
-    from fsqc.fsqcUtils import binarizeImage
+    from fsqc.fsqcUtils import binarizeImage, loadVolume
 
     # --------------------------------------------------------------------------
     # check files
@@ -98,15 +100,16 @@ def evaluateHypothalamicSegmentation(
         os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "hypothalamic_subunits_seg.v1.mgz"),
         os.path.join(OUTPUT_DIR, "hypothalamus.mgz"),
         match=[801, 802, 803, 804, 805, 806, 807, 808, 809, 810],
+        volume_cache=VOLUME_CACHE,
     )
 
     # --------------------------------------------------------------------------
     # get centroids
 
-    seg = nb.load(
-        os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "hypothalamic_subunits_seg.v1.mgz")
+    seg, seg_data = loadVolume(
+        os.path.join(SUBJECTS_DIR, SUBJECT, "mri", "hypothalamic_subunits_seg.v1.mgz"),
+        volume_cache=VOLUME_CACHE,
     )
-    seg_data = seg.get_fdata()
     seg_labels = np.setdiff1d(np.unique(seg_data), 0)
 
     centroids = np.array(ndimage.center_of_mass(seg_data, seg_data, seg_labels))
@@ -257,4 +260,5 @@ def evaluateHypothalamicSegmentation(
             ORIENTATION=SCREENSHOTS_ORIENTATION,
             XLIM=XLIM,
             YLIM=YLIM,
+            VOLUME_CACHE=VOLUME_CACHE,
         )
@@ -2,6 +2,13 @@
 This module provides the main functionality of the fsqc package.
 """
 
+# ==============================================================================
+# SETTINGS
+
+# logging format, shared by the main and worker processes
+
+LOGFILE_FORMAT = "[%(levelname)s: %(filename)s: %(lineno)4d]: %(message)s"
+
 # ==============================================================================
 # FUNCTIONS
 
@@ -173,7 +180,23 @@ def get_help(print_help=True, return_help=False):
     match the nomenclature of the 'aseg.stats' and/or '[lr]h.aparc.stats' file.
     If cortical parcellations are included in the outlier table for a comparison
     with aparc.stats values, the labels must have a 'lh.' or 'rh.' prefix.
-    `upper` and `lower` are user-specified upper and lower bounds.
+    `upper` and `lower` are user-specified upper and lower bounds. An optional
+    `stratum` column allows for stratified normative values (e.g., by age and
+    sex); rows with an empty stratum apply to all subjects. The stratum of each
+    subject is then specified with the '--outlier-strata' argument, a csv table
+    with headers `subject` and `stratum`. Subjects without a stratum, and
+    regions without values for a stratum, are compared against the rows with an
+    empty stratum. A csv table is compiled into 'fsqc-norms.npz' within the
+    'outliers' subdirectory, which is reused as long as the table is unchanged;
+    compiled files can also be given to the '--outlier-table' argument directly.
+
+    If the '--outlier-save-summary' argument is given, a summary of the sample
+    is saved as 'fsqc-sample-summary.npz' in the 'outliers' subdirectory. For
+    large cohorts that are split into several runs, e.g. separate cluster jobs,
+    the summaries of all runs can be passed to the '--outlier-sample-summaries'
+    argument in a second pass over each run, such that subjects are compared
+    against the sample statistics of the whole cohort. Percentiles of the merged summaries are approximate for regions with
+    more than 200 values.
 
     The main csv table will be appended with the following summary variables, and
     more detailed output about will be saved as csv tables in the 'outliers'
@@ -186,6 +209,18 @@ def get_help(print_help=True, return_help=False):
     n_outliers_norms         ... number of structures exceeding the upper and
                                  lower bounds of the normative values
 
+    If the '--outlier-multivariate' argument is given, a robust multivariate
+    outlier score is computed in addition. It is based on all regions without
+    missing values, and accounts for the correlations between regions, which
+    inflate the counts above. Location and covariance of the sample are
+    estimated with a Minimum Covariance Determinant approach with Ledoit-Wolf
+    shrinkage, using a random subset of at most 10000 subjects for large
+    samples. The following variables are appended to the main csv table:
+
+    outlier_multivariate_distance ... robust Mahalanobis distance
+    outlier_multivariate_pvalue   ... p-value of the distance (chi-squared
+                                      distribution)
+
 
     ======
     Usage:
@@ -237,12 +272,54 @@ def get_help(print_help=True, return_help=False):
                                 [lr]h.hippoAmygLabels-<LABEL>.FSvoxelSpace.mgz
           --shape               run shape analysis
           --outlier             run outlier detection
-          --outlier-table       specify normative values (only in conjunction with
+          --outlier-table       specify normative values as a csv table or a
+                                compiled npz file (only in conjunction with
                                 --outlier)
+          --outlier-multivariate
+                                compute robust multivariate outlier scores
+                                (only in conjunction with --outlier)
+          --outlier-strata <filename>
+                                csv table with the stratum of each subject for
+                                stratified normative values (only in conjunction
+                                with --outlier-table)
+          --outlier-max-memory <GB>
+                                memory budget for the outlier detection in GB;
+                                larger cohort tables are memory-mapped to
+                                temporary files (default: no limit)
+          --outlier-save-summary
+                                save a summary of the sample, which can be merged
+                                with the summaries of other runs (only in
+                                conjunction with --outlier)
+          --outlier-sample-summaries <filename> [<filename> ...]
+                                compute sample statistics from the merged sample
+                                summaries of several runs (only in conjunction
+                                with --outlier)
           --fastsurfer          use FastSurfer instead of FreeSurfer output
           --exit-on-error       terminate the program when encountering an error;
                                 otherwise, try to continue with the next module or
                                 case
+          --n-jobs <num>        number of subjects to process in parallel
+                                (default: 1)
+          --module-jobs <num>   number of modules of a subject to run
+                                concurrently in threads (default: 1)
+          --max-memory <GB>     memory budget in GB for the modules and subjects
+                                that run concurrently; modules and subjects
+                                are started only if their expected memory
+                                fits, and are queued otherwise (default: no
+                                limit)
+          --incremental         skip modules whose inputs and settings have not
+                                changed since the previous run and reuse their
+                                results
+          --incremental-checksums
+                                use checksums instead of modification times to
+                                detect changed inputs (only in conjunction with
+                                --incremental)
+          --volume-cache <directory>
+                                directory for caching decompressed image volumes
+                                across subjects and runs, e.g. on a local SSD
+          --volume-cache-size <GB>
+                                maximum size of the volume cache in GB; least
+                                recently used volumes are removed (default: 10)
 
         getting help:
           -h, --help            display this help message and exit
@@ -600,6 +677,48 @@ def _parse_arguments():
         metavar="<filename>",
         required=False,
     )
+    optional.add_argument(
+        "--outlier-multivariate",
+        dest="outlier_multivariate",
+        help="compute robust multivariate outlier scores",
+        default=False,
+        action="store_true",
+        required=False,
+    )
+    optional.add_argument(
+        "--outlier-strata",
+        dest="outlier_strata",
+        help="specify strata of subjects for stratified normative values",
+        default=None,
+        metavar="<filename>",
+        required=False,
+    )
+    optional.add_argument(
+        "--outlier-max-memory",
+        dest="outlier_max_memory",
+        help="memory budget for the outlier detection in GB",
+        default=None,
+        type=float,
+        metavar="<GB>",
+        required=False,
+    )
+    optional.add_argument(
+        "--outlier-save-summary",
+        dest="outlier_save_summary",
+        help="save a summary of the sample for merging with other runs",
+        default=False,
+        action="store_true",
+        required=False,
+    )
+    optional.add_argument(
+        "--outlier-sample-summaries",
+        dest="outlier_sample_summaries",
+        help="compute sample statistics from the merged sample summaries of several runs",
+        default=None,
+        nargs="+",
+        metavar="<filename>",
+        required=False,
+    )
     optional.add_argument(
         "--fastsurfer",
         dest="fastsurfer",
@@ -616,6 +735,66 @@ def _parse_arguments():
         action="store_true",
         required=False,
     )
+    optional.add_argument(
+        "--n-jobs",
+        dest="n_jobs",
+        help="number of subjects to process in parallel",
+        default=1,
+        type=int,
+        metavar="<num>",
+        required=False,
+    )
+    optional.add_argument(
+        "--module-jobs",
+        dest="module_jobs",
+        help="number of modules of a subject to run concurrently",
+        default=1,
+        type=int,
+        metavar="<num>",
+        required=False,
+    )
+    optional.add_argument(
+        "--max-memory",
+        dest="max_memory",
+        help="memory budget in GB for the modules and subjects that run concurrently",
+        default=None,
+        type=float,
+        metavar="<GB>",
+        required=False,
+    )
+    optional.add_argument(
+        "--incremental",
+        dest="incremental",
+        help="reuse the results of modules whose inputs have not changed",
+        default=False,
+        action="store_true",
+        required=False,
+    )
+    optional.add_argument(
+        "--incremental-checksums",
+        dest="incremental_checksums",
+        help="use checksums to detect changed inputs (only with --incremental)",
+        default=False,
+        action="store_true",
+        required=False,
+    )
+    optional.add_argument(
+        "--volume-cache",
+        dest="volume_cache",
+        help="directory for caching decompressed image volumes",
+        default=None,
+        metavar="<directory>",
+        required=False,
+    )
+    optional.add_argument(
+        "--volume-cache-size",
+        dest="volume_cache_size",
+        help="maximum size of the volume cache in GB",
+        default=10,
+        type=float,
+        metavar="<GB>",
+        required=False,
+    )
 
     expert = parser.add_argument_group("expert arguments")
     expert.add_argument(
@@ -727,8 +906,20 @@ def _parse_arguments():
     argsDict["hippocampus_label"] = args.hippocampus_label
     argsDict["outlier"] = args.outlier
     argsDict["outlier_table"] = args.outlier_table
+    argsDict["outlier_multivariate"] = args.outlier_multivariate
+    argsDict["outlier_strata"] = args.outlier_strata
+    argsDict["outlier_max_memory"] = args.outlier_max_memory
+    argsDict["outlier_save_summary"] = args.outlier_save_summary
+    argsDict["outlier_sample_summaries"] = args.outlier_sample_summaries
     argsDict["fastsurfer"] = args.fastsurfer
     argsDict["exit_on_error"] = args.exit_on_error
+    argsDict["n_jobs"] = args.n_jobs
+    argsDict["module_jobs"] = args.module_jobs
+    argsDict["max_memory"] = args.max_memory
+    argsDict["incremental"] = args.incremental
+    argsDict["incremental_checksums"] = args.incremental_checksums
+    argsDict["volume_cache"] = args.volume_cache
+    argsDict["volume_cache_size"] = args.volume_cache_size
 
     #
     return argsDict
@@ -757,6 +948,7 @@ def _check_arguments(argsDict):
         If neither --subjects nor --subjects-file is specified and no subjects are found in the subjects directory.
         If --screenshots and --screenshots-html are both True and the screenshots directory cannot be created.
         If --hippocampus or --hippocampus-html is True but --hippocampus-label is not specified.
+        If --n-jobs is smaller than 1.
         If no subjects are found after file checks.
 
     Returns
@@ -1064,6 +1256,63 @@ def _check_arguments(argsDict):
         )
         raise ValueError
 
+    # check number of parallel jobs
+    if "n_jobs" not in argsDict.keys() or argsDict["n_jobs"] is None:
+        argsDict["n_jobs"] = 1
+    if argsDict["n_jobs"] < 1:
+        raise ValueError(
+            "ERROR: the --n-jobs argument must be at least 1, not "
+            + str(argsDict["n_jobs"])
+        )
+
+    # check number of concurrent modules and memory budget
+    if "module_jobs" not in argsDict.keys() or argsDict["module_jobs"] is None:
+        argsDict["module_jobs"] = 1
+    if argsDict["module_jobs"] < 1:
+        raise ValueError(
+            "ERROR: the --module-jobs argument must be at least 1, not "
+            + str(argsDict["module_jobs"])
+        )
+    if "max_memory" not in argsDict.keys():
+        argsDict["max_memory"] = None
+    if argsDict["max_memory"] is not None and argsDict["max_memory"] <= 0:
+        raise ValueError(
+            "ERROR: the --max-memory argument must be positive, not "
+            + str(argsDict["max_memory"])
+        )
+
+    # check incremental mode
+    if "incremental" not in argsDict.keys():
+        argsDict["incremental"] = False
+    if "incremental_checksums" not in argsDict.keys():
+        argsDict["incremental_checksums"] = False
+    if argsDict["incremental_checksums"] is True and argsDict["incremental"] is False:
+        logging.warning(
+            "WARNING: the --incremental-checksums argument has no effect without --incremental"
+        )
+
+    # check if volume cache directory exists or can be created and is writable
+    if "volume_cache" not in argsDict.keys():
+        argsDict["volume_cache"] = None
+    if "volume_cache_size" not in argsDict.keys():
+        argsDict["volume_cache_size"] = 10
+    if argsDict["volume_cache"] is not None:
+        try:
+            os.makedirs(argsDict["volume_cache"], exist_ok=True)
+            testfile = tempfile.TemporaryFile(dir=argsDict["volume_cache"])
+            testfile.close()
+        except Exception as e:
+            logging.error(
+                "ERROR: cannot use volume cache directory " + argsDict["volume_cache"]
+            )
+            logging.error("Reason: " + str(e))
+            raise
+        if argsDict["volume_cache_size"] <= 0:
+            raise ValueError(
+                "ERROR: the --volume-cache-size argument must be positive, not "
+                + str(argsDict["volume_cache_size"])
+            )
+
     # check if shape subdirectory exists or can be created and is writable
     if argsDict["shape"] is True:
         if os.path.isdir(os.path.join(argsDict["output_dir"], "brainprint")):
@@ -1140,6 +1389,63 @@ def _check_arguments(argsDict):
                 argsDict["outlier_table"],
             )
 
+    # check multivariate outlier scores
+    if "outlier_multivariate" not in argsDict.keys():
+        argsDict["outlier_multivariate"] = False
+    if argsDict["outlier_multivariate"] is True and argsDict["outlier"] is False:
+        logging.warning(
+            "WARNING: the --outlier-multivariate argument has no effect without --outlier"
+        )
+
+    # check if outlier-strata exists if it was given, otherwise exit
+    if "outlier_strata" not in argsDict.keys():
+        argsDict["outlier_strata"] = None
+    if argsDict["outlier_strata"] is not None:
+        if os.path.isfile(argsDict["outlier_strata"]):
+            logging.info("Found table with strata " + argsDict["outlier_strata"])
+        else:
+            raise FileNotFoundError(
+                "ERROR: Could not find table with strata ", argsDict["outlier_strata"]
+            )
+        if argsDict["outlier_table"] is None:
+            logging.warning(
+                "WARNING: the --outlier-strata argument has no effect without --outlier-table"
+            )
+
+    # check memory budget of outlier detection
+    if "outlier_max_memory" not in argsDict.keys():
+        argsDict["outlier_max_memory"] = None
+    if argsDict["outlier_max_memory"] is not None:
+        if argsDict["outlier_max_memory"] <= 0:
+            raise ValueError(
+                "ERROR: the --outlier-max-memory argument must be positive, not "
+                + str(argsDict["outlier_max_memory"])
+            )
+
+    # check saving the sample summary
+    if "outlier_save_summary" not in argsDict.keys():
+        argsDict["outlier_save_summary"] = False
+    if argsDict["outlier_save_summary"] is True and argsDict["outlier"] is False:
+        logging.warning(
+            "WARNING: the --outlier-save-summary argument has no effect without --outlier"
+        )
+
+    # check if outlier sample summaries exist if they were given, otherwise exit
+    if "outlier_sample_summaries" not in argsDict.keys():
+        argsDict["outlier_sample_summaries"] = None
+    if argsDict["outlier_sample_summaries"] is not None:
+        for summary_file in argsDict["outlier_sample_summaries"]:
+            if os.path.isfile(summary_file):
+                logging.info("Found sample summary " + summary_file)
+            else:
+                raise FileNotFoundError(
+                    "ERROR: Could not find sample summary ", summary_file
+                )
+        if argsDict["outlier"] is False:
+            logging.warning(
+                "WARNING: the --outlier-sample-summaries argument has no effect without --outlier"
+            )
+
     # check for required files
     subjects_to_remove = list()
     for subject in argsDict["subjects"]:
@@ -1449,812 +1755,1020 @@ def _check_packages():
 
 
 # ------------------------------------------------------------------------------
-# do fsqc
-
-
-def _do_fsqc(argsDict):
+# _lookup_module
+
+
+def _lookup_module(
+    argsDict,
+    manifestRecords,
+    module,
+    files,
+    settings,
+    metricsDict,
+    statusDict,
+    imagesDict,
+):
     """
-    Run the FastSurferQC submodules.
+    Restore the results of a module from a previous incremental run.
 
     Parameters
     ----------
     argsDict : dict
         Dictionary containing input arguments.
+    manifestRecords : dict
+        Manifest records of the subject.
+    module : str
+        Name of the module.
+    files : list of str
+        Input files of the module.
+    settings : dict
+        Settings of the module.
+    metricsDict : dict
+        Metrics of the subject; will be updated with the recorded metrics.
+    statusDict : dict
+        Status of the subject; will be updated with the recorded status.
+    imagesDict : dict
+        Images of the subject; will be updated with the recorded images.
 
     Returns
     -------
-    None
-        This function returns nothing.
+    dict or None
+        The recorded results of the module, or None if the module needs to
+        be run (again).
     """
 
-    # ------------------------------------------------------------------------------
-    # imports
-
-    import csv
     import logging
-    import os
-    import time
 
-    import numpy as np
+    from fsqc.utils._manifest import lookup_module
 
-    from fsqc.checkCCSize import checkCCSize
-    from fsqc.checkContrast import checkContrast
-    from fsqc.checkRotation import checkRotation
-    from fsqc.checkSNR import checkSNR
-    from fsqc.checkTopology import checkTopology
-    from fsqc.createScreenshots import createScreenshots
-    from fsqc.createSurfacePlots import createSurfacePlots
-    from fsqc.evaluateFornixSegmentation import evaluateFornixSegmentation
-    from fsqc.evaluateHippocampalSegmentation import evaluateHippocampalSegmentation
-    from fsqc.evaluateHypothalamicSegmentation import evaluateHypothalamicSegmentation
-    from fsqc.outlierDetection import outlierDetection, outlierTable
+    if argsDict["incremental"] is False:
+        return None
 
-    # ------------------------------------------------------------------------------
-    # internal settings (might be turned into command-line arguments in the future)
-
-    SNR_AMOUT_EROSION = 3
-    FORNIX_SCREENSHOT = True
-    FORNIX_SHAPE = False
-    FORNIX_N_EIGEN = 15
-    HYPOTHALAMUS_SCREENSHOT = True
-    HIPPOCAMPUS_SCREENSHOT = True
-    OUTLIER_N_MIN = 5
-
-    SHAPE_EVEC = False
-    SHAPE_SKIPCORTEX = False
-    SHAPE_NUM = 50
-    SHAPE_NORM = "geometry"
-    SHAPE_REWEIGHT = True
-    SHAPE_ASYMMETRY = True
+    result = lookup_module(
+        manifestRecords,
+        module,
+        files,
+        settings,
+        get_version(),
+        checksums=argsDict["incremental_checksums"],
+    )
 
-    # --------------------------------------------------------------------------
-    # process
+    if result is not None:
+        logging.info(
+            "Inputs unchanged, using previous results of the " + module + " module"
+        )
+        metricsDict.update(result["metrics"])
+        statusDict.update(result["status"])
+        imagesDict.update(result["images"])
 
-    # start the processing with a message
-    print("")
-    print("-----------------------------")
+    return result
 
-    # create metrics dict
-    metricsDict = dict()
 
-    # create images dict
-    imagesScreenshotsDict = dict()
-    imagesSurfacesDict = dict()
-    imagesSkullstripDict = dict()
-    imagesFornixDict = dict()
-    imagesHypothalamusDict = dict()
-    imagesHippocampusLeftDict = dict()
-    imagesHippocampusRightDict = dict()
+# ------------------------------------------------------------------------------
+# _record_module
+
+
+def _record_module(
+    argsDict,
+    manifestRecords,
+    module,
+    files,
+    settings,
+    metrics=None,
+    images=None,
+    outputs=(),
+    **kwargs,
+):
+    """
+    Record the results of a successful module run for incremental runs.
 
-    # create status dict
-    statusDict = dict()
+    Parameters
+    ----------
+    argsDict : dict
+        Dictionary containing input arguments.
+    manifestRecords : dict
+        Manifest records of the subject; will be updated in-place.
+    module : str
+        Name of the module.
+    files : list of str
+        Input files of the module.
+    settings : dict
+        Settings of the module.
+    metrics : dict, optional
+        Metrics computed by the module.
+    images : dict, optional
+        Images created by the module.
+    outputs : list of str, optional
+        Output files and directories of the module.
+    **kwargs
+        Additional results of the module.
+    """
 
-    # loop through the specified subjects
-    for subject in argsDict["subjects"]:
-        #
-        logging.info(
-            "Starting fsqc for subject "
-            + subject
-            + " at "
-            + time.strftime("%Y-%m-%d %H:%M %Z", time.localtime(time.time())),
-        )
+    from fsqc.utils._manifest import record_module
+
+    if argsDict["incremental"] is False:
+        return
+
+    result = {
+        "metrics": dict() if metrics is None else metrics,
+        "status": {module: True},
+        "images": dict() if images is None else images,
+    }
+    result.update(kwargs)
+
+    record_module(
+        manifestRecords,
+        module,
+        files,
+        settings,
+        get_version(),
+        result,
+        outputs=outputs,
+        checksums=argsDict["incremental_checksums"],
+    )
 
-        # ----------------------------------------------------------------------
-        # set images
 
-        if argsDict["fastsurfer"] is True:
-            aparc_image = "aparc.DKTatlas+aseg.deep.mgz"
-        else:
-            aparc_image = "aparc+aseg.mgz"
+# ------------------------------------------------------------------------------
+# _module_tasks
 
-        # ----------------------------------------------------------------------
-        # add subject to dictionary
 
-        metricsDict.update({subject: {"subject": subject}})
-        statusDict.update({subject: {"subject": subject}})
+def _module_tasks(module, subject, argsDict, volumeCache):
+    """
+    Get the tasks for running a QC module for a single subject.
 
-        # ----------------------------------------------------------------------
-        # compute core metrics
+    Parameters
+    ----------
+    module : QCModule
+        The module.
+    subject : str
+        Subject ID.
+    argsDict : dict
+        Dictionary containing input arguments.
+    volumeCache : VolumeCache
+        Volume cache of the subject.
 
-        # set status
-        metrics_ok = True
+    Returns
+    -------
+    dict
+        Tasks for the task graph of the subject, one for each part of the
+        module, keyed by the module name and part.
+    """
 
-        # get WM and GM SNR for orig.mgz
-        try:
-            wm_snr_orig, gm_snr_orig = checkSNR(
-                argsDict["subjects_dir"],
-                subject,
-                SNR_AMOUT_EROSION,
-                ref_image="orig.mgz",
-                aparc_image=aparc_image,
-            )
+    import functools
+    import os
 
-        except Exception as e:
-            logging.error("ERROR: SNR computation failed for " + subject)
-            logging.error("Reason: " + str(e))
-            wm_snr_orig = np.nan
-            gm_snr_orig = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
+    from fsqc.utils._scheduler import Task
 
-        # get WM and GM SNR for norm.mgz
-        try:
-            wm_snr_norm, gm_snr_norm = checkSNR(
-                argsDict["subjects_dir"],
-                subject,
-                SNR_AMOUT_EROSION,
-                ref_image="norm.mgz",
-                aparc_image=aparc_image,
-            )
+    outdir = os.path.join(argsDict["output_dir"], module.outdir, subject)
 
-        except Exception as e:
-            logging.error("ERROR: SNR computation failed for " + subject)
-            logging.error("Reason: " + str(e))
-            wm_snr_norm = np.nan
-            gm_snr_norm = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
+    def run(part):
+        # message
+        print("-----------------------------")
+        print(module.message)
+        print("")
 
-        # check CC size
-        try:
-            cc_size = checkCCSize(argsDict["subjects_dir"], subject)
+        # check / create subject-specific output directory
+        os.makedirs(outdir, exist_ok=True)
 
-        except Exception as e:
-            logging.error("ERROR: CC size computation failed for " + subject)
-            logging.error("Reason: " + str(e))
-            cc_size = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
+        # process
+        if part is None:
+            return module.function(subject, argsDict, outdir, volumeCache)
+        else:
+            return module.function(subject, argsDict, outdir, volumeCache, part)
 
-        # check topology
-        try:
-            (
-                holes_lh,
-                holes_rh,
-                defects_lh,
-                defects_rh,
-                topo_lh,
-                topo_rh,
-            ) = checkTopology(argsDict["subjects_dir"], subject)
+    return {
+        module.name if part is None else module.name + ":" + part: Task(
+            functools.partial(run, part),
+            memory=module.memory,
+            exclusive=module.renderer,
+        )
+        for part in module.parts
+    }
 
-        except Exception as e:
-            logging.error("ERROR: Topology check failed for " + subject)
-            logging.error("Reason: " + str(e))
-            holes_lh = np.nan
-            holes_rh = np.nan
-            defects_lh = np.nan
-            defects_rh = np.nan
-            topo_lh = np.nan
-            topo_rh = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
 
-        # check contrast
-        try:
-            con_snr_lh, con_snr_rh = checkContrast(argsDict["subjects_dir"], subject)
+# ------------------------------------------------------------------------------
+# _store_module
+
+
+def _store_module(
+    module,
+    subject,
+    argsDict,
+    manifestRecords,
+    files,
+    settings,
+    taskResults,
+    taskErrors,
+    metricsDict,
+    statusDict,
+    imagesDict,
+):
+    """
+    Store the results of a QC module for a single subject.
 
-        except Exception as e:
-            logging.error("ERROR: Contrast check failed for " + subject)
-            logging.error("Reason: " + str(e))
-            con_snr_lh = np.nan
-            con_snr_rh = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
+    If any part of the module failed, the error is logged and the results of
+    a failed run are used.
 
-        # check rotation
-        try:
-            rot_tal_x, rot_tal_y, rot_tal_z = checkRotation(
-                argsDict["subjects_dir"], subject
-            )
+    Parameters
+    ----------
+    module : QCModule
+        The module.
+    subject : str
+        Subject ID.
+    argsDict : dict
+        Dictionary containing input arguments.
+    manifestRecords : dict
+        Manifest records of the subject; will be updated in-place.
+    files : list of str
+        Input files of the module.
+    settings : dict
+        Settings of the module.
+    taskResults : dict
+        Results of the tasks of the subject, see _module_tasks().
+    taskErrors : dict
+        Errors of the tasks of the subject, see _module_tasks().
+    metricsDict : dict
+        Metrics of the subject; will be updated with the module metrics.
+    statusDict : dict
+        Status of the subject; will be updated with the module status.
+    imagesDict : dict
+        Images of the subject; will be updated with the module images.
 
-        except Exception as e:
-            logging.error("ERROR: Rotation failed for " + subject)
-            logging.error("Reason: " + str(e))
-            rot_tal_x = np.nan
-            rot_tal_y = np.nan
-            rot_tal_z = np.nan
-            metrics_ok = False
-            if argsDict["exit_on_error"] is True:
-                raise
+    Returns
+    -------
+    dict
+        The results of the module.
+    """
 
-        # store data
-        metricsDict[subject].update(
-            {
-                "wm_snr_orig": wm_snr_orig,
-                "gm_snr_orig": gm_snr_orig,
-                "wm_snr_norm": wm_snr_norm,
-                "gm_snr_norm": gm_snr_norm,
-                "cc_size": cc_size,
-                "holes_lh": holes_lh,
-                "holes_rh": holes_rh,
-                "defects_lh": defects_lh,
-                "defects_rh": defects_rh,
-                "topo_lh": topo_lh,
-                "topo_rh": topo_rh,
-                "con_snr_lh": con_snr_lh,
-                "con_snr_rh": con_snr_rh,
-                "rot_tal_x": rot_tal_x,
-                "rot_tal_y": rot_tal_y,
-                "rot_tal_z": rot_tal_z,
-            }
+    import logging
+    import os
+
+    names = [
+        module.name if part is None else module.name + ":" + part
+        for part in module.parts
+    ]
+    errors = [taskErrors[name] for name in names if name in taskErrors]
+
+    if errors:
+        logging.error("ERROR: " + module.name + " module failed for subject " + subject)
+        logging.error("Reason: " + str(errors[0]))
+        result = module.failedResult(argsDict)
+        module_ok = False
+    else:
+        # merge the results of the parts
+        result = {"metrics": dict(), "images": dict()}
+        for name in names:
+            for key, value in taskResults[name].items():
+                if isinstance(value, dict) and key in result:
+                    result[key].update(value)
+                else:
+                    result[key] = value
+        module_ok = True
+
+    # store data
+    metricsDict.update(result["metrics"])
+    imagesDict.update(result["images"])
+    statusDict.update({module.name: module_ok})
+
+    # record results for incremental runs
+    if module_ok:
+        outdir = os.path.join(argsDict["output_dir"], module.outdir, subject)
+        _record_module(
+            argsDict,
+            manifestRecords,
+            module.name,
+            files,
+            settings,
+            outputs=module.outputs(outdir, subject),
+            **result,
         )
 
-        # store data
-        statusDict[subject].update({"metrics": metrics_ok})
+    return result
 
-        # ----------------------------------------------------------------------
-        # run optional modules: shape analysis
 
-        if argsDict["shape"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Running brainPrint analysis ...")
-                print("")
+# ------------------------------------------------------------------------------
+# _track_memory
 
-                from pathlib import Path
 
-                # compute brainprint (will also compute shapeDNA)
-                import brainprint
+def _track_memory(argsDict):
+    """
+    Determine whether the peak memory of the modules is recorded.
 
-                # check / create subject-specific brainprint_outdir
-                brainprint_outdir = Path(
-                    os.path.join(argsDict["output_dir"], "brainprint", subject)
-                )
+    The peak memory is only needed to admit modules and subjects within a
+    memory budget, or when modules or subjects run concurrently (to learn the
+    memory for later runs with a budget).
 
-                # run brainPrint
-                evMat, evecMat, dstMat = brainprint.brainprint.run_brainprint(
-                    subjects_dir=argsDict["subjects_dir"],
-                    subject_id=subject,
-                    destination=brainprint_outdir,
-                    keep_eigenvectors=SHAPE_EVEC,
-                    skip_cortex=SHAPE_SKIPCORTEX,
-                    num=SHAPE_NUM,
-                    norm=SHAPE_NORM,
-                    reweight=SHAPE_REWEIGHT,
-                    asymmetry=SHAPE_ASYMMETRY,
-                )
+    Parameters
+    ----------
+    argsDict : dict
+        Dictionary containing input arguments.
 
-                # get a subset of the brainprint results
-                distDict = {subject: dstMat}
+    Returns
+    -------
+    bool
+        True if the peak memory is recorded.
+    """
+    return (
+        argsDict["max_memory"] is not None
+        or argsDict["n_jobs"] > 1
+        or argsDict["module_jobs"] > 1
+    )
 
-                # return
-                shape_ok = True
 
-            #
-            except Exception as e:
-                distDict = {subject: []}
-                logging.error("ERROR: the shape module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                shape_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+# ------------------------------------------------------------------------------
+# _do_fsqc_subject
 
-            # store data
-            metricsDict[subject].update(distDict[subject])
 
-            # store data
-            statusDict[subject].update({"shape": shape_ok})
+def _do_fsqc_subject(subject, argsDict, manifestRecords=None, maxMemory=None):
+    """
+    Run the fsqc submodules for a single subject.
 
-        # ----------------------------------------------------------------------
-        # run optional modules: screenshots
+    Parameters
+    ----------
+    subject : str
+        Subject ID.
+    argsDict : dict
+        Dictionary containing input arguments.
+    manifestRecords : dict, optional
+        Manifest records of the subject from a previous incremental run.
+    maxMemory : float, optional
+        Memory budget in MB for the modules of the subject that run
+        concurrently. If None, the budget given by --max-memory is used.
 
-        if argsDict["screenshots"] is True or argsDict["screenshots_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Creating screenshots ...")
-                print("")
-
-                # check / create subject-specific screenshots_outdir
-                screenshots_outdir = os.path.join(
-                    argsDict["output_dir"], "screenshots", subject
-                )
-                if not os.path.isdir(screenshots_outdir):
-                    os.makedirs(screenshots_outdir)
-                outfile = os.path.join(screenshots_outdir, subject + ".png")
-
-                # re-initialize
-                screenshots_base_subj = list()
-                screenshots_overlay_subj = list()
-                screenshots_surf_subj = list()
-
-                # check screenshots_base
-                if argsDict["screenshots_base"][0] == "default":
-                    screenshots_base_subj = argsDict["screenshots_base"]
-                    logging.info("Using default for screenshot base image")
-                elif os.path.isfile(argsDict["screenshots_base"][0]):
-                    screenshots_base_subj = argsDict["screenshots_base"]
-                    logging.info(
-                        "Using "
-                        + screenshots_base_subj[0]
-                        + " as screenshot base image"
-                    )
-                elif os.path.isfile(
-                    os.path.join(
-                        argsDict["subjects_dir"],
-                        subject,
-                        "mri",
-                        argsDict["screenshots_base"][0],
-                    )
-                ):
-                    screenshots_base_subj = [
-                        os.path.join(
-                            argsDict["subjects_dir"],
-                            subject,
-                            "mri",
-                            argsDict["screenshots_base"][0],
-                        )
-                    ]
-                    logging.info(
-                        "Using "
-                        + screenshots_base_subj[0]
-                        + " as screenshot base image"
-                    )
-                else:
-                    raise FileNotFoundError(
-                        "ERROR: cannot find the screenshots base file "
-                        + argsDict["screenshots_base"][0]
-                    )
+    Returns
+    -------
+    dict
+        Dictionary with the subject ID ('subject'), the computed metrics
+        ('metrics'), the module status ('status'), the filenames of the
+        created images ('images'), the shape and fornix shape results
+        ('shape', 'fornix_shape'; None if the module was not run), the
+        updated manifest records ('manifest'), and the peak memory in MB of
+        the modules that ran alone, along with the memory at the start
+        ('resources'; None if the memory is not tracked, see
+        `_track_memory`).
+    """
 
-                # check screenshots_overlay
-                if argsDict["screenshots_overlay"] is not None:
-                    if argsDict["screenshots_overlay"][0] == "default":
-                        screenshots_overlay_subj = argsDict["screenshots_overlay"]
-                        logging.info("Using default for screenshot overlay image")
-                    elif os.path.isfile(argsDict["screenshots_overlay"][0]):
-                        screenshots_overlay_subj = argsDict["screenshots_overlay"]
-                        logging.info(
-                            "Using "
-                            + screenshots_overlay_subj[0]
-                            + " as screenshot overlay image"
-                        )
-                    elif os.path.isfile(
-                        os.path.join(
-                            argsDict["subjects_dir"],
-                            subject,
-                            "mri",
-                            argsDict["screenshots_overlay"][0],
-                        )
-                    ):
-                        screenshots_overlay_subj = [
-                            os.path.join(
-                                argsDict["subjects_dir"],
-                                subject,
-                                "mri",
-                                argsDict["screenshots_overlay"][0],
-                            )
-                        ]
-                        logging.info(
-                            "Using "
-                            + screenshots_overlay_subj[0]
-                            + " as screenshot overlay image"
-                        )
-                    else:
-                        raise FileNotFoundError(
-                            "ERROR: cannot find the screenshots overlay file "
-                            + argsDict["screenshots_overlay"][0]
-                        )
-                else:
-                    screenshots_overlay_subj = argsDict["screenshots_overlay"]
-
-                # check screenshots_surf
-                if argsDict["screenshots_surf"] is not None:
-                    for screenshots_surf_i in argsDict["screenshots_surf"]:
-                        if screenshots_surf_i == "default":
-                            logging.info("Using default for screenshot surface")
-                        elif os.path.isfile(screenshots_surf_i):
-                            logging.info(
-                                "Using " + screenshots_surf_i + " as screenshot surface"
-                            )
-                        elif os.path.isfile(
-                            os.path.join(
-                                argsDict["subjects_dir"],
-                                subject,
-                                "surf",
-                                screenshots_surf_i,
-                            )
-                        ):
-                            screenshots_surf_i = os.path.join(
-                                argsDict["subjects_dir"],
-                                subject,
-                                "surf",
-                                screenshots_surf_i,
-                            )
-                            logging.info(
-                                "Using " + screenshots_surf_i + " as screenshot surface"
-                            )
-                        else:
-                            raise FileNotFoundError(
-                                "ERROR: cannot find the screenshots surface file "
-                                + screenshots_surf_i
-                            )
-                        screenshots_surf_subj.append(screenshots_surf_i)
-                else:
-                    screenshots_surf_subj = None
-
-                # process
-                createScreenshots(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTFILE=outfile,
-                    INTERACTIVE=False,
-                    BASE=screenshots_base_subj,
-                    OVERLAY=screenshots_overlay_subj,
-                    SURF=screenshots_surf_subj,
-                    VIEWS=argsDict["screenshots_views"],
-                    LAYOUT=argsDict["screenshots_layout"],
-                    ORIENTATION=argsDict["screenshots_orientation"],
-                )
+    # ------------------------------------------------------------------------------
+    # imports
 
-                # return
-                screenshots_ok = True
+    import functools
+    import logging
+    import os
+    import threading
+    import time
 
-            #
-            except Exception as e:
-                logging.error("ERROR: screenshots module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                screenshots_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+    from fsqc.fsqcMetrics import (
+        METRICS_MEMORY,
+        SubjectContext,
+        computeMetrics,
+        metricInputs,
+    )
+    from fsqc.fsqcModules import enabledModules
+    from fsqc.fsqcSettings import SNR_AMOUT_EROSION
+    from fsqc.fsqcUtils import VolumeCache
+    from fsqc.utils._scheduler import Task, run_task_graph
 
-            # store data
-            if screenshots_ok:
-                imagesScreenshotsDict[subject] = outfile
-            else:
-                imagesScreenshotsDict[subject] = []
+    # --------------------------------------------------------------------------
+    # process
 
-            # store data
-            statusDict[subject].update({"screenshots": screenshots_ok})
+    #
+    logging.info(
+        "Starting fsqc for subject "
+        + subject
+        + " at "
+        + time.strftime("%Y-%m-%d %H:%M %Z", time.localtime(time.time())),
+    )
 
-        # ----------------------------------------------------------------------
-        # run optional modules: surface plots
+    # ----------------------------------------------------------------------
+    # set images
 
-        if argsDict["surfaces"] is True or argsDict["surfaces_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Creating surface plots ...")
-                print("")
-
-                # check / create subject-specific surfaces_outdir
-                surfaces_outdir = os.path.join(
-                    argsDict["output_dir"], "surfaces", subject
-                )
-                if not os.path.isdir(surfaces_outdir):
-                    os.makedirs(surfaces_outdir)
-
-                # process
-                createSurfacePlots(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    SURFACES_OUTDIR=surfaces_outdir,
-                    VIEWS=argsDict["surfaces_views"],
-                    FASTSURFER=argsDict["fastsurfer"],
-                )
-                # return
-                surfaces_ok = True
+    if argsDict["fastsurfer"] is True:
+        aparc_image = "aparc.DKTatlas+aseg.deep.mgz"
+    else:
+        aparc_image = "aparc+aseg.mgz"
 
-            #
-            except Exception as e:
-                logging.error("ERROR: surfaces module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                surfaces_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+    # ----------------------------------------------------------------------
+    # add subject to dictionary
 
-            # store data
-            if surfaces_ok:
-                imagesSurfacesDict[subject] = surfaces_outdir
-            else:
-                imagesSurfacesDict[subject] = []
+    metricsDict = {"subject": subject}
+    statusDict = {"subject": subject}
+    imagesDict = dict()
 
-            # store data
-            statusDict[subject].update({"surfaces": surfaces_ok})
+    # ----------------------------------------------------------------------
+    # get manifest records for incremental runs
 
-        # ----------------------------------------------------------------------
-        # run optional modules: skullstrip
+    if manifestRecords is None:
+        manifestRecords = dict()
 
-        if argsDict["skullstrip"] is True or argsDict["skullstrip_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Creating skullstrip evaluation  ...")
-                print("")
-
-                # check / create subject-specific skullstrip_outdir
-                skullstrip_outdir = os.path.join(
-                    argsDict["output_dir"], "skullstrip", subject
-                )
-                if not os.path.isdir(skullstrip_outdir):
-                    os.makedirs(skullstrip_outdir)
-                outfile = os.path.join(skullstrip_outdir, subject + ".png")
-
-                # re-initialize
-                skullstrip_base_subj = list()
-                skullstrip_overlay_subj = list()
-
-                # check skullstrip_base
-                if os.path.isfile(
-                    os.path.join(argsDict["subjects_dir"], subject, "mri", "orig.mgz")
-                ):
-                    skullstrip_base_subj = [
-                        os.path.join(
-                            argsDict["subjects_dir"], subject, "mri", "orig.mgz"
-                        )
-                    ]
-                    logging.info("Using " + "orig.mgz" + " as skullstrip base image")
-                else:
-                    raise FileNotFoundError(
-                        "ERROR: cannot find the skullstrip base file " + "orig.mgz"
-                    )
+    # ----------------------------------------------------------------------
+    # create volume cache, which is shared by all modules for this subject
 
-                # check skullstrip_overlay
-                if os.path.isfile(
-                    os.path.join(
-                        argsDict["subjects_dir"], subject, "mri", "brainmask.mgz"
-                    )
-                ):
-                    skullstrip_overlay_subj = [
-                        os.path.join(
-                            argsDict["subjects_dir"], subject, "mri", "brainmask.mgz"
-                        )
-                    ]
-                    logging.info(
-                        "Using " + "brainmask.mgz" + " as skullstrip overlay image"
-                    )
-                else:
-                    raise FileNotFoundError(
-                        "ERROR: cannot find the skullstrip overlay file "
-                        + "brainmask.mgz"
-                    )
+    if argsDict["volume_cache"] is not None:
+        from fsqc.utils._disk_cache import DiskCache
 
-                # process
-                createScreenshots(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTFILE=outfile,
-                    INTERACTIVE=False,
-                    BASE=skullstrip_base_subj,
-                    OVERLAY=skullstrip_overlay_subj,
-                    SURF=None,
-                    VIEWS=argsDict["screenshots_views"],
-                    LAYOUT=argsDict["screenshots_layout"],
-                    BINARIZE=True,
-                    ORIENTATION=argsDict["screenshots_orientation"],
-                )
+        diskCache = DiskCache(
+            argsDict["volume_cache"],
+            max_size=int(argsDict["volume_cache_size"] * 1024**3),
+            source_dir=argsDict["subjects_dir"],
+        )
+    else:
+        diskCache = None
 
-                # return
-                skullstrip_ok = True
+    volumeCache = VolumeCache(disk_cache=diskCache)
 
-            #
-            except Exception as e:
-                logging.error("ERROR: skullstrip module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                skullstrip_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+    # ----------------------------------------------------------------------
+    # look up previous results of the core metrics and the optional modules;
+    # the others are collected as tasks of a task graph. They do not depend
+    # on each other and can thus run concurrently, as can the parts of a
+    # module (e.g., the hemispheres for the hippocampus module).
 
-            # store data
-            if skullstrip_ok:
-                imagesSkullstripDict[subject] = outfile
-            else:
-                imagesSkullstripDict[subject] = []
+    tasks = dict()
 
-            # store data
-            statusDict[subject].update({"skullstrip": skullstrip_ok})
+    metricsContext = SubjectContext(
+        argsDict["subjects_dir"],
+        subject,
+        aparc_image=aparc_image,
+        volume_cache=volumeCache,
+    )
+    metricsFiles = metricInputs(metricsContext)
+    metricsSettings = {
+        "snr_amount_erosion": SNR_AMOUT_EROSION,
+        "aparc_image": aparc_image,
+    }
+
+    metricsCached = _lookup_module(
+        argsDict,
+        manifestRecords,
+        "metrics",
+        metricsFiles,
+        metricsSettings,
+        metricsDict,
+        statusDict,
+        imagesDict,
+    )
 
-        # ----------------------------------------------------------------------
-        # run optional modules: fornix
+    if metricsCached is None:
+        tasks["metrics"] = Task(
+            functools.partial(
+                computeMetrics,
+                metricsContext,
+                exit_on_error=argsDict["exit_on_error"],
+            ),
+            memory=METRICS_MEMORY,
+        )
 
-        if argsDict["fornix"] is True or argsDict["fornix_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Checking fornix segmentation ...")
-                print("")
-
-                # check / create subject-specific fornix_outdir
-                fornix_outdir = os.path.join(argsDict["output_dir"], "fornix", subject)
-                if not os.path.isdir(fornix_outdir):
-                    os.makedirs(fornix_outdir)
-                fornix_screenshot_outfile = os.path.join(fornix_outdir, "cc.png")
-
-                # process
-                fornixShapeOutput = evaluateFornixSegmentation(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTPUT_DIR=fornix_outdir,
-                    CREATE_SCREENSHOT=FORNIX_SCREENSHOT,
-                    SCREENSHOTS_OUTFILE=fornix_screenshot_outfile,
-                    RUN_SHAPEDNA=FORNIX_SHAPE,
-                    N_EIGEN=FORNIX_N_EIGEN,
-                )
+    modules = list()
 
-                # create a dictionary from fornix shape output
-                fornixShapeDict = {
-                    subject: dict(
-                        zip(
-                            map("fornixShapeEV{:0>3}".format, range(FORNIX_N_EIGEN)),
-                            fornixShapeOutput,
+    for module in enabledModules(argsDict):
+        moduleFiles = module.inputs(
+            argsDict, os.path.join(argsDict["subjects_dir"], subject)
+        )
+        moduleSettings = module.settings(argsDict)
+        # results are stored after the core metrics, in the order of the modules
+        moduleCached = _lookup_module(
+            argsDict,
+            manifestRecords,
+            module.name,
+            moduleFiles,
+            moduleSettings,
+            dict(),
+            dict(),
+            dict(),
+        )
+        modules.append((module, moduleFiles, moduleSettings, moduleCached))
+        if moduleCached is None:
+            tasks.update(_module_tasks(module, subject, argsDict, volumeCache))
+
+    # when modules run concurrently, the longest ones are started first; the
+    # modules that render images with the same (not thread-safe) renderer do
+    # not run at the same time
+
+    if argsDict["module_jobs"] > 1:
+        moduleCpu = {
+            module.name: module.cpu / len(module.parts)
+            for module in enabledModules(argsDict)
+        }
+        tasks = dict(
+            sorted(
+                tasks.items(),
+                key=lambda item: -moduleCpu.get(item[0].split(":")[0], 0.0),
+            )
+        )
+
+    # ----------------------------------------------------------------------
+    # run the task graph, and record the peak memory of each module (of all
+    # its parts) for the admission of subjects in later parallel runs. The
+    # memory of the process is shared by the tasks that run at the same time,
+    # so the peak is only recorded for tasks that ran alone.
+
+    if _track_memory(argsDict):
+        from fsqc.utils._resources import MemoryMonitor, rss
+
+        resourcesDict = {"baseline": rss()}
+        resourcesLock = threading.Lock()
+        runningTasks = dict()
+
+        def _monitored(name, function):
+            def run():
+                key = object()
+                with resourcesLock:
+                    runningTasks[key] = len(runningTasks) > 0
+                    if runningTasks[key]:
+                        runningTasks.update(dict.fromkeys(runningTasks, True))
+                try:
+                    with MemoryMonitor() as monitor:
+                        result = function()
+                finally:
+                    with resourcesLock:
+                        overlapped = runningTasks.pop(key)
+                if not overlapped:
+                    with resourcesLock:
+                        resourcesDict[name] = max(
+                            resourcesDict.get(name, 0.0), monitor.peak
                         )
-                    )
-                }
+                return result
 
-                # return
-                fornix_ok = True
+            return run
 
-            #
-            except Exception as e:
-                fornixShapeDict = {
-                    subject: dict(
-                        zip(
-                            map("fornixShapeEV{:0>3}".format, range(FORNIX_N_EIGEN)),
-                            np.full(FORNIX_N_EIGEN, np.nan),
-                        )
-                    )
-                }
-                logging.error("ERROR: fornix module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                fornix_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+        tasks = {
+            name: task._replace(function=_monitored(name.split(":")[0], task.function))
+            for name, task in tasks.items()
+        }
 
-            # store data
-            if FORNIX_SHAPE:
-                metricsDict[subject].update(fornixShapeDict[subject])
+    else:
+        resourcesDict = None
 
-            # store data
-            if FORNIX_SCREENSHOT and fornix_ok:
-                imagesFornixDict[subject] = fornix_screenshot_outfile
-            else:
-                imagesFornixDict[subject] = []
+    if maxMemory is None and argsDict["max_memory"] is not None:
+        maxMemory = argsDict["max_memory"] * 1024
 
-            # store data
-            statusDict[subject].update({"fornix": fornix_ok})
+    taskResults, taskErrors = run_task_graph(
+        tasks,
+        n_jobs=argsDict["module_jobs"],
+        max_memory=maxMemory,
+        stop_on_error=argsDict["exit_on_error"],
+    )
 
-        # ----------------------------------------------------------------------
-        # run optional modules: hypothalamus
+    if argsDict["exit_on_error"] is True and taskErrors:
+        name = [name for name in tasks if name in taskErrors][0]
+        if name != "metrics":
+            logging.error(
+                "ERROR: " + name.split(":")[0] + " module failed for subject " + subject
+            )
+            logging.error("Reason: " + str(taskErrors[name]))
+        raise taskErrors[name]
 
-        if argsDict["hypothalamus"] is True or argsDict["hypothalamus_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Checking hypothalamus segmentation ...")
-                print("")
-
-                # check / create subject-specific hypothalamus_outdir
-                hypothalamus_outdir = os.path.join(
-                    argsDict["output_dir"], "hypothalamus", subject
-                )
-                if not os.path.isdir(hypothalamus_outdir):
-                    os.makedirs(hypothalamus_outdir)
-                hypothalamus_screenshot_outfile = os.path.join(
-                    hypothalamus_outdir, "hypothalamus.png"
-                )
+    # ----------------------------------------------------------------------
+    # store core metrics
 
-                # process
-                evaluateHypothalamicSegmentation(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTPUT_DIR=hypothalamus_outdir,
-                    CREATE_SCREENSHOT=HYPOTHALAMUS_SCREENSHOT,
-                    SCREENSHOTS_OUTFILE=hypothalamus_screenshot_outfile,
-                    SCREENSHOTS_ORIENTATION=argsDict["screenshots_orientation"],
-                )
+    if metricsCached is None:
+        metricsRecord, metrics_ok = taskResults["metrics"]
 
-                # return
-                hypothalamus_ok = True
+        # store data
+        metricsDict.update(metricsRecord)
 
-            #
-            except Exception as e:
-                logging.error(
-                    "ERROR: hypothalamus module failed for subject " + subject
-                )
-                logging.error("Reason: " + str(e))
-                hypothalamus_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
+        # store data
+        statusDict.update({"metrics": metrics_ok})
+
+        # record results for incremental runs
+        if metrics_ok:
+            _record_module(
+                argsDict,
+                manifestRecords,
+                "metrics",
+                metricsFiles,
+                metricsSettings,
+                metrics={
+                    key: metricsDict[key] for key in metricsDict if key != "subject"
+                },
+            )
 
-            # store data
-            if HYPOTHALAMUS_SCREENSHOT and hypothalamus_ok:
-                imagesHypothalamusDict[subject] = hypothalamus_screenshot_outfile
-            else:
-                imagesHypothalamusDict[subject] = []
+    # ----------------------------------------------------------------------
+    # store optional modules
 
-            # store data
-            statusDict[subject].update({"hypothalamus": hypothalamus_ok})
+    modulesResults = dict()
 
-        # ----------------------------------------------------------------------
-        # run optional modules: hippocampus
+    for module, moduleFiles, moduleSettings, moduleCached in modules:
+        if moduleCached is not None:
+            metricsDict.update(moduleCached["metrics"])
+            statusDict.update(moduleCached["status"])
+            imagesDict.update(moduleCached["images"])
+            modulesResults[module.name] = moduleCached
+        else:
+            modulesResults[module.name] = _store_module(
+                module,
+                subject,
+                argsDict,
+                manifestRecords,
+                moduleFiles,
+                moduleSettings,
+                taskResults,
+                taskErrors,
+                metricsDict,
+                statusDict,
+                imagesDict,
+            )
 
-        if argsDict["hippocampus"] is True or argsDict["hippocampus_html"] is True:
-            #
-            try:
-                # message
-                print("-----------------------------")
-                print("Checking hippocampus segmentation ...")
-                print("")
-
-                # check / create subject-specific hippocampus_outdir
-                hippocampus_outdir = os.path.join(
-                    argsDict["output_dir"], "hippocampus", subject
-                )
-                if not os.path.isdir(hippocampus_outdir):
-                    os.makedirs(hippocampus_outdir)
-                hippocampus_screenshot_outfile_left = os.path.join(
-                    hippocampus_outdir, "hippocampus-left.png"
-                )
-                hippocampus_screenshot_outfile_right = os.path.join(
-                    hippocampus_outdir, "hippocampus-right.png"
-                )
+    # --------------------------------------------------------------------------
+    # release cached volumes
 
-                # process left
-                evaluateHippocampalSegmentation(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTPUT_DIR=hippocampus_outdir,
-                    CREATE_SCREENSHOT=HIPPOCAMPUS_SCREENSHOT,
-                    SCREENSHOTS_OUTFILE=hippocampus_screenshot_outfile_left,
-                    SCREENSHOTS_ORIENTATION=argsDict["screenshots_orientation"],
-                    HEMI="lh",
-                    LABEL=argsDict["hippocampus_label"],
-                )
-                evaluateHippocampalSegmentation(
-                    SUBJECT=subject,
-                    SUBJECTS_DIR=argsDict["subjects_dir"],
-                    OUTPUT_DIR=hippocampus_outdir,
-                    CREATE_SCREENSHOT=HIPPOCAMPUS_SCREENSHOT,
-                    SCREENSHOTS_OUTFILE=hippocampus_screenshot_outfile_right,
-                    SCREENSHOTS_ORIENTATION=argsDict["screenshots_orientation"],
-                    HEMI="rh",
-                    LABEL=argsDict["hippocampus_label"],
-                )
+    volumeCache.clear()
 
-                # return
-                hippocampus_ok = True
+    # --------------------------------------------------------------------------
+    # message
+    logging.info(
+        "Finished subject "
+        + subject
+        + " at "
+        + time.strftime("%Y-%m-%d %H:%M %Z", time.localtime(time.time()))
+    )
 
-            #
-            except Exception as e:
-                logging.error("ERROR: hippocampus module failed for subject " + subject)
-                logging.error("Reason: " + str(e))
-                hippocampus_ok = False
-                if argsDict["exit_on_error"] is True:
-                    raise
-
-            # store data
-            if HIPPOCAMPUS_SCREENSHOT and hippocampus_ok:
-                imagesHippocampusLeftDict[subject] = hippocampus_screenshot_outfile_left
-                imagesHippocampusRightDict[
-                    subject
-                ] = hippocampus_screenshot_outfile_right
-            else:
-                imagesHippocampusLeftDict[subject] = []
-                imagesHippocampusRightDict[subject] = []
+    # --------------------------------------------------------------------------
+    # return
 
-            # store data
-            statusDict[subject].update({"hippocampus": hippocampus_ok})
+    return {
+        "subject": subject,
+        "metrics": metricsDict,
+        "status": statusDict,
+        "images": imagesDict,
+        "shape": (
+            modulesResults["shape"]["metrics"] if "shape" in modulesResults else None
+        ),
+        "fornix_shape": (
+            modulesResults["fornix"]["fornix_shape"]
+            if "fornix" in modulesResults
+            else None
+        ),
+        "manifest": manifestRecords,
+        "resources": resourcesDict,
+    }
 
-        # --------------------------------------------------------------------------
-        # message
+
+# ------------------------------------------------------------------------------
+# _init_worker
+
+
+def _init_worker(logfile):
+    """
+    Initialize logging within a worker process.
+
+    Parameters
+    ----------
+    logfile : str
+        Path to the logfile; can be None.
+
+    Returns
+    -------
+    None
+        This function returns nothing.
+
+    Notes
+    -----
+    Worker processes that were forked from the main process inherit its
+    logging handlers, which are left untouched. Worker processes that were
+    spawned start without handlers; these will be set up in the same way as
+    in `_start_logging`, but appending to the existing logfile.
+    """
+    # imports
+    import logging
+    import sys
+
+    # set up logging if not inherited from the parent process
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format=LOGFILE_FORMAT,
+            handlers=[logging.StreamHandler(sys.stdout)],
+        )
+        if logfile is not None:
+            logging.getLogger().addHandler(
+                logging.FileHandler(filename=logfile, mode="a")
+            )
+
+
+# ------------------------------------------------------------------------------
+# _do_fsqc_parallel
+
+
+def _do_fsqc_parallel(argsDict, manifestRecords, resources, callback=None):
+    """
+    Run the fsqc submodules for several subjects in parallel.
+
+    Subjects are processed in a pool of worker processes. If a memory budget
+    is given (--max-memory), the memory of the main process and of each
+    worker at the start of a subject is reserved first. A subject is then
+    only started when the peak memory of its largest modules that can run
+    concurrently (--module-jobs) fits into the remaining budget along with
+    the subjects that are already running; otherwise, it is queued until
+    enough subjects have finished. The peak memory of the modules is taken
+    from previous runs, if available, or from the estimates of the modules.
+
+    If a worker process is terminated abruptly (e.g., by the system when
+    running out of memory), the unfinished subjects are run again in a new
+    pool with half as many workers.
+
+    With --exit-on-error, the first failing subject stops the processing, and
+    the worker processes of the subjects that are still running are
+    terminated.
+
+    Parameters
+    ----------
+    argsDict : dict
+        Dictionary containing input arguments.
+    manifestRecords : dict
+        Manifest records of previous incremental runs, keyed by subject.
+    resources : ResourceLog
+        Peak memory of the modules in previous runs.
+    callback : callable, optional
+        Function that is called with the results of each subject as soon as
+        the subject has finished.
+
+    Returns
+    -------
+    list of dict
+        Results of `_do_fsqc_subject`, in the order of the subjects.
+    """
+
+    # ------------------------------------------------------------------------------
+    # imports
+
+    import functools
+    import logging
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    from fsqc.fsqcMetrics import METRICS_MEMORY
+    from fsqc.fsqcModules import enabledModules
+    from fsqc.utils._resources import expected_memory, rss
+    from fsqc.utils._scheduler import Task, run_task_graph
+
+    # --------------------------------------------------------------------------
+    # expected peak memory of a subject, in MB
+
+    estimates = [resources.get("metrics", METRICS_MEMORY)]
+    for module in enabledModules(argsDict):
+        estimates.extend(
+            [resources.get(module.name, module.memory)] * len(module.parts)
+        )
+
+    baseline = resources.get("baseline", rss())
+
+    subjectMemory = expected_memory(
+        estimates, baseline=baseline, n_concurrent=argsDict["module_jobs"]
+    )
+
+    # --------------------------------------------------------------------------
+    # memory budget for all subjects and for the modules of each subject; the
+    # memory of the main process and of each idle worker is reserved up front,
+    # and subjects are admitted by the peak memory of their modules
+
+    if argsDict["max_memory"] is None:
+        maxMemory = None
+        tasksMemory = None
+        modulesMemory = None
+    else:
+        maxMemory = argsDict["max_memory"] * 1024
+        tasksMemory = max(maxMemory - (argsDict["n_jobs"] + 1) * baseline, 0.0)
+        modulesMemory = min(subjectMemory - baseline, tasksMemory)
+
+    # --------------------------------------------------------------------------
+    # process
+
+    logging.info(
+        "Processing "
+        + str(len(argsDict["subjects"]))
+        + " subjects using "
+        + str(argsDict["n_jobs"])
+        + " parallel jobs"
+    )
+
+    if maxMemory is not None:
         logging.info(
-            "Finished subject "
-            + subject
-            + " at "
-            + time.strftime("%Y-%m-%d %H:%M %Z", time.localtime(time.time()))
+            "Expected peak memory per subject is "
+            + f"{subjectMemory / 1024:.1f}"
+            + " GB, memory budget is "
+            + f"{maxMemory / 1024:.1f}"
+            + " GB"
+        )
+        if subjectMemory - baseline > tasksMemory:
+            logging.warning(
+                "WARNING: expected peak memory per subject exceeds the memory "
+                + "budget, subjects will be processed one at a time."
+            )
+
+    # subjects whose worker process was terminated abruptly (e.g., by the
+    # system when running out of memory) are run again in a new pool with
+    # fewer workers; if a subject fails on its own, the error is raised
+
+    results = dict()
+    nJobs = argsDict["n_jobs"]
+
+    while len(results) < len(argsDict["subjects"]):
+        tasks = {
+            subject: Task(
+                functools.partial(
+                    _do_fsqc_subject,
+                    subject,
+                    argsDict,
+                    manifestRecords[subject],
+                    modulesMemory,
+                ),
+                memory=subjectMemory - baseline,
+            )
+            for subject in argsDict["subjects"]
+            if subject not in results
+        }
+
+        with ProcessPoolExecutor(
+            max_workers=nJobs,
+            initializer=_init_worker,
+            initargs=(argsDict["logfile"],),
+        ) as executor:
+            # errors stop the processing; apart from broken worker processes,
+            # they can only occur with --exit-on-error
+            poolResults, errors = run_task_graph(
+                tasks,
+                n_jobs=nJobs,
+                max_memory=tasksMemory,
+                stop_on_error=True,
+                executor=executor,
+                callback=None if callback is None else lambda _, r: callback(r),
+            )
+
+            error = [errors[subject] for subject in tasks if subject in errors]
+
+            # with --exit-on-error, the subjects that are still running are
+            # stopped rather than waited for
+            if error and not isinstance(error[0], BrokenProcessPool):
+                if hasattr(executor, "terminate_workers"):
+                    executor.terminate_workers()
+                else:
+                    for process in list(executor._processes.values()):
+                        process.terminate()
+
+        results.update(poolResults)
+
+        if not errors:
+            continue
+
+        if not isinstance(error[0], BrokenProcessPool) or nJobs == 1:
+            raise error[0]
+
+        nJobs = max(nJobs // 2, 1)
+
+        logging.warning(
+            "WARNING: a worker process terminated abruptly while processing "
+            + ", ".join(subject for subject in tasks if subject in errors)
+            + "; processing the remaining "
+            + str(len(argsDict["subjects"]) - len(results))
+            + " subjects using "
+            + str(nJobs)
+            + " parallel jobs."
         )
 
+    return [results[subject] for subject in argsDict["subjects"]]
+
+
+# ------------------------------------------------------------------------------
+# do fsqc
+
+
+def _do_fsqc(argsDict):
+    """
+    Run the FastSurferQC submodules.
+
+    Parameters
+    ----------
+    argsDict : dict
+        Dictionary containing input arguments.
+
+    Returns
+    -------
+    None
+        This function returns nothing.
+    """
+
+    # ------------------------------------------------------------------------------
+    # imports
+
+    import csv
+    import logging
+    import os
+    import time
+
+    import numpy as np
+
+    from fsqc.fsqcSettings import CHECKPOINT_INTERVAL, FORNIX_SHAPE, OUTLIER_N_MIN
+    from fsqc.outlierDetection import outlierDetection, outlierTable
+    from fsqc.utils._norms import NormativeBounds
+
+    # --------------------------------------------------------------------------
+    # process
+
+    # start the processing with a message
+    print("")
+    print("-----------------------------")
+
+    # create metrics dict
+    metricsDict = dict()
+
+    # create images dict
+    imagesScreenshotsDict = dict()
+    imagesSurfacesDict = dict()
+    imagesSkullstripDict = dict()
+    imagesFornixDict = dict()
+    imagesHypothalamusDict = dict()
+    imagesHippocampusLeftDict = dict()
+    imagesHippocampusRightDict = dict()
+
+    # create status dict
+    statusDict = dict()
+
+    # create shape dicts
+    distDict = dict()
+    fornixShapeDict = dict()
+
+    # read manifest of previous runs
+    if argsDict["incremental"] is True:
+        from fsqc.utils._manifest import Manifest
+
+        manifest = Manifest(os.path.join(argsDict["output_dir"], "fsqc-manifest.json"))
+        manifestRecords = {
+            subject: manifest.get(subject) for subject in argsDict["subjects"]
+        }
+    else:
+        manifestRecords = {subject: None for subject in argsDict["subjects"]}
+
+    # read the peak memory of the modules from previous runs
+    if _track_memory(argsDict):
+        from fsqc.utils._resources import ResourceLog
+
+        resources = ResourceLog(argsDict["output_dir"])
+    else:
+        resources = None
+
+    # keep the manifest and the resource log up to date while the subjects are
+    # processed, such that an interrupted run can be resumed
+    lastSave = time.monotonic()
+
+    def _saveProgress():
+        if resources is not None:
+            try:
+                resources.save()
+            except OSError as e:
+                logging.warning(
+                    "WARNING: could not save " + resources.filename + ": " + str(e)
+                )
+        if argsDict["incremental"] is True:
+            manifest.save()
+
+    def _recordSubject(subjectResult):
+        nonlocal lastSave
+        if argsDict["incremental"] is True:
+            manifest.set(subjectResult["subject"], subjectResult["manifest"])
+        if resources is not None:
+            resources.update(subjectResult["resources"])
+        if time.monotonic() - lastSave >= CHECKPOINT_INTERVAL:
+            _saveProgress()
+            lastSave = time.monotonic()
+
+    # loop through the specified subjects, either sequentially or in parallel
+    try:
+        if argsDict["n_jobs"] == 1:
+            subjectResults = list()
+            for subject in argsDict["subjects"]:
+                subjectResults.append(
+                    _do_fsqc_subject(subject, argsDict, manifestRecords[subject])
+                )
+                _recordSubject(subjectResults[-1])
+        else:
+            subjectResults = _do_fsqc_parallel(
+                argsDict, manifestRecords, resources, callback=_recordSubject
+            )
+    finally:
+        _saveProgress()
+
+    # collect results in the order of the subjects
+    for subjectResult in subjectResults:
+        subject = subjectResult["subject"]
+        metricsDict[subject] = subjectResult["metrics"]
+        statusDict[subject] = subjectResult["status"]
+        if subjectResult["shape"] is not None:
+            distDict[subject] = subjectResult["shape"]
+        if subjectResult["fornix_shape"] is not None:
+            fornixShapeDict[subject] = subjectResult["fornix_shape"]
+        for imagesKey, imagesDict in [
+            ("screenshots", imagesScreenshotsDict),
+            ("surfaces", imagesSurfacesDict),
+            ("skullstrip", imagesSkullstripDict),
+            ("fornix", imagesFornixDict),
+            ("hypothalamus", imagesHypothalamusDict),
+            ("hippocampus_left", imagesHippocampusLeftDict),
+            ("hippocampus_right", imagesHippocampusRightDict),
+        ]:
+            if imagesKey in subjectResult["images"]:
+                imagesDict[subject] = subjectResult["images"][imagesKey]
+
+    # --------------------------------------------------------------------------
     # --------------------------------------------------------------------------
     # run optional modules: outlier detection
 
@@ -2266,30 +2780,28 @@ def _do_fsqc(argsDict):
             print("Running outlier detection module ...")
             print("")
 
-            # determine outlier-table and get data
+            # determine outlier-table and get data; csv tables are compiled
+            # once and the compiled bounds are reused in subsequent runs
+            outlier_outdir = os.path.join(argsDict["output_dir"], "outliers")
             if argsDict["outlier_table"] is None:
                 outlierDict = outlierTable()
             else:
-                outlierDict = dict()
-                with open(argsDict["outlier_table"], newline="") as csvfile:
-                    outlierCsv = csv.DictReader(csvfile, delimiter=",")
-                    for row in outlierCsv:
-                        outlierDict.update(
-                            {
-                                row["label"]: {
-                                    "lower": float(row["lower"]),
-                                    "upper": float(row["upper"]),
-                                }
-                            }
-                        )
+                outlierDict = NormativeBounds.from_file(
+                    argsDict["outlier_table"], cache_dir=outlier_outdir
+                )
+
+            # determine strata of subjects for normative values
+            if argsDict["outlier_strata"] is None:
+                outlierStrata = None
+            else:
+                outlierStrata = dict()
+                with open(argsDict["outlier_strata"], newline="") as csvfile:
+                    strataCsv = csv.DictReader(csvfile, delimiter=",")
+                    for row in strataCsv:
+                        outlierStrata.update({row["subject"]: row["stratum"]})
 
             # process
-            outlier_outdir = os.path.join(argsDict["output_dir"], "outliers")
-            (
-                n_outlier_sample_nonpar,
-                n_outlier_sample_param,
-                n_outlier_norms,
-            ) = outlierDetection(
+            outlierResults = outlierDetection(
                 argsDict["subjects"],
                 argsDict["subjects_dir"],
                 outlier_outdir,
@@ -2298,7 +2810,21 @@ def _do_fsqc(argsDict):
                 hypothalamus=argsDict["hypothalamus"],
                 hippocampus=argsDict["hippocampus"],
                 hippocampus_label=argsDict["hippocampus_label"],
+                save_summary=argsDict["outlier_save_summary"],
+                sample_summaries=argsDict["outlier_sample_summaries"],
+                strata=outlierStrata,
+                multivariate=argsDict["outlier_multivariate"],
+                max_memory=(
+                    None
+                    if argsDict["outlier_max_memory"] is None
+                    else int(argsDict["outlier_max_memory"] * 1024**3)
+                ),
             )
+            (
+                n_outlier_sample_nonpar,
+                n_outlier_sample_param,
+                n_outlier_norms,
+            ) = outlierResults[:3]
 
             # create a dictionary from outlier module output
             outlierDict = dict()
@@ -2312,6 +2838,8 @@ def _do_fsqc(argsDict):
                         }
                     }
                 )
+                if argsDict["outlier_multivariate"] is True:
+                    outlierDict[subject].update(outlierResults[3][subject])
 
             # return
             # outlier_ok = True
@@ -2330,6 +2858,13 @@ def _do_fsqc(argsDict):
                         }
                     }
                 )
+                if argsDict["outlier_multivariate"] is True:
+                    outlierDict[subject].update(
+                        {
+                            "outlier_multivariate_distance": np.nan,
+                            "outlier_multivariate_pvalue": np.nan,
+                        }
+                    )
 
             logging.error("ERROR: outlier module failed")
             logging.error("Reason: " + str(e))
@@ -2860,10 +3395,9 @@ def _start_logging(argsDict):
     sys.excepthook = foo
 
     # set up logging
-    logfile_format = "[%(levelname)s: %(filename)s: %(lineno)4d]: %(message)s"
     logfile_handlers = [logging.StreamHandler(sys.stdout)]
     logging.basicConfig(
-        level=logging.INFO, format=logfile_format, handlers=logfile_handlers
+        level=logging.INFO, format=LOGFILE_FORMAT, handlers=logfile_handlers
     )
 
     # check if output directory exists or can be created
@@ -2941,8 +3475,20 @@ def run_fsqc(
     hippocampus_label=None,
     outlier=False,
     outlier_table=None,
+    outlier_multivariate=False,
+    outlier_strata=None,
+    outlier_max_memory=None,
+    outlier_save_summary=False,
+    outlier_sample_summaries=None,
     fastsurfer=False,
     exit_on_error=False,
+    n_jobs=1,
+    module_jobs=1,
+    max_memory=None,
+    incremental=False,
+    incremental_checksums=False,
+    volume_cache=None,
+    volume_cache_size=10,
     logfile=None,
 ):
     """
@@ -3019,12 +3565,71 @@ def run_fsqc(
     outlier : bool, default: False
         Conduct outlier analysis.
     outlier_table : str, default: None
-        Specify custom norms table for outlier analysis.
+        Specify custom norms table for outlier analysis, either as a csv table
+        or as an npz file with compiled norms. The csv table may contain a
+        `stratum` column for stratified norms.
+    outlier_multivariate : bool, default: False
+        Compute robust multivariate outlier scores (Mahalanobis distances and
+        p-values) in addition to the outlier counts.
+    outlier_strata : str, default: None
+        Specify a csv table with `subject` and `stratum` columns that assigns
+        subjects to the strata of the norms table.
+    outlier_max_memory : float, default: None
+        Memory budget for the outlier detection in GB. Larger cohort tables
+        are memory-mapped to temporary files, and processed in blocks. If
+        None, the memory usage is not limited.
+    outlier_save_summary : bool, default: False
+        Save a summary of the sample as fsqc-sample-summary.npz within the
+        outliers subdirectory, which can be merged with the summaries of other
+        runs (see outlier_sample_summaries).
+    outlier_sample_summaries : list of str, default: None
+        Sample summary files (fsqc-sample-summary.npz) of several runs on
+        disjoint subsets of a cohort. If given, sample-based outliers are
+        determined with respect to the merged summaries, i.e. the whole cohort.
     fastsurfer : bool, default: False
         Use FastSurfer instead of FreeSurfer input.
     exit_on_error : bool, default: False
         Exit on error. If False, a warning is thrown and the analysis
-        continues.
+        continues. If True and subjects are processed in parallel, the
+        subjects that are still running are stopped.
+    n_jobs : int, default: 1
+        Number of subjects to process in parallel. If larger than 1, subjects
+        are distributed across a pool of worker processes. If a worker process
+        is terminated abruptly (e.g., when running out of memory), the
+        unfinished subjects are run again with half as many workers.
+    module_jobs : int, default: 1
+        Number of modules of a subject to run concurrently. If larger than 1,
+        the core metrics and the optional modules, which do not depend on each
+        other, run in a pool of threads. The longest modules are started
+        first, and modules that render images with the same renderer
+        (matplotlib or plotly) do not run at the same time.
+    max_memory : float, default: None
+        Memory budget in GB for the modules and subjects that run
+        concurrently. A module or subject is only started if its expected
+        peak memory fits into the budget, and is queued otherwise. The peak
+        memory of the modules that ran alone is recorded in fsqc-resources.json
+        within the output directory (also without a budget if n_jobs or
+        module_jobs is larger than 1), and used as the expected memory in
+        later runs. When
+        processing subjects in parallel, the memory of the main process and
+        of each worker process is reserved from the budget. If None, the
+        memory usage is not limited.
+    incremental : bool, default: False
+        Reuse the results of modules whose input files, settings and fsqc
+        version have not changed since the previous run. Results are recorded
+        in fsqc-manifest.json within the output directory, which is updated
+        while subjects are processed, such that an interrupted run can be
+        resumed.
+    incremental_checksums : bool, default: False
+        Compare checksums instead of file sizes and modification times to
+        detect changed input files (only in conjunction with incremental).
+    volume_cache : str, default: None
+        Directory for caching decompressed image volumes. Cached volumes are
+        memory-mapped instead of being decompressed again in later runs or by
+        parallel jobs.
+    volume_cache_size : float, default: 10
+        Maximum size of the volume cache in GB. If exceeded, the least
+        recently used volumes are removed.
     logfile : str, default: None
         Specify a custom location for the logfile. Default location is the
         output directory.
@@ -3069,8 +3674,20 @@ def run_fsqc(
         argsDict["hippocampus_label"] = hippocampus_label
         argsDict["outlier"] = outlier
         argsDict["outlier_table"] = outlier_table
+        argsDict["outlier_multivariate"] = outlier_multivariate
+        argsDict["outlier_strata"] = outlier_strata
+        argsDict["outlier_max_memory"] = outlier_max_memory
+        argsDict["outlier_save_summary"] = outlier_save_summary
+        argsDict["outlier_sample_summaries"] = outlier_sample_summaries
         argsDict["fastsurfer"] = fastsurfer
         argsDict["exit_on_error"] = exit_on_error
+        argsDict["n_jobs"] = n_jobs
+        argsDict["module_jobs"] = module_jobs
+        argsDict["max_memory"] = max_memory
+        argsDict["incremental"] = incremental
+        argsDict["incremental_checksums"] = incremental_checksums
+        argsDict["volume_cache"] = volume_cache
+        argsDict["volume_cache_size"] = volume_cache_size
         argsDict["logfile"] = logfile
 
     elif (argsDict is not None) and (
@@ -0,0 +1,355 @@
+"""
+This module provides the engine that computes the core metrics of a subject
+
+"""
+
+from typing import Callable, NamedTuple
+
+# ------------------------------------------------------------------------------
+
+
+class SubjectContext:
+    """
+    Inputs of the core metrics of a single subject.
+
+    The context resolves the paths of the input files of a subject, and keeps
+    the inputs that have been loaded or parsed by any of the metrics, such
+    that each file is read at most once, no matter how many metrics use it.
+    Image volumes are kept in a VolumeCache, which may be shared with other
+    modules, and other files are kept as returned by their reader function
+    (e.g., the parsed aseg.stats file). Files are only read when a metric
+    requests them.
+
+    Parameters
+    ----------
+    subjects_dir : str
+        The directory containing subject data.
+    subject : str
+        The name of the subject.
+    aparc_image : str, optional
+        The aparc+aseg image, default is "aparc+aseg.mgz".
+    volume_cache : VolumeCache, optional
+        Cache for the image volumes of the subject, which may be shared with
+        other modules. If None, a new cache is created.
+    """
+
+    def __init__(
+        self, subjects_dir, subject, aparc_image="aparc+aseg.mgz", volume_cache=None
+    ):
+        import os
+
+        from fsqc.fsqcUtils import VolumeCache
+
+        self.subjects_dir = subjects_dir
+        self.subject = subject
+        self.subject_dir = os.path.join(subjects_dir, subject)
+        self.aparc_image = aparc_image
+        self.volume_cache = VolumeCache() if volume_cache is None else volume_cache
+        self._files = dict()
+
+    def path(self, filename):
+        """
+        Get the path of an input file of the subject.
+
+        Parameters
+        ----------
+        filename : str
+            Path relative to the subject directory, e.g. "mri/norm.mgz". The
+            placeholder "{aparc_image}" is replaced with the aparc+aseg image.
+
+        Returns
+        -------
+        str
+            The path of the file.
+        """
+        import os
+
+        filename = filename.format(aparc_image=self.aparc_image)
+
+        return os.path.join(self.subject_dir, *filename.split("/"))
+
+    def load(self, filename):
+        """
+        Load an image volume of the subject, or return it from the cache.
+
+        Parameters
+        ----------
+        filename : str
+            Path relative to the subject directory, see path().
+
+        Returns
+        -------
+        img : nibabel image
+            The image object (header, affine).
+        data : numpy.ndarray
+            The image data in its native data type. Must not be modified
+            in-place, since it is shared among metrics.
+        """
+        return self.volume_cache.load(self.path(filename))
+
+    def read(self, path, reader):
+        """
+        Read an input file of the subject, or return it from the cache.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file, see path().
+        reader : callable
+            Function that reads the file, given its path. The parsed file is
+            kept for each combination of path and reader.
+
+        Returns
+        -------
+        object
+            The return value of the reader. Must not be modified in-place,
+            since it is shared among metrics.
+        """
+        key = (path, reader)
+
+        if key not in self._files:
+            self._files[key] = reader(path)
+
+        return self._files[key]
+
+
+# ------------------------------------------------------------------------------
+
+
+class Metric(NamedTuple):
+    """
+    A registered core metric.
+
+    Attributes
+    ----------
+    name : str
+        Name of the metric, used in error messages.
+    function : callable
+        Function that computes the metric from a SubjectContext, and returns
+        one value per column.
+    columns : dict
+        Names and types (e.g., int or float) of the values.
+    inputs : list of str
+        Input files, relative to the subject directory (see
+        SubjectContext.path()).
+    """
+
+    name: str
+    function: Callable
+    columns: dict
+    inputs: list
+
+
+# registered metrics, in the order of their columns in the results table
+METRICS = list()
+
+# expected peak memory of computing all core metrics in MB
+METRICS_MEMORY = 500
+
+
+def registerMetric(name, columns, inputs):
+    """
+    Register a function as a core metric.
+
+    Parameters
+    ----------
+    name : str
+        Name of the metric, used in error messages.
+    columns : dict
+        Names and types of the values returned by the function. Values are
+        converted to these types, except for missing values (NaN).
+    inputs : list of str
+        Input files, relative to the subject directory (see
+        SubjectContext.path()). Used to detect changed inputs in incremental
+        runs.
+
+    Returns
+    -------
+    callable
+        A decorator that registers the function and returns it unchanged.
+    """
+
+    def decorator(function):
+        METRICS.append(Metric(name, function, dict(columns), list(inputs)))
+        return function
+
+    return decorator
+
+
+def metricInputs(context, metrics=None):
+    """
+    Get the input files of the core metrics of a subject.
+
+    Parameters
+    ----------
+    context : SubjectContext
+        Context of the subject.
+    metrics : list of Metric, optional
+        Metrics to consider, default is all registered metrics.
+
+    Returns
+    -------
+    list of str
+        The paths of the input files, without duplicates.
+    """
+    metrics = METRICS if metrics is None else metrics
+
+    return list(
+        dict.fromkeys(
+            context.path(filename) for metric in metrics for filename in metric.inputs
+        )
+    )
+
+
+def _cast(value, dtype):
+    """Convert a metric value to its type, keeping NaNs and numpy scalars."""
+    import numpy as np
+
+    if isinstance(value, (float, np.floating)) and np.isnan(value):
+        return np.nan
+    if dtype is float and isinstance(value, (float, np.floating)):
+        return value
+    if dtype is int and isinstance(value, (int, np.integer)):
+        return value
+    return dtype(value)
+
+
+def computeMetrics(context, metrics=None, exit_on_error=False):
+    """
+    Compute the core metrics of a subject.
+
+    Parameters
+    ----------
+    context : SubjectContext
+        Context of the subject.
+    metrics : list of Metric, optional
+        Metrics to compute, default is all registered metrics.
+    exit_on_error : bool, optional
+        If True, re-raise errors of individual metrics. Otherwise, errors are
+        logged and the values of the failed metric are NaN. Default is False.
+
+    Returns
+    -------
+    record : dict
+        Values of all columns of the metrics, in registration order.
+    ok : bool
+        True if all metrics were computed successfully.
+    """
+    import logging
+
+    import numpy as np
+
+    metrics = METRICS if metrics is None else metrics
+
+    record = dict()
+    ok = True
+
+    for metric in metrics:
+        try:
+            values = tuple(metric.function(context))
+            if len(values) != len(metric.columns):
+                raise ValueError(
+                    "expected "
+                    + str(len(metric.columns))
+                    + " values, got "
+                    + str(len(values))
+                )
+
+        except Exception as e:
+            logging.error("ERROR: " + metric.name + " failed for " + context.subject)
+            logging.error("Reason: " + str(e))
+            values = (np.nan,) * len(metric.columns)
+            ok = False
+            if exit_on_error is True:
+                raise
+
+        for (column, dtype), value in zip(metric.columns.items(), values):
+            record[column] = _cast(value, dtype)
+
+    return record, ok
+
+
+# ------------------------------------------------------------------------------
+# core metrics
+
+
+@registerMetric(
+    "SNR computation",
+    columns={
+        "wm_snr_orig": float,
+        "gm_snr_orig": float,
+        "wm_snr_norm": float,
+        "gm_snr_norm": float,
+    },
+    inputs=["mri/orig.mgz", "mri/norm.mgz", "mri/aseg.mgz", "mri/{aparc_image}"],
+)
+def _snr(context):
+    from fsqc.checkSNR import checkSNR
+    from fsqc.fsqcSettings import SNR_AMOUT_EROSION
+
+    (wm_snr_orig, gm_snr_orig), (wm_snr_norm, gm_snr_norm) = checkSNR(
+        context.subjects_dir,
+        context.subject,
+        SNR_AMOUT_EROSION,
+        ref_image=["orig.mgz", "norm.mgz"],
+        aparc_image=context.aparc_image,
+        volume_cache=context.volume_cache,
+    )
+
+    return wm_snr_orig, gm_snr_orig, wm_snr_norm, gm_snr_norm
+
+
+@registerMetric(
+    "CC size computation",
+    columns={"cc_size": float},
+    inputs=["stats/aseg.stats"],
+)
+def _ccSize(context):
+    from fsqc.checkCCSize import checkCCSize
+
+    return (checkCCSize(context.subjects_dir, context.subject, read=context.read),)
+
+
+@registerMetric(
+    "Topology check",
+    columns={
+        "holes_lh": int,
+        "holes_rh": int,
+        "defects_lh": int,
+        "defects_rh": int,
+        "topo_lh": float,
+        "topo_rh": float,
+    },
+    inputs=["scripts/recon-all.log"],
+)
+def _topology(context):
+    from fsqc.checkTopology import checkTopology
+
+    return checkTopology(context.subjects_dir, context.subject, read=context.read)
+
+
+@registerMetric(
+    "Contrast check",
+    columns={"con_snr_lh": float, "con_snr_rh": float},
+    inputs=[
+        "surf/lh.w-g.pct.mgh",
+        "surf/rh.w-g.pct.mgh",
+        "label/lh.cortex.label",
+        "label/rh.cortex.label",
+    ],
+)
+def _contrast(context):
+    from fsqc.checkContrast import checkContrast
+
+    return checkContrast(context.subjects_dir, context.subject, read=context.read)
+
+
+@registerMetric(
+    "Rotation",
+    columns={"rot_tal_x": float, "rot_tal_y": float, "rot_tal_z": float},
+    inputs=["mri/transforms/talairach.lta"],
+)
+def _rotation(context):
+    from fsqc.checkRotation import checkRotation
+
+    return checkRotation(context.subjects_dir, context.subject, read=context.read)
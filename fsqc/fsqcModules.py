@@ -0,0 +1,743 @@
+"""
+This module provides the registry of the optional QC modules of fsqc
+
+"""
+
+from typing import Callable, NamedTuple
+
+# ------------------------------------------------------------------------------
+
+
+class QCModule(NamedTuple):
+    """
+    A registered QC module.
+
+    Attributes
+    ----------
+    name : str
+        Name of the module, used for its status and for incremental runs.
+    function : callable
+        Function that runs the module for a single subject. It is called as
+        function(subject, argsDict, outdir, volume_cache), or as
+        function(subject, argsDict, outdir, volume_cache, part) for each part
+        of a module with parts, and returns a dictionary with the metrics
+        ('metrics') and images ('images') of the subject, and any additional
+        results.
+    options : list of str
+        Command-line options that enable the module.
+    message : str
+        Message that is printed when the module is started.
+    outdir : str
+        Output directory of the module, relative to the output directory; a
+        subdirectory for each subject will be created.
+    inputs : callable
+        Function that returns the input files of the module, called as
+        inputs(argsDict, subject_dir).
+    settings : callable
+        Function that returns the settings of the module that affect its
+        results, called as settings(argsDict).
+    outputs : callable
+        Function that returns the output files and directories of the module,
+        called as outputs(outdir, subject).
+    images : list of str
+        Keys of the images of the module.
+    failed : callable or None
+        Function that returns the results of a failed run, called as
+        failed(argsDict). If None, there are no metrics and the images are
+        empty.
+    memory : int
+        Expected peak memory of the module (or of each of its parts) in MB.
+    cpu : float
+        Expected run time of the module in seconds on a single core; when
+        modules run concurrently, the longest ones are started first.
+    renderer : str or None
+        The renderer that the module needs for its images: "matplotlib"
+        (offscreen, Agg backend), "plotly" (offscreen, via an external
+        process), or None if the module does not render images. Since the
+        renderers are not thread-safe, modules with the same renderer do not
+        run at the same time.
+    parts : list
+        Independent parts of the module (e.g., hemispheres), which can run
+        concurrently; their results are merged. [None] if the module has no
+        parts.
+    """
+
+    name: str
+    function: Callable
+    options: list
+    message: str
+    outdir: str
+    inputs: Callable
+    settings: Callable
+    outputs: Callable
+    images: list
+    failed: Callable
+    memory: int
+    cpu: float
+    renderer: str
+    parts: list
+
+    def enabled(self, argsDict):
+        """
+        Check if the module is enabled.
+
+        Parameters
+        ----------
+        argsDict : dict
+            Dictionary containing input arguments.
+
+        Returns
+        -------
+        bool
+            True if any of the options of the module is set.
+        """
+        return any(argsDict[option] is True for option in self.options)
+
+    def failedResult(self, argsDict):
+        """
+        Get the results of a failed run of the module.
+
+        Parameters
+        ----------
+        argsDict : dict
+            Dictionary containing input arguments.
+
+        Returns
+        -------
+        dict
+            Results with empty metrics and images.
+        """
+        if self.failed is not None:
+            return self.failed(argsDict)
+
+        return {"metrics": dict(), "images": {key: [] for key in self.images}}
+
+
+# registered modules, in the order in which they are run
+MODULES = list()
+
+
+def registerModule(
+    name,
+    options,
+    message,
+    inputs,
+    settings,
+    outputs,
+    outdir=None,
+    images=(),
+    failed=None,
+    memory=500,
+    cpu=10.0,
+    renderer=None,
+    parts=None,
+):
+    """
+    Register a function as a QC module.
+
+    Parameters
+    ----------
+    name : str
+        Name of the module.
+    options : list of str
+        Command-line options that enable the module.
+    message : str
+        Message that is printed when the module is started.
+    inputs : callable
+        Function that returns the input files, see QCModule.
+    settings : callable
+        Function that returns the settings, see QCModule.
+    outputs : callable
+        Function that returns the output files and directories, see QCModule.
+    outdir : str, optional
+        Output directory of the module, default is the name of the module.
+    images : list of str, optional
+        Keys of the images of the module.
+    failed : callable, optional
+        Function that returns the results of a failed run, see QCModule.
+    memory : int, optional
+        Expected peak memory in MB, default is 500.
+    cpu : float, optional
+        Expected run time in seconds, default is 10.
+    renderer : str, optional
+        Renderer that the module needs, see QCModule; default is None.
+    parts : list, optional
+        Independent parts of the module, see QCModule; default is None.
+
+    Returns
+    -------
+    callable
+        A decorator that registers the function and returns it unchanged.
+    """
+
+    def decorator(function):
+        MODULES.append(
+            QCModule(
+                name=name,
+                function=function,
+                options=list(options),
+                message=message,
+                outdir=name if outdir is None else outdir,
+                inputs=inputs,
+                settings=settings,
+                outputs=outputs,
+                images=list(images),
+                failed=failed,
+                memory=memory,
+                cpu=cpu,
+                renderer=renderer,
+                parts=[None] if parts is None else list(parts),
+            )
+        )
+        return function
+
+    return decorator
+
+
+def enabledModules(argsDict):
+    """
+    Get the modules that are enabled by the input arguments.
+
+    Parameters
+    ----------
+    argsDict : dict
+        Dictionary containing input arguments.
+
+    Returns
+    -------
+    list of QCModule
+        The enabled modules, in registration order.
+    """
+    return [module for module in MODULES if module.enabled(argsDict)]
+
+
+def _paths(directory, *filenames):
+    """Get the paths of files, given relative to a directory with "/"."""
+    import os
+
+    return [os.path.join(directory, *filename.split("/")) for filename in filenames]
+
+
+def _findInput(filename, subjects_dir, subject, subdir, description):
+    """Find a user-specified input file, given with or without path."""
+    import logging
+    import os
+
+    if os.path.isfile(filename):
+        path = filename
+    elif os.path.isfile(os.path.join(subjects_dir, subject, subdir, filename)):
+        path = os.path.join(subjects_dir, subject, subdir, filename)
+    else:
+        raise FileNotFoundError(
+            "ERROR: cannot find the " + description + " file " + filename
+        )
+
+    logging.info("Using " + path + " as " + description)
+
+    return path
+
+
+# ------------------------------------------------------------------------------
+# shape analysis
+
+
+def _shapeSettings(argsDict):
+    from fsqc.fsqcSettings import (
+        SHAPE_ASYMMETRY,
+        SHAPE_EVEC,
+        SHAPE_NORM,
+        SHAPE_NUM,
+        SHAPE_REWEIGHT,
+        SHAPE_SKIPCORTEX,
+    )
+
+    return {
+        "evec": SHAPE_EVEC,
+        "skipcortex": SHAPE_SKIPCORTEX,
+        "num": SHAPE_NUM,
+        "norm": SHAPE_NORM,
+        "reweight": SHAPE_REWEIGHT,
+        "asymmetry": SHAPE_ASYMMETRY,
+    }
+
+
+@registerModule(
+    "shape",
+    options=["shape"],
+    message="Running brainPrint analysis ...",
+    outdir="brainprint",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir,
+        "surf/lh.white",
+        "surf/rh.white",
+        "surf/lh.pial",
+        "surf/rh.pial",
+        "mri/aseg.mgz",
+        "mri/norm.mgz",
+    ),
+    settings=_shapeSettings,
+    outputs=lambda outdir, subject: [outdir],
+    memory=2000,
+    cpu=300.0,
+)
+def _shape(subject, argsDict, outdir, volume_cache):
+    from pathlib import Path
+
+    # compute brainprint (will also compute shapeDNA)
+    import brainprint
+
+    settings = _shapeSettings(argsDict)
+
+    # run brainPrint
+    evMat, evecMat, dstMat = brainprint.brainprint.run_brainprint(
+        subjects_dir=argsDict["subjects_dir"],
+        subject_id=subject,
+        destination=Path(outdir),
+        keep_eigenvectors=settings["evec"],
+        skip_cortex=settings["skipcortex"],
+        num=settings["num"],
+        norm=settings["norm"],
+        reweight=settings["reweight"],
+        asymmetry=settings["asymmetry"],
+    )
+
+    # get a subset of the brainprint results
+    return {"metrics": dstMat, "images": dict()}
+
+
+# ------------------------------------------------------------------------------
+# screenshots
+
+
+def _screenshotsInputs(argsDict, subject_dir):
+    import os
+
+    files = _paths(
+        subject_dir,
+        "mri/norm.mgz",
+        "mri/aseg.mgz",
+        "surf/lh.white",
+        "surf/rh.white",
+        "surf/lh.pial",
+        "surf/rh.pial",
+    )
+
+    # user-specified images can be given with or without path
+    for filename in (
+        argsDict["screenshots_base"]
+        + (argsDict["screenshots_overlay"] or [])
+        + (argsDict["screenshots_surf"] or [])
+    ):
+        if filename != "default":
+            files += [
+                filename,
+                os.path.join(subject_dir, "mri", filename),
+                os.path.join(subject_dir, "surf", filename),
+            ]
+
+    return files
+
+
+@registerModule(
+    "screenshots",
+    options=["screenshots", "screenshots_html"],
+    message="Creating screenshots ...",
+    inputs=_screenshotsInputs,
+    settings=lambda argsDict: {
+        "base": argsDict["screenshots_base"],
+        "overlay": argsDict["screenshots_overlay"],
+        "surf": argsDict["screenshots_surf"],
+        "views": argsDict["screenshots_views"],
+        "layout": argsDict["screenshots_layout"],
+        "orientation": argsDict["screenshots_orientation"],
+    },
+    outputs=lambda outdir, subject: _paths(outdir, subject + ".png"),
+    images=["screenshots"],
+    memory=1500,
+    cpu=30.0,
+    renderer="matplotlib",
+)
+def _screenshots(subject, argsDict, outdir, volume_cache):
+    import logging
+    import os
+
+    from fsqc.createScreenshots import createScreenshots
+
+    outfile = os.path.join(outdir, subject + ".png")
+
+    # check screenshots_base
+    if argsDict["screenshots_base"][0] == "default":
+        screenshots_base_subj = argsDict["screenshots_base"]
+        logging.info("Using default for screenshot base image")
+    else:
+        screenshots_base_subj = [
+            _findInput(
+                argsDict["screenshots_base"][0],
+                argsDict["subjects_dir"],
+                subject,
+                "mri",
+                "screenshots base",
+            )
+        ]
+
+    # check screenshots_overlay
+    if argsDict["screenshots_overlay"] is None:
+        screenshots_overlay_subj = None
+    elif argsDict["screenshots_overlay"][0] == "default":
+        screenshots_overlay_subj = argsDict["screenshots_overlay"]
+        logging.info("Using default for screenshot overlay image")
+    else:
+        screenshots_overlay_subj = [
+            _findInput(
+                argsDict["screenshots_overlay"][0],
+                argsDict["subjects_dir"],
+                subject,
+                "mri",
+                "screenshots overlay",
+            )
+        ]
+
+    # check screenshots_surf
+    if argsDict["screenshots_surf"] is None:
+        screenshots_surf_subj = None
+    else:
+        screenshots_surf_subj = list()
+        for screenshots_surf_i in argsDict["screenshots_surf"]:
+            if screenshots_surf_i == "default":
+                logging.info("Using default for screenshot surface")
+            else:
+                screenshots_surf_i = _findInput(
+                    screenshots_surf_i,
+                    argsDict["subjects_dir"],
+                    subject,
+                    "surf",
+                    "screenshots surface",
+                )
+            screenshots_surf_subj.append(screenshots_surf_i)
+
+    # process
+    createScreenshots(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        OUTFILE=outfile,
+        INTERACTIVE=False,
+        BASE=screenshots_base_subj,
+        OVERLAY=screenshots_overlay_subj,
+        SURF=screenshots_surf_subj,
+        VIEWS=argsDict["screenshots_views"],
+        LAYOUT=argsDict["screenshots_layout"],
+        ORIENTATION=argsDict["screenshots_orientation"],
+        VOLUME_CACHE=volume_cache,
+    )
+
+    return {"metrics": dict(), "images": {"screenshots": outfile}}
+
+
+# ------------------------------------------------------------------------------
+# surface plots
+
+
+def _surfacesAnnot(argsDict):
+    if argsDict["fastsurfer"] is True:
+        return "aparc.DKTatlas.annot"
+    else:
+        return "aparc.annot"
+
+
+@registerModule(
+    "surfaces",
+    options=["surfaces", "surfaces_html"],
+    message="Creating surface plots ...",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir,
+        "surf/lh.pial",
+        "surf/rh.pial",
+        "surf/lh.inflated",
+        "surf/rh.inflated",
+        "label/lh." + _surfacesAnnot(argsDict),
+        "label/rh." + _surfacesAnnot(argsDict),
+    ),
+    settings=lambda argsDict: {"views": argsDict["surfaces_views"]},
+    outputs=lambda outdir, subject: [outdir],
+    images=["surfaces"],
+    memory=1000,
+    cpu=60.0,
+    renderer="plotly",
+)
+def _surfaces(subject, argsDict, outdir, volume_cache):
+    from fsqc.createSurfacePlots import createSurfacePlots
+
+    createSurfacePlots(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        SURFACES_OUTDIR=outdir,
+        VIEWS=argsDict["surfaces_views"],
+        FASTSURFER=argsDict["fastsurfer"],
+    )
+
+    return {"metrics": dict(), "images": {"surfaces": outdir}}
+
+
+# ------------------------------------------------------------------------------
+# skullstrip
+
+
+@registerModule(
+    "skullstrip",
+    options=["skullstrip", "skullstrip_html"],
+    message="Creating skullstrip evaluation  ...",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir, "mri/orig.mgz", "mri/brainmask.mgz"
+    ),
+    settings=lambda argsDict: {
+        "views": argsDict["screenshots_views"],
+        "layout": argsDict["screenshots_layout"],
+        "orientation": argsDict["screenshots_orientation"],
+    },
+    outputs=lambda outdir, subject: _paths(outdir, subject + ".png"),
+    images=["skullstrip"],
+    memory=1000,
+    cpu=20.0,
+    renderer="matplotlib",
+)
+def _skullstrip(subject, argsDict, outdir, volume_cache):
+    import logging
+    import os
+
+    from fsqc.createScreenshots import createScreenshots
+
+    outfile = os.path.join(outdir, subject + ".png")
+
+    # check skullstrip base and overlay
+    skullstrip_files = list()
+    for filename, description in [("orig.mgz", "base"), ("brainmask.mgz", "overlay")]:
+        path = os.path.join(argsDict["subjects_dir"], subject, "mri", filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(
+                "ERROR: cannot find the skullstrip " + description + " file " + filename
+            )
+        logging.info("Using " + filename + " as skullstrip " + description + " image")
+        skullstrip_files.append(path)
+
+    # process
+    createScreenshots(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        OUTFILE=outfile,
+        INTERACTIVE=False,
+        BASE=[skullstrip_files[0]],
+        OVERLAY=[skullstrip_files[1]],
+        SURF=None,
+        VIEWS=argsDict["screenshots_views"],
+        LAYOUT=argsDict["screenshots_layout"],
+        BINARIZE=True,
+        ORIENTATION=argsDict["screenshots_orientation"],
+        VOLUME_CACHE=volume_cache,
+    )
+
+    return {"metrics": dict(), "images": {"skullstrip": outfile}}
+
+
+# ------------------------------------------------------------------------------
+# fornix
+
+
+def _fornixShape(values):
+    from fsqc.fsqcSettings import FORNIX_N_EIGEN
+
+    return dict(zip(map("fornixShapeEV{:0>3}".format, range(FORNIX_N_EIGEN)), values))
+
+
+def _fornixFailed(argsDict):
+    import numpy as np
+
+    from fsqc.fsqcSettings import FORNIX_N_EIGEN, FORNIX_SHAPE
+
+    fornixShape = _fornixShape(np.full(FORNIX_N_EIGEN, np.nan))
+
+    return {
+        "metrics": fornixShape if FORNIX_SHAPE else dict(),
+        "images": {"fornix": []},
+        "fornix_shape": fornixShape,
+    }
+
+
+def _fornixSettings(argsDict):
+    from fsqc.fsqcSettings import FORNIX_N_EIGEN, FORNIX_SCREENSHOT, FORNIX_SHAPE
+
+    return {
+        "screenshot": FORNIX_SCREENSHOT,
+        "shape": FORNIX_SHAPE,
+        "n_eigen": FORNIX_N_EIGEN,
+    }
+
+
+@registerModule(
+    "fornix",
+    options=["fornix", "fornix_html"],
+    message="Checking fornix segmentation ...",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir, "mri/transforms/cc_up.lta", "mri/aseg.mgz", "mri/norm.mgz"
+    ),
+    settings=_fornixSettings,
+    outputs=lambda outdir, subject: [outdir],
+    images=["fornix"],
+    failed=_fornixFailed,
+    memory=1500,
+    cpu=30.0,
+    renderer="matplotlib",
+)
+def _fornix(subject, argsDict, outdir, volume_cache):
+    import os
+
+    from fsqc.evaluateFornixSegmentation import evaluateFornixSegmentation
+    from fsqc.fsqcSettings import FORNIX_N_EIGEN, FORNIX_SCREENSHOT, FORNIX_SHAPE
+
+    fornix_screenshot_outfile = os.path.join(outdir, "cc.png")
+
+    # process
+    fornixShapeOutput = evaluateFornixSegmentation(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        OUTPUT_DIR=outdir,
+        CREATE_SCREENSHOT=FORNIX_SCREENSHOT,
+        SCREENSHOTS_OUTFILE=fornix_screenshot_outfile,
+        RUN_SHAPEDNA=FORNIX_SHAPE,
+        N_EIGEN=FORNIX_N_EIGEN,
+        VOLUME_CACHE=volume_cache,
+    )
+
+    # create a dictionary from fornix shape output
+    fornixShape = _fornixShape(fornixShapeOutput)
+
+    return {
+        "metrics": fornixShape if FORNIX_SHAPE else dict(),
+        "images": {"fornix": fornix_screenshot_outfile if FORNIX_SCREENSHOT else []},
+        "fornix_shape": fornixShape,
+    }
+
+
+# ------------------------------------------------------------------------------
+# hypothalamus
+
+
+def _hypothalamusSettings(argsDict):
+    from fsqc.fsqcSettings import HYPOTHALAMUS_SCREENSHOT
+
+    return {
+        "screenshot": HYPOTHALAMUS_SCREENSHOT,
+        "orientation": argsDict["screenshots_orientation"],
+    }
+
+
+@registerModule(
+    "hypothalamus",
+    options=["hypothalamus", "hypothalamus_html"],
+    message="Checking hypothalamus segmentation ...",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir, "mri/norm.mgz", "mri/hypothalamic_subunits_seg.v1.mgz"
+    ),
+    settings=_hypothalamusSettings,
+    outputs=lambda outdir, subject: [outdir],
+    images=["hypothalamus"],
+    memory=800,
+    cpu=15.0,
+    renderer="matplotlib",
+)
+def _hypothalamus(subject, argsDict, outdir, volume_cache):
+    import os
+
+    from fsqc.evaluateHypothalamicSegmentation import evaluateHypothalamicSegmentation
+    from fsqc.fsqcSettings import HYPOTHALAMUS_SCREENSHOT
+
+    hypothalamus_screenshot_outfile = os.path.join(outdir, "hypothalamus.png")
+
+    # process
+    evaluateHypothalamicSegmentation(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        OUTPUT_DIR=outdir,
+        CREATE_SCREENSHOT=HYPOTHALAMUS_SCREENSHOT,
+        SCREENSHOTS_OUTFILE=hypothalamus_screenshot_outfile,
+        SCREENSHOTS_ORIENTATION=argsDict["screenshots_orientation"],
+        VOLUME_CACHE=volume_cache,
+    )
+
+    return {
+        "metrics": dict(),
+        "images": {
+            "hypothalamus": (
+                hypothalamus_screenshot_outfile if HYPOTHALAMUS_SCREENSHOT else []
+            )
+        },
+    }
+
+
+# ------------------------------------------------------------------------------
+# hippocampus
+
+
+def _hippocampusSettings(argsDict):
+    from fsqc.fsqcSettings import HIPPOCAMPUS_SCREENSHOT
+
+    return {
+        "screenshot": HIPPOCAMPUS_SCREENSHOT,
+        "orientation": argsDict["screenshots_orientation"],
+        "label": argsDict["hippocampus_label"],
+    }
+
+
+@registerModule(
+    "hippocampus",
+    options=["hippocampus", "hippocampus_html"],
+    message="Checking hippocampus segmentation ...",
+    inputs=lambda argsDict, subject_dir: _paths(
+        subject_dir,
+        "mri/norm.mgz",
+        *[
+            "mri/"
+            + hemi
+            + ".hippoAmygLabels-"
+            + argsDict["hippocampus_label"]
+            + ".FSvoxelSpace.mgz"
+            for hemi in ["lh", "rh"]
+        ],
+    ),
+    settings=_hippocampusSettings,
+    outputs=lambda outdir, subject: [outdir],
+    images=["hippocampus_left", "hippocampus_right"],
+    memory=600,
+    cpu=20.0,
+    renderer="matplotlib",
+    parts=["lh", "rh"],
+)
+def _hippocampus(subject, argsDict, outdir, volume_cache, part):
+    import os
+
+    from fsqc.evaluateHippocampalSegmentation import evaluateHippocampalSegmentation
+    from fsqc.fsqcSettings import HIPPOCAMPUS_SCREENSHOT
+
+    side = {"lh": "left", "rh": "right"}[part]
+
+    hippocampus_screenshot_outfile = os.path.join(
+        outdir, "hippocampus-" + side + ".png"
+    )
+
+    evaluateHippocampalSegmentation(
+        SUBJECT=subject,
+        SUBJECTS_DIR=argsDict["subjects_dir"],
+        OUTPUT_DIR=outdir,
+        CREATE_SCREENSHOT=HIPPOCAMPUS_SCREENSHOT,
+        SCREENSHOTS_OUTFILE=hippocampus_screenshot_outfile,
+        SCREENSHOTS_ORIENTATION=argsDict["screenshots_orientation"],
+        HEMI=part,
+        LABEL=argsDict["hippocampus_label"],
+        VOLUME_CACHE=volume_cache,
+    )
+
+    if HIPPOCAMPUS_SCREENSHOT:
+        images = {"hippocampus_" + side: hippocampus_screenshot_outfile}
+    else:
+        images = {"hippocampus_" + side: []}
+
+    return {"metrics": dict(), "images": images}
@@ -0,0 +1,26 @@
+"""
+This module provides the internal settings of the fsqc package.
+
+These settings are shared by the main module, the core metrics and the
+optional modules, and might be turned into command-line arguments in the
+future.
+"""
+
+SNR_AMOUT_EROSION = 3
+FORNIX_SCREENSHOT = True
+FORNIX_SHAPE = False
+FORNIX_N_EIGEN = 15
+HYPOTHALAMUS_SCREENSHOT = True
+HIPPOCAMPUS_SCREENSHOT = True
+OUTLIER_N_MIN = 5
+
+# minimum time in seconds between two saves of the manifest and the resource
+# log while subjects are processed
+CHECKPOINT_INTERVAL = 60
+
+SHAPE_EVEC = False
+SHAPE_SKIPCORTEX = False
+SHAPE_NUM = 50
+SHAPE_NORM = "geometry"
+SHAPE_REWEIGHT = True
+SHAPE_ASYMMETRY = True
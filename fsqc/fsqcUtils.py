@@ -4,6 +4,9 @@ This module provides various import/export functions as well as the
 
 """
 
+import functools
+from typing import NamedTuple
+
 # ------------------------------------------------------------------------------
 
 
@@ -14,21 +17,24 @@ def importMGH(filename):
     Parameters
     ----------
     filename : str
-        Path to the MGH file.
+        Path to the MGH file. Can be uncompressed (.mgh) or gzip-compressed
+        (.mgz, .mgh.gz).
 
     Returns
     -------
     vol : numpy.ndarray
-        3D array containing vol values.
+        Array containing vol values in the data type of the file. Singleton
+        dimensions are removed. For uncompressed files, this is a read-only,
+        memory-mapped view of the file.
 
     Notes
     -----
     Requires a valid MGH file. If not found, NaNs will be returned.
     """
 
+    import gzip
     import logging
     import os
-    import struct
     import warnings
 
     import numpy
@@ -39,47 +45,58 @@ def importMGH(filename):
         warnings.warn("WARNING: could not find " + filename + ", returning NaNs")
         return numpy.nan
 
-    fp = open(filename, "rb")
-    intsize = struct.calcsize(">i")
-    shortsize = struct.calcsize(">h")
-    floatsize = struct.calcsize(">f")
-    charsize = struct.calcsize(">b")
-
-    # v = struct.unpack(">i", fp.read(intsize))[0]
-    fp.read(intsize)
-    ndim1 = struct.unpack(">i", fp.read(intsize))[0]
-    ndim2 = struct.unpack(">i", fp.read(intsize))[0]
-    ndim3 = struct.unpack(">i", fp.read(intsize))[0]
-    nframes = struct.unpack(">i", fp.read(intsize))[0]
-    # vtype = struct.unpack(">i", fp.read(intsize))[0]
-    # dof = struct.unpack(">i", fp.read(intsize))[0]
-    fp.read(intsize * 2)
-
-    UNUSED_SPACE_SIZE = 256
-    USED_SPACE_SIZE = (3 * 4) + (4 * 3 * 4)  # space for ras transform
-    unused_space_size = UNUSED_SPACE_SIZE - 2
-
-    ras_good_flag = struct.unpack(">h", fp.read(shortsize))[0]
-    if ras_good_flag:
-        # We read these in but don't process them
-        # as we just want to move to the volume data
-        # delta = struct.unpack(">fff", fp.read(floatsize * 3))
-        # Mdc = struct.unpack(">fffffffff", fp.read(floatsize * 9))
-        # Pxyz_c = struct.unpack(">fff", fp.read(floatsize * 3))
-        fp.read(floatsize * 15)
-
-    unused_space_size = unused_space_size - USED_SPACE_SIZE
-
-    for i in range(unused_space_size):
-        struct.unpack(">b", fp.read(charsize))[0]
-
-    nv = ndim1 * ndim2 * ndim3 * nframes
-    vol = numpy.frombuffer(fp.read(floatsize * nv), dtype=numpy.float32).byteswap()
-
-    # nvert = max([ndim1, ndim2, ndim3])
-    vol = numpy.reshape(vol, (ndim1, ndim2, ndim3, nframes), order="F")
+    # the MGH header has a fixed size of 284 bytes and is followed by the data;
+    # the RAS information is part of the header even if it is not valid
+    header_dtype = numpy.dtype(
+        [
+            ("version", ">i4"),
+            ("dims", ">i4", (4,)),
+            ("type", ">i4"),
+            ("dof", ">i4"),
+            ("goodRASFlag", ">i2"),
+            ("delta", ">f4", (3,)),
+            ("Mdc", ">f4", (3, 3)),
+            ("Pxyz_c", ">f4", (3,)),
+            ("unused", "u1", (194,)),
+        ]
+    )
+
+    # MGH data types
+    data_dtypes = {0: ">u1", 1: ">i4", 3: ">f4", 4: ">i2"}
+
+    if filename.endswith((".mgz", ".gz")):
+        with gzip.open(filename, "rb") as fp:
+            buffer = fp.read()
+        header = numpy.frombuffer(buffer, dtype=header_dtype, count=1)[0]
+    else:
+        header = numpy.fromfile(filename, dtype=header_dtype, count=1)[0]
+
+    if header["type"] not in data_dtypes:
+        raise ValueError(
+            "ERROR: unknown data type " + str(header["type"]) + " in " + filename
+        )
+    data_dtype = numpy.dtype(data_dtypes[header["type"]])
+    shape = tuple(int(x) for x in header["dims"])
+
+    if filename.endswith((".mgz", ".gz")):
+        vol = numpy.frombuffer(
+            buffer,
+            dtype=data_dtype,
+            count=int(numpy.prod(shape)),
+            offset=header_dtype.itemsize,
+        )
+        vol = numpy.reshape(vol, shape, order="F")
+    else:
+        vol = numpy.memmap(
+            filename,
+            dtype=data_dtype,
+            mode="r",
+            offset=header_dtype.itemsize,
+            shape=shape,
+            order="F",
+        )
+
     vol = numpy.squeeze(vol)
-    fp.close()
 
     return vol
 
@@ -87,7 +104,289 @@ def importMGH(filename):
 # ------------------------------------------------------------------------------
 
 
-def binarizeImage(img_file, out_file, match=None):
+class VolumeCache:
+    """
+    A cache for image volumes of a single subject.
+
+    Each file is loaded at most once and its data is kept in the native data
+    type of the file (e.g., uint8 for norm.mgz and int32 for aseg.mgz), i.e.
+    without conversion to float64. Files are identified by their absolute
+    path; a file that was modified after it was cached (e.g., an intermediate
+    file that was re-written by a module) will be reloaded.
+
+    The cache is meant to be created at the start of processing a subject,
+    passed on to the individual modules, and cleared when the subject has
+    been processed. It can be shared by modules that run concurrently in
+    several threads; each file is then still loaded only once, while
+    different files can be loaded at the same time.
+
+    Parameters
+    ----------
+    disk_cache : DiskCache, optional
+        On-disk cache of decompressed volumes, which is shared across
+        subjects, processes, and runs. Compressed files are loaded from it
+        (memory-mapped) if available, and added to it otherwise.
+    """
+
+    def __init__(self, disk_cache=None):
+        import threading
+
+        self._volumes = dict()
+        self._masks = dict()
+        self._disk_cache = disk_cache
+        self._lock = threading.Lock()
+        self._key_locks = dict()
+
+    def _keyLock(self, key):
+        """Get the lock for loading a file or computing a mask."""
+        import threading
+
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def load(self, filename):
+        """
+        Load an image volume, or return it from the cache.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the image file.
+
+        Returns
+        -------
+        img : nibabel image
+            The image object (header, affine).
+        data : numpy.ndarray
+            The image data in its native data type. The array is read-only,
+            since it is shared among modules.
+        """
+        import os
+
+        import nibabel as nb
+        import numpy as np
+
+        key = os.path.abspath(filename)
+        stat = os.stat(key)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+
+        with self._keyLock(key):
+            if key not in self._volumes or self._volumes[key][0] != stamp:
+                # loading the image object only reads the header
+                img = nb.load(key)
+                if self._disk_cache is not None and self._disk_cache.is_cacheable(key):
+                    data = self._disk_cache.load(key)
+                    if data is None:
+                        data = np.asanyarray(img.dataobj)
+                        self._disk_cache.save(key, data)
+                else:
+                    data = np.asanyarray(img.dataobj)
+                # shared among modules, so in-place modifications must fail
+                data.setflags(write=False)
+                self._volumes[key] = (stamp, img, data)
+
+            return self._volumes[key][1], self._volumes[key][2]
+
+    def loadLabelMask(self, filename, labels):
+        """
+        Create a binary mask of a set of labels, or return it from the cache.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the segmentation file.
+        labels : array-like
+            Labels to include in the mask.
+
+        Returns
+        -------
+        mask : numpy.ndarray
+            Boolean mask of the labels. The array is read-only, since it is
+            shared among modules.
+        """
+        import os
+
+        img, data = self.load(filename)
+
+        key = (os.path.abspath(filename), tuple(sorted(labels)))
+
+        # the mask is recomputed if the segmentation was reloaded
+        with self._keyLock(key):
+            if key not in self._masks or self._masks[key][0] is not data:
+                mask = labelMask(data, labels)
+                mask.setflags(write=False)
+                self._masks[key] = (data, mask)
+
+            return self._masks[key][1]
+
+    def clear(self):
+        """
+        Remove all image volumes and label masks from the cache.
+        """
+        with self._lock:
+            self._volumes.clear()
+            self._masks.clear()
+            self._key_locks.clear()
+
+
+def loadVolume(filename, volume_cache=None):
+    """
+    Load an image volume, optionally using a volume cache.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the image file.
+    volume_cache : VolumeCache, optional
+        Cache to load the image from. If None, the image is read from disk.
+
+    Returns
+    -------
+    img : nibabel image
+        The image object (header, affine).
+    data : numpy.ndarray
+        The image data in its native data type.
+    """
+    import nibabel as nb
+    import numpy as np
+
+    if volume_cache is not None:
+        return volume_cache.load(filename)
+
+    img = nb.load(filename)
+
+    return img, np.asanyarray(img.dataobj)
+
+
+def labelMask(data, labels):
+    """
+    Create a binary mask of a set of labels.
+
+    Instead of comparing the data to each label, the mask is obtained from a
+    boolean lookup table that is indexed by the label values, which requires
+    a single pass over the data irrespective of the number of labels.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Segmentation with non-negative integer labels.
+    labels : array-like
+        Labels to include in the mask.
+
+    Returns
+    -------
+    mask : numpy.ndarray
+        Boolean mask with the same shape as data.
+    """
+    import numpy as np
+
+    labels = np.asarray(labels, dtype=np.intp)
+
+    # the last entry of the lookup table is False, and larger values in the
+    # data are clipped to it
+    lut = np.zeros(labels.max() + 2, dtype=bool)
+    lut[labels] = True
+
+    if not np.issubdtype(data.dtype, np.integer):
+        data = data.astype(np.intp)
+
+    return np.take(lut, data, mode="clip")
+
+
+def erodeMask(mask, size):
+    """
+    Erode a binary mask with a cube-shaped structuring element.
+
+    The erosion is restricted to the bounding box of the mask (plus a margin)
+    and is computed as successive 1D erosions, one along each axis. The
+    result is identical to an erosion of the full mask with a size x size x
+    size cube, with voxels outside of the image being considered as part of
+    the mask (as in skimage.morphology.binary_erosion).
+
+    Parameters
+    ----------
+    mask : numpy.ndarray
+        3D binary mask.
+    size : int
+        Edge length of the cube.
+
+    Returns
+    -------
+    eroded : numpy.ndarray
+        Eroded boolean mask with the same shape as mask.
+    """
+    import numpy as np
+
+    mask = np.asarray(mask, dtype=bool)
+    eroded = np.zeros(mask.shape, dtype=bool)
+
+    if not mask.any() or size <= 1:
+        eroded[mask] = True
+        return eroded
+
+    # get bounding box, extended by the size of the structuring element, such
+    # that the border of the cropped mask is only considered as part of the
+    # mask where it coincides with the border of the image
+    bbox = list()
+    for axis in range(mask.ndim):
+        idx = np.flatnonzero(
+            mask.any(axis=tuple(i for i in range(mask.ndim) if i != axis))
+        )
+        bbox.append(
+            slice(max(idx[0] - size, 0), min(idx[-1] + size + 1, mask.shape[axis]))
+        )
+    bbox = tuple(bbox)
+
+    # separable erosion: along each axis, a voxel remains in the mask if all
+    # voxels within the window are in the mask; the window is positioned as
+    # in scipy.ndimage (i.e., centered, or shifted by one voxel towards the
+    # start for even sizes)
+    cropped = mask[bbox]
+    for axis in range(mask.ndim):
+        padding = [(0, 0)] * mask.ndim
+        padding[axis] = (size // 2, size - 1 - size // 2)
+        padded = np.pad(cropped, padding, constant_values=True)
+        n = cropped.shape[axis]
+        cropped = padded[(slice(None),) * axis + (slice(0, n),)].copy()
+        for offset in range(1, size):
+            cropped &= padded[(slice(None),) * axis + (slice(offset, offset + n),)]
+
+    eroded[bbox] = cropped
+
+    return eroded
+
+
+def loadLabelMask(filename, labels, volume_cache=None):
+    """
+    Load a segmentation and create a binary mask of a set of labels.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the segmentation file.
+    labels : array-like
+        Labels to include in the mask.
+    volume_cache : VolumeCache, optional
+        Cache to load the segmentation and mask from. If None, the segmentation
+        is read from disk.
+
+    Returns
+    -------
+    mask : numpy.ndarray
+        Boolean mask of the labels.
+    """
+    if volume_cache is not None:
+        return volume_cache.loadLabelMask(filename, labels)
+
+    return labelMask(loadVolume(filename)[1], labels)
+
+
+# ------------------------------------------------------------------------------
+
+
+def binarizeImage(img_file, out_file, match=None, volume_cache=None):
     """
     Binarize an image and saves the result.
 
@@ -99,6 +398,8 @@ def binarizeImage(img_file, out_file, match=None):
         Path to save the binarized image.
     match : array-like or None, optional
         Values to consider as True. If None, non-zero values are considered True.
+    volume_cache : VolumeCache, optional
+        Cache to load the input image from. If None, the image is read from disk.
 
     Returns
     -------
@@ -113,24 +414,25 @@ def binarizeImage(img_file, out_file, match=None):
     import numpy as np
 
     # get image
-    img = nb.load(img_file)
-    img_data = img.get_fdata()
+    img, img_data = loadVolume(img_file, volume_cache=volume_cache)
 
     # binarize
     if match is None:
-        img_data_bin = img_data != 0.0
+        img_data_bin = img_data != 0
     else:
         img_data_bin = np.isin(img_data, match)
 
     # write output
-    img_bin = nb.nifti1.Nifti1Image(img_data_bin.astype(int), img.affine, dtype="uint8")
+    img_bin = nb.nifti1.Nifti1Image(
+        img_data_bin.astype(np.uint8), img.affine, dtype="uint8"
+    )
     nb.save(img_bin, out_file)
 
 
 # ------------------------------------------------------------------------------
 
 
-def applyTransform(img_file, out_file, mat_file, interp):
+def applyTransform(img_file, out_file, mat_file, interp, volume_cache=None):
     """
     Apply a transformation to an image.
 
@@ -144,6 +446,8 @@ def applyTransform(img_file, out_file, mat_file, interp):
         Transformation matrix file path (must be in xfm or lta format).
     interp : {'nearest', 'cubic'}
         Interpolation method to use.
+    volume_cache : VolumeCache, optional
+        Cache to load the input image from. If None, the image is read from disk.
 
     Returns
     -------
@@ -157,8 +461,7 @@ def applyTransform(img_file, out_file, mat_file, interp):
     from scipy import ndimage
 
     # get image
-    img = nb.load(img_file)
-    img_data = img.get_fdata()
+    img, img_data = loadVolume(img_file, volume_cache=volume_cache)
 
     #
     _, mat_file_ext = os.path.splitext(mat_file)
@@ -185,11 +488,17 @@ def applyTransform(img_file, out_file, mat_file, interp):
     else:
         raise Exception("ERROR: matrices must be either xfm or lta format")
 
-    # apply transform
+    # apply transform; nearest-neighbor interpolation is done in the data type
+    # of the input image (e.g., integer labels), cubic interpolation is not.
+    # The output image is written as float64 in both cases.
     if interp == "nearest":
-        img_data_interp = ndimage.affine_transform(img_data, np.linalg.inv(m), order=0)
+        img_data_interp = ndimage.affine_transform(
+            img_data, np.linalg.inv(m), order=0, output=img_data.dtype
+        ).astype(np.float64)
     elif interp == "cubic":
-        img_data_interp = ndimage.affine_transform(img_data, np.linalg.inv(m), order=3)
+        img_data_interp = ndimage.affine_transform(
+            img_data, np.linalg.inv(m), order=3, output=np.float64
+        )
     else:
         raise Exception("ERROR: interpolation must be either nearest or cubic")
 
@@ -448,6 +757,84 @@ def readLTA(file):
 # ------------------------------------------------------------------------------
 
 
+class AsegStats(NamedTuple):
+    """
+    Contents of a FreeSurfer aseg.stats file.
+
+    Attributes
+    ----------
+    measures : dict
+        Values of the '# Measure' header lines, keyed by the measure name
+        (e.g., 'EstimatedTotalIntraCranialVol').
+    structures : dict
+        Volumes (in mm^3) of the table rows, keyed by the structure name
+        (e.g., 'CC_Posterior').
+    """
+
+    measures: dict
+    structures: dict
+
+
+@functools.lru_cache(maxsize=128)
+def _readAsegStatsFile(path, size, mtime_ns):
+    """
+    Parse an aseg.stats file; memoized by path, size, and modification time.
+
+    Only the most recently used files are kept, such that reading the stats
+    of a large cohort does not keep all of them in memory, and entries of
+    files that have been rewritten are eventually evicted.
+    """
+
+    measures = dict()
+    structures = dict()
+
+    with open(path) as stats_file:
+        for line in stats_file:
+            if line.startswith("# Measure "):
+                # e.g. "# Measure BrainSeg, BrainSegVol, Brain Segmentation
+                # Volume, 1243340.000000, mm^3"
+                fields = line[len("# Measure ") :].split(",")
+                measures[fields[0].strip()] = float(fields[3])
+            elif not line.startswith("#"):
+                # e.g. "  1   4   6563   6562.6  Left-Lateral-Ventricle ..."
+                fields = line.split()
+                if len(fields) >= 5:
+                    structures[fields[4]] = float(fields[3])
+
+    return AsegStats(measures=measures, structures=structures)
+
+
+def readAsegStatsFile(path_aseg_stats):
+    """
+    Read a FreeSurfer aseg.stats file.
+
+    The file is parsed in a single pass, and measures and structures are
+    identified by their exact names. The results for the most recently read
+    files are memoized, such that repeated calls for the same (unmodified)
+    file do not read it again.
+
+    Parameters
+    ----------
+    path_aseg_stats : str
+        Path to the aseg.stats file.
+
+    Returns
+    -------
+    AsegStats
+        The measures and structure volumes. Must not be modified in-place,
+        since it is shared among callers.
+    """
+    import os
+
+    path_aseg_stats = os.path.abspath(path_aseg_stats)
+    stat = os.stat(path_aseg_stats)
+
+    return _readAsegStatsFile(path_aseg_stats, stat.st_size, stat.st_mtime_ns)
+
+
+# ------------------------------------------------------------------------------
+
+
 def levelsetsTria(v, t, p, levelsets):
     """
     Generate intersections of triangles with level sets.
@@ -460,8 +847,9 @@ def levelsetsTria(v, t, p, levelsets):
         Array of triangles with vertex indices, shape (m, 3).
     p : numpy.ndarray
         Array of values corresponding to vertex points, shape (n,).
-    levelsets : list or numpy.ndarray
-        List or array of level set values.
+    levelsets : float or list or numpy.ndarray
+        Level set value, or list or array of level set values. All level sets
+        are evaluated within a single call.
 
     Returns
     -------
@@ -471,107 +859,147 @@ def levelsetsTria(v, t, p, levelsets):
         List of triangle indices corresponding to the interpolated vertices for each level set.
     iLVL : list
         List of triangle indices that intersect with the level set.
+
+    Notes
+    -----
+    Each edge that crosses a level set yields one interpolated vertex, which
+    is shared by the two triangles adjacent to that edge. Interpolated vertices
+    are numbered (starting at 1) in the order in which their edges are first
+    encountered when traversing the intersecting triangles.
     """
     import numpy as np
-    from scipy.sparse import lil_matrix
 
     vLVL = list()
     lLVL = list()
     iLVL = list()
 
-    levelsets = np.array(levelsets, ndmin=2)
-
-    for lidx in range(len(levelsets)):
-        A = lil_matrix((np.shape(v)[0], np.shape(v)[0]))
-
-        lvl = levelsets[lidx]
-
-        nlvl = p[t] > lvl
-
-        n = np.where(
-            np.logical_or(np.sum(nlvl, axis=1) == 1, np.sum(nlvl, axis=1) == 2)
-        )[0]
-
-        # interpolate points
-
-        ti = list()
-        vi = list()
-
-        for i in range(len(n)):
-            # which are the outlying points in the current tria?
-            oi = np.where(nlvl[n[i], :])[0]
-
-            #  convert 2 --> 1
-            if len(oi) == 2:
-                oi = np.setdiff1d((0, 1, 2), oi)
-
-            # find the two non - outyling points
-            oix = np.setdiff1d((0, 1, 2), oi)
-
-            # check if we have interpolated for one or both of these points before
-            if np.count_nonzero(A[t[n[i], oi.item()], t[n[i], oix[0]]]) == 0:
-                # compute difference vectors between outlying point and other points
-
-                d10 = v[t[n[i], oix[0]], :] - v[t[n[i], oi], :]
-
-                # compute differences of all points to lvl to get interpolation factors
-
-                s10 = (lvl - p[t[n[i], oi]]) / (p[t[n[i], oix[0]]] - p[t[n[i], oi]])
-
-                # compute new points
-
-                v10 = s10 * d10 + v[t[n[i], oi], :]
+    # number of vertices, and vertex values per triangle (shared by all level
+    # sets)
+    nv = np.shape(v)[0]
+    pt = p[t]
 
-                # update vi and index(order matters)
+    for lvl in np.asarray(levelsets).ravel():
+        nlvl = pt > lvl
 
-                vi.append(v10.tolist()[0])
+        nsum = np.sum(nlvl, axis=1)
 
-                ti10 = len(vi)
+        n = np.where(np.logical_or(nsum == 1, nsum == 2))[0]
 
-                # store between which two points we are interpolating (to avoid having duplicate points)
+        # determine the outlying point of each intersecting triangle, i.e. the
+        # single point above the level set, or the single point below it
+        oi = np.argmax(nlvl[n, :] != (nsum[n, np.newaxis] == 2), axis=1)
 
-                A[t[n[i], oi.item()], t[n[i], oix[0]]] = ti10
-                A[t[n[i], oix[0]], t[n[i], oi.item()]] = ti10
+        # the two non-outlying points, in ascending order
+        oix0 = np.where(oi == 0, 1, 0)
+        oix1 = np.where(oi == 2, 1, 2)
 
-            else:
-                ti10 = int(A[t[n[i], oi.item()], t[n[i], oix[0]]])
+        # edges from the outlying point to both other points, in the order in
+        # which they are processed (two consecutive edges per triangle)
+        edgeOi = np.repeat(t[n, oi], 2)
+        edgeOix = np.stack((t[n, oix0], t[n, oix1]), axis=1).ravel()
 
-            # essentially the same as above, just for oix[1]
-
-            if np.count_nonzero(A[t[n[i], oi.item()], t[n[i], oix[1]]]) == 0:
-                d20 = v[t[n[i], oix[1]], :] - v[t[n[i], oi], :]
+        # identify each undirected edge by a single key, and number the edges
+        # in the order of their first occurrence
+        edgeMin = np.minimum(edgeOi, edgeOix).astype(np.int64)
+        edgeMax = np.maximum(edgeOi, edgeOix).astype(np.int64)
+        edgeKey = edgeMin * nv + edgeMax
+        _, edgeFirst, edgeInv = np.unique(
+            edgeKey, return_index=True, return_inverse=True
+        )
+        edgeOrder = np.argsort(edgeFirst)
+        edgeRank = np.empty(len(edgeOrder), dtype=np.int64)
+        edgeRank[edgeOrder] = np.arange(len(edgeOrder))
+        edgeIdx = edgeRank[edgeInv.ravel()] + 1
 
-                s20 = (lvl - p[t[n[i], oi]]) / (p[t[n[i], oix[1]]] - p[t[n[i], oi]])
+        # interpolate points on each edge, using the orientation of the edge at
+        # its first occurrence
+        e0 = edgeOi[edgeFirst[edgeOrder]]
+        e1 = edgeOix[edgeFirst[edgeOrder]]
 
-                v20 = s20 * d20 + v[t[n[i], oi], :]
+        s10 = (lvl - p[e0]) / (p[e1] - p[e0])
 
-                # update vi and index(order matters)
+        vi = s10[:, np.newaxis] * (v[e1, :] - v[e0, :]) + v[e0, :]
 
-                vi.append(v20.tolist()[0])
+        # store
 
-                ti20 = len(vi)
+        vLVL.append(vi.tolist())
+        lLVL.append(list(zip(edgeIdx[0::2].tolist(), edgeIdx[1::2].tolist())))
+        iLVL.append(n)
 
-                A[t[n[i], oi.item()], t[n[i], oix[1]]] = ti20
-                A[t[n[i], oix[1]], t[n[i], oi.item()]] = ti20
+    return vLVL, lLVL, iLVL
 
-            else:
-                ti20 = int(A[t[n[i], oi.item()], t[n[i], oix[1]]])
 
-            # store new indices
+# ------------------------------------------------------------------------------
 
-            ti.append((ti10, ti20))
 
-            # clean up
+def levelsetsChain(lLVL):
+    """
+    Link the line segments of a level set into polylines.
 
-            # clear oi oix d10 d20 s10 s20 v10 v20 t10 t20
+    Parameters
+    ----------
+    lLVL : list
+        List of line segments of a single level set, given as pairs of
+        (1-based) indices of interpolated vertices, as returned by
+        'levelsetsTria'.
 
-        # store
+    Returns
+    -------
+    list of numpy.ndarray
+        List of polylines, each given as an array of (0-based) indices of
+        interpolated vertices. Closed polylines start and end with the same
+        index.
 
-        vLVL.append(vi)
-        lLVL.append(ti)
-        iLVL.append(n)
+    Notes
+    -----
+    Since interpolated vertices are shared by adjacent triangles, segments are
+    linked via their vertex indices, without comparing coordinates. Each
+    segment is visited once, i.e. the run time is linear in the number of
+    segments.
+    """
+    import numpy as np
 
-    return vLVL, lLVL, iLVL
+    # adjacency: vertex index -> list of (segment index, other vertex index)
+    adj = dict()
+    for k, (a, b) in enumerate(lLVL):
+        if a != b:
+            adj.setdefault(a, []).append((k, b))
+            adj.setdefault(b, []).append((k, a))
+
+    used = [False] * len(lLVL)
+
+    def extend(line):
+        # follow unused segments from the last vertex of the line
+        while True:
+            nxt = None
+            for k, w in adj[line[-1]]:
+                if not used[k]:
+                    nxt = (k, w)
+                    break
+            if nxt is None:
+                return False
+            used[nxt[0]] = True
+            line.append(nxt[1])
+            if nxt[1] == line[0]:
+                return True
+
+    lines = list()
+
+    for k, (a, b) in enumerate(lLVL):
+        if used[k] or a == b:
+            continue
+        used[k] = True
+
+        # extend forward, and backward unless the line was closed
+        fwd = [a, b]
+        if not extend(fwd):
+            bwd = [a]
+            extend(bwd)
+            fwd = bwd[:0:-1] + fwd
+
+        lines.append(np.array(fwd) - 1)
+
+    return lines
 
 
 # ------------------------------------------------------------------------------
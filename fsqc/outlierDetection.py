@@ -22,151 +22,98 @@ def readAsegStats(path_aseg_stats):
     dict
         A dictionary containing FreeSurfer aseg measures.
     """
+    from fsqc.fsqcUtils import readAsegStatsFile
+
+    # measures and their keys
+    measures = {
+        "BrainSeg": "aseg.BrainSeg",
+        "BrainSegNotVent": "aseg.BrainSegNotVent",
+        "BrainSegNotVentSurf": "aseg.BrainSegNotVentSurf",
+        "VentricleChoroidVol": "aseg.VentricleChoroidVol",
+        "lhCortex": "aseg.lhCortex",
+        "rhCortex": "aseg.rhCortex",
+        "Cortex": "aseg.Cortex",
+        "lhCerebralWhiteMatter": "aseg.lhCerebralWhiteMatter",
+        "rhCerebralWhiteMatter": "aseg.rhCerebralWhiteMatter",
+        "CerebralWhiteMatter": "aseg.CerebralWhiteMatter",
+        "SubCortGray": "aseg.SubCortGray",
+        "TotalGray": "aseg.TotalGray",
+        "SupraTentorial": "aseg.SupraTentorial",
+        "SupraTentorialNotVent": "aseg.SupraTentorialNotVent",
+        "SupraTentorialNotVentVox": "aseg.SupraTentorialNotVentVox",
+        "Mask": "aseg.Mask",
+        "BrainSegVol-to-eTIV": "aseg.BrainSegVol_to_eTIV",
+        "MaskVol-to-eTIV": "aseg.MaskVol_to_eTIV",
+        "lhSurfaceHoles": "aseg.lhSurfaceHoles",
+        "rhSurfaceHoles": "aseg.rhSurfaceHoles",
+        "SurfaceHoles": "aseg.SurfaceHoles",
+        "EstimatedTotalIntraCranialVol": "aseg.EstimatedTotalIntraCranialVol",
+    }
+
+    # structures (their keys are prefixed with 'aseg.')
+    structures = [
+        "Left-Lateral-Ventricle",
+        "Left-Inf-Lat-Vent",
+        "Left-Cerebellum-White-Matter",
+        "Left-Cerebellum-Cortex",
+        "Left-Thalamus-Proper",
+        "Left-Caudate",
+        "Left-Putamen",
+        "Left-Pallidum",
+        "3rd-Ventricle",
+        "4th-Ventricle",
+        "Brain-Stem",
+        "Left-Hippocampus",
+        "Left-Amygdala",
+        "CSF",
+        "Left-Accumbens-area",
+        "Left-VentralDC",
+        "Left-vessel",
+        "Left-choroid-plexus",
+        "Right-Lateral-Ventricle",
+        "Right-Inf-Lat-Vent",
+        "Right-Cerebellum-White-Matter",
+        "Right-Cerebellum-Cortex",
+        "Right-Thalamus-Proper",
+        "Right-Caudate",
+        "Right-Putamen",
+        "Right-Pallidum",
+        "Right-Hippocampus",
+        "Right-Amygdala",
+        "Right-Accumbens-area",
+        "Right-VentralDC",
+        "Right-vessel",
+        "Right-choroid-plexus",
+        "5th-Ventricle",
+        "WM-hypointensities",
+        "Left-WM-hypointensities",
+        "Right-WM-hypointensities",
+        "non-WM-hypointensities",
+        "Left-non-WM-hypointensities",
+        "Right-non-WM-hypointensities",
+        "Optic-Chiasm",
+        "CC_Posterior",
+        "CC_Mid_Posterior",
+        "CC_Central",
+        "CC_Mid_Anterior",
+        "CC_Anterior",
+    ]
+
     # read file
-    with open(path_aseg_stats) as stats_file:
-        aseg_stats = stats_file.read().splitlines()
+    aseg_stats = readAsegStatsFile(path_aseg_stats)
 
     # initialize
     aseg = dict()
 
-    # read measures
-    for line in aseg_stats:
-        if "# Measure BrainSeg," in line:
-            aseg.update({"aseg.BrainSeg": float(line.split(",")[3])})
-        elif "# Measure BrainSegNotVent," in line:
-            aseg.update({"aseg.BrainSegNotVent": float(line.split(",")[3])})
-        elif "# Measure BrainSegNotVentSurf," in line:
-            aseg.update({"aseg.BrainSegNotVentSurf": float(line.split(",")[3])})
-        elif "# Measure VentricleChoroidVol," in line:
-            aseg.update({"aseg.VentricleChoroidVol": float(line.split(",")[3])})
-        elif "# Measure lhCortex," in line:
-            aseg.update({"aseg.lhCortex": float(line.split(",")[3])})
-        elif "# Measure rhCortex," in line:
-            aseg.update({"aseg.rhCortex": float(line.split(",")[3])})
-        elif "# Measure Cortex," in line:
-            aseg.update({"aseg.Cortex": float(line.split(",")[3])})
-        elif "# Measure lhCerebralWhiteMatter," in line:
-            aseg.update({"aseg.lhCerebralWhiteMatter": float(line.split(",")[3])})
-        elif "# Measure rhCerebralWhiteMatter," in line:
-            aseg.update({"aseg.rhCerebralWhiteMatter": float(line.split(",")[3])})
-        elif "# Measure CerebralWhiteMatter," in line:
-            aseg.update({"aseg.CerebralWhiteMatter": float(line.split(",")[3])})
-        elif "# Measure SubCortGray," in line:
-            aseg.update({"aseg.SubCortGray": float(line.split(",")[3])})
-        elif "# Measure TotalGray," in line:
-            aseg.update({"aseg.TotalGray": float(line.split(",")[3])})
-        elif "# Measure SupraTentorial," in line:
-            aseg.update({"aseg.SupraTentorial": float(line.split(",")[3])})
-        elif "# Measure SupraTentorialNotVent," in line:
-            aseg.update({"aseg.SupraTentorialNotVent": float(line.split(",")[3])})
-        elif "# Measure SupraTentorialNotVentVox," in line:
-            aseg.update({"aseg.SupraTentorialNotVentVox": float(line.split(",")[3])})
-        elif "# Measure Mask," in line:
-            aseg.update({"aseg.Mask": float(line.split(",")[3])})
-        elif "# Measure BrainSegVol-to-eTIV," in line:
-            aseg.update({"aseg.BrainSegVol_to_eTIV": float(line.split(",")[3])})
-        elif "# Measure MaskVol-to-eTIV," in line:
-            aseg.update({"aseg.MaskVol_to_eTIV": float(line.split(",")[3])})
-        elif "# Measure lhSurfaceHoles," in line:
-            aseg.update({"aseg.lhSurfaceHoles": float(line.split(",")[3])})
-        elif "# Measure rhSurfaceHoles," in line:
-            aseg.update({"aseg.rhSurfaceHoles": float(line.split(",")[3])})
-        elif "# Measure SurfaceHoles," in line:
-            aseg.update({"aseg.SurfaceHoles": float(line.split(",")[3])})
-        elif "# Measure EstimatedTotalIntraCranialVol," in line:
-            aseg.update(
-                {"aseg.EstimatedTotalIntraCranialVol": float(line.split(",")[3])}
-            )
-        elif "Left-Lateral-Ventricle" in line:
-            aseg.update({"aseg.Left-Lateral-Ventricle": float(line.split()[3])})
-        elif "Left-Inf-Lat-Vent" in line:
-            aseg.update({"aseg.Left-Inf-Lat-Vent": float(line.split()[3])})
-        elif "Left-Cerebellum-White-Matter" in line:
-            aseg.update({"aseg.Left-Cerebellum-White-Matter": float(line.split()[3])})
-        elif "Left-Cerebellum-Cortex" in line:
-            aseg.update({"aseg.Left-Cerebellum-Cortex": float(line.split()[3])})
-        elif "Left-Thalamus-Proper" in line:
-            aseg.update({"aseg.Left-Thalamus-Proper": float(line.split()[3])})
-        elif "Left-Caudate" in line:
-            aseg.update({"aseg.Left-Caudate": float(line.split()[3])})
-        elif "Left-Putamen" in line:
-            aseg.update({"aseg.Left-Putamen": float(line.split()[3])})
-        elif "Left-Pallidum" in line:
-            aseg.update({"aseg.Left-Pallidum": float(line.split()[3])})
-        elif "3rd-Ventricle" in line:
-            aseg.update({"aseg.3rd-Ventricle": float(line.split()[3])})
-        elif "4th-Ventricle" in line:
-            aseg.update({"aseg.4th-Ventricle": float(line.split()[3])})
-        elif "Brain-Stem" in line:
-            aseg.update({"aseg.Brain-Stem": float(line.split()[3])})
-        elif "Left-Hippocampus" in line:
-            aseg.update({"aseg.Left-Hippocampus": float(line.split()[3])})
-        elif "Left-Amygdala" in line:
-            aseg.update({"aseg.Left-Amygdala": float(line.split()[3])})
-        elif "CSF" in line:
-            aseg.update({"aseg.CSF": float(line.split()[3])})
-        elif "Left-Accumbens-area" in line:
-            aseg.update({"aseg.Left-Accumbens-area": float(line.split()[3])})
-        elif "Left-VentralDC" in line:
-            aseg.update({"aseg.Left-VentralDC": float(line.split()[3])})
-        elif "Left-vessel" in line:
-            aseg.update({"aseg.Left-vessel": float(line.split()[3])})
-        elif "Left-choroid-plexus" in line:
-            aseg.update({"aseg.Left-choroid-plexus": float(line.split()[3])})
-        elif "Right-Lateral-Ventricle" in line:
-            aseg.update({"aseg.Right-Lateral-Ventricle": float(line.split()[3])})
-        elif "Right-Inf-Lat-Vent" in line:
-            aseg.update({"aseg.Right-Inf-Lat-Vent": float(line.split()[3])})
-        elif "Right-Cerebellum-White-Matter" in line:
-            aseg.update({"aseg.Right-Cerebellum-White-Matter": float(line.split()[3])})
-        elif "Right-Cerebellum-Cortex" in line:
-            aseg.update({"aseg.Right-Cerebellum-Cortex": float(line.split()[3])})
-        elif "Right-Thalamus-Proper" in line:
-            aseg.update({"aseg.Right-Thalamus-Proper": float(line.split()[3])})
-        elif "Right-Caudate" in line:
-            aseg.update({"aseg.Right-Caudate": float(line.split()[3])})
-        elif "Right-Putamen" in line:
-            aseg.update({"aseg.Right-Putamen": float(line.split()[3])})
-        elif "Right-Pallidum" in line:
-            aseg.update({"aseg.Right-Pallidum": float(line.split()[3])})
-        elif "Right-Hippocampus" in line:
-            aseg.update({"aseg.Right-Hippocampus": float(line.split()[3])})
-        elif "Right-Amygdala" in line:
-            aseg.update({"aseg.Right-Amygdala": float(line.split()[3])})
-        elif "Right-Accumbens-area" in line:
-            aseg.update({"aseg.Right-Accumbens-area": float(line.split()[3])})
-        elif "Right-VentralDC" in line:
-            aseg.update({"aseg.Right-VentralDC": float(line.split()[3])})
-        elif "Right-vessel" in line:
-            aseg.update({"aseg.Right-vessel": float(line.split()[3])})
-        elif "Right-choroid-plexus" in line:
-            aseg.update({"aseg.Right-choroid-plexus": float(line.split()[3])})
-        elif "5th-Ventricle" in line:
-            aseg.update({"aseg.5th-Ventricle": float(line.split()[3])})
-        elif "WM-hypointensities" in line:
-            aseg.update({"aseg.WM-hypointensities": float(line.split()[3])})
-        elif "Left-WM-hypointensities" in line:
-            aseg.update({"aseg.Left-WM-hypointensities": float(line.split()[3])})
-        elif "Right-WM-hypointensities" in line:
-            aseg.update({"aseg.Right-WM-hypointensities": float(line.split()[3])})
-        elif "non-WM-hypointensities" in line:
-            aseg.update({"aseg.non-WM-hypointensities": float(line.split()[3])})
-        elif "Left-non-WM-hypointensities" in line:
-            aseg.update({"aseg.Left-non-WM-hypointensities": float(line.split()[3])})
-        elif "Right-non-WM-hypointensities" in line:
-            aseg.update({"aseg.Right-non-WM-hypointensities": float(line.split()[3])})
-        elif "Optic-Chiasm" in line:
-            aseg.update({"aseg.Optic-Chiasm": float(line.split()[3])})
-        elif "CC_Posterior" in line:
-            aseg.update({"aseg.CC_Posterior": float(line.split()[3])})
-        elif "CC_Mid_Posterior" in line:
-            aseg.update({"aseg.CC_Mid_Posterior": float(line.split()[3])})
-        elif "CC_Central" in line:
-            aseg.update({"aseg.CC_Central": float(line.split()[3])})
-        elif "CC_Mid_Anterior" in line:
-            aseg.update({"aseg.CC_Mid_Anterior": float(line.split()[3])})
-        elif "CC_Anterior" in line:
-            aseg.update({"aseg.CC_Anterior": float(line.split()[3])})
+    # get measures
+    for measure, key in measures.items():
+        if measure in aseg_stats.measures:
+            aseg.update({key: aseg_stats.measures[measure]})
+
+    # get structures
+    for structure in structures:
+        if structure in aseg_stats.structures:
+            aseg.update({"aseg." + structure: aseg_stats.structures[structure]})
 
     # return
     return aseg
@@ -733,19 +680,21 @@ def readHypothalamusStats(path_hypothalamus_stats):
         A dictionary containing hypothalamic volume information.
     """
     # imports
-    import pandas as pd
-
-    # read file
-    hypothalamus_stats = pd.read_csv(path_hypothalamus_stats)
+    import csv
 
-    #
-    hypothalamus_stats.columns = "hypothalamus" + "." + hypothalamus_stats.columns
+    # read file; the first line contains the names of the structures, the
+    # second line the subject and the volumes
+    with open(path_hypothalamus_stats, newline="") as stats_file:
+        csvreader = csv.reader(stats_file)
+        names = next(csvreader)
+        values = next(csvreader)
 
     #
-    hypo = hypothalamus_stats.to_dict(orient="index")[0]
-
-    #
-    hypo.pop("hypothalamus.subject", None)
+    hypo = {
+        "hypothalamus" + "." + name: float(value)
+        for name, value in zip(names, values)
+        if name != "subject"
+    }
 
     # return
     return hypo
@@ -769,20 +718,16 @@ def readHippocampusStats(path_hippocampus_stats, hemi, prefix):
     dict
         Dictionary containing volume values with column names.
     """
-    # imports
-    import pandas as pd
-
-    # read file
-    hippocampus_stats = pd.read_csv(
-        path_hippocampus_stats, sep=" ", header=None, names=["volume"], index_col=0
-    )
+    # read file; each line contains the name of a structure and its volume
+    with open(path_hippocampus_stats) as stats_file:
+        hippocampus_stats = stats_file.read().splitlines()
 
     #
-    hippo = hippocampus_stats.transpose()
-
-    hippo.columns = prefix + "." + hemi + "." + hippo.columns
-
-    hippo = hippo.to_dict(orient="index")["volume"]
+    hippo = dict()
+    for line in hippocampus_stats:
+        if line.strip():
+            name, volume = line.split(" ")[:2]
+            hippo.update({prefix + "." + hemi + "." + name: float(volume)})
 
     # return
     return hippo
@@ -880,6 +825,268 @@ def outlierTable():
     return outlierDict
 
 
+def subjectStatsReaders(
+    subjects_dir,
+    subject,
+    hypothalamus=False,
+    hippocampus=False,
+    hippocampus_label=None,
+):
+    """
+    Get the stats files of a subject and the functions to read them.
+
+    Parameters
+    ----------
+    subjects_dir : str
+        Path to the FreeSurfer subjects directory.
+    subject : str
+        Subject ID.
+    hypothalamus : bool, optional
+        Flag to include hypothalamic values.
+    hippocampus : bool, optional
+        Flag to include hippocampal values.
+    hippocampus_label : str or None, optional
+        Label to identify the hippocampus (e.g., "Hippocampus").
+
+    Returns
+    -------
+    list of tuple
+        A list of (filename, function, required) tuples. The function reads
+        the file and returns a dictionary of regional values. Files that are
+        not required are skipped if they do not exist.
+    """
+    import os
+
+    statsReaders = [
+        (
+            os.path.join(subjects_dir, subject, "stats", "aseg.stats"),
+            readAsegStats,
+            True,
+        ),
+        (
+            os.path.join(subjects_dir, subject, "stats", "lh.aparc.stats"),
+            lambda path: readAparcStats(path, hemi="lh")[2],
+            True,
+        ),
+        (
+            os.path.join(subjects_dir, subject, "stats", "rh.aparc.stats"),
+            lambda path: readAparcStats(path, hemi="rh")[2],
+            True,
+        ),
+    ]
+
+    if hypothalamus is True:
+        statsReaders.append(
+            (
+                os.path.join(
+                    subjects_dir, subject, "mri", "hypothalamic_subunits_volumes.v1.csv"
+                ),
+                readHypothalamusStats,
+                False,
+            )
+        )
+
+    if hippocampus is True and hippocampus_label is not None:
+        for hemi in ["lh", "rh"]:
+            statsReaders.append(
+                (
+                    os.path.join(
+                        subjects_dir,
+                        subject,
+                        "mri",
+                        hemi + ".hippoSfVolumes-" + hippocampus_label + ".txt",
+                    ),
+                    lambda path, hemi=hemi: readHippocampusStats(
+                        path, hemi=hemi, prefix="hippocampus"
+                    ),
+                    False,
+                )
+            )
+        for hemi in ["lh", "rh"]:
+            statsReaders.append(
+                (
+                    os.path.join(
+                        subjects_dir,
+                        subject,
+                        "mri",
+                        hemi + ".amygNucVolumes-" + hippocampus_label + ".txt",
+                    ),
+                    lambda path, hemi=hemi: readHippocampusStats(
+                        path, hemi=hemi, prefix="amygdala"
+                    ),
+                    False,
+                )
+            )
+
+    return statsReaders
+
+
+def subjectStatsSignature(statsReaders):
+    """
+    Get a signature of the stats files of a subject.
+
+    Parameters
+    ----------
+    statsReaders : list of tuple
+        Stats files and their readers, as returned by subjectStatsReaders().
+
+    Returns
+    -------
+    str
+        JSON string with the names, sizes, and modification times of the
+        stats files; files that do not exist are included by name only.
+    """
+    import json
+    import os
+
+    signature = list()
+    for path_stats, _, _ in statsReaders:
+        if os.path.exists(path_stats):
+            stat = os.stat(path_stats)
+            signature.append([path_stats, stat.st_size, stat.st_mtime_ns])
+        else:
+            signature.append([path_stats])
+    return json.dumps(signature)
+
+
+def readSubjectStats(statsReaders):
+    """
+    Read the stats files of a subject.
+
+    Parameters
+    ----------
+    statsReaders : list of tuple
+        Stats files and their readers, as returned by subjectStatsReaders().
+
+    Returns
+    -------
+    dict
+        A dictionary with the regional values of all stats files.
+    """
+    import os
+
+    subject_stats = dict()
+    for path_stats, readStats, required in statsReaders:
+        if required or os.path.exists(path_stats):
+            subject_stats.update(readStats(path_stats))
+    return subject_stats
+
+
+def robustMahalanobis(
+    data, support_fraction=0.75, max_samples=10000, max_iter=20, random_state=0
+):
+    """
+    Compute robust Mahalanobis distances of the rows of a data matrix.
+
+    The location and covariance are estimated with concentration steps of the
+    FAST-MCD algorithm (Rousseeuw and Van Driessen, 1999): starting from the
+    rows closest to the coordinate-wise median, the estimates are iteratively
+    recomputed from the fraction of rows with the smallest distances. The
+    covariance of each step is regularized with Ledoit-Wolf shrinkage, such
+    that it remains invertible if there are more columns than rows. For large
+    samples, the estimates are computed from a random subset of rows, and all
+    rows are scored afterwards.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Data matrix with one row per subject and one column per region;
+        columns must not contain missing values.
+    support_fraction : float, optional
+        Fraction of rows used for the estimates, default is 0.75.
+    max_samples : int, optional
+        Maximum number of rows used for the estimates, default is 10000.
+    max_iter : int, optional
+        Maximum number of concentration steps, default is 20.
+    random_state : int, optional
+        Seed for the selection of the random subset, default is 0.
+
+    Returns
+    -------
+    distance : numpy.ndarray
+        Robust Mahalanobis distance of each row.
+    pvalue : numpy.ndarray
+        P-value of each row, based on a chi-squared distribution of the
+        squared distances with one degree of freedom per (non-constant)
+        column.
+    """
+    # imports
+
+    import numpy as np
+    from scipy.stats import chi2
+
+    # standardize columns robustly, and remove constant columns
+
+    location = np.median(data, axis=0)
+    scale = 1.4826 * np.median(np.abs(data - location), axis=0)
+    scale = np.where(scale > 0, scale, np.std(data, axis=0))
+    data = (data[:, scale > 0] - location[scale > 0]) / scale[scale > 0]
+
+    n_features = data.shape[1]
+
+    if n_features == 0:
+        return np.full(data.shape[0], np.nan), np.full(data.shape[0], np.nan)
+
+    # select a random subset of rows for large samples
+
+    if data.shape[0] > max_samples:
+        rng = np.random.default_rng(random_state)
+        fit_data = data[np.sort(rng.choice(data.shape[0], max_samples, replace=False))]
+    else:
+        fit_data = data
+
+    n_support = max(int(np.ceil(support_fraction * fit_data.shape[0])), 2)
+
+    def _estimate(x):
+        # mean and Ledoit-Wolf shrunk covariance
+        mean = x.mean(axis=0)
+        x = x - mean
+        n = x.shape[0]
+        cov = x.T @ x / n
+        mu = np.trace(cov) / n_features
+        x2 = x**2
+        beta = (np.sum(x2.T @ x2) / n - np.sum(cov**2)) / (n * n_features)
+        delta = (np.sum(cov**2) - 2 * mu * np.trace(cov) + n_features * mu**2) / (
+            n_features
+        )
+        shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+        cov = (1 - shrinkage) * cov
+        cov.flat[:: n_features + 1] += shrinkage * mu
+        return mean, cov
+
+    def _distance2(x, mean, cov):
+        # squared Mahalanobis distances via a Cholesky factorization
+        try:
+            chol = np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            # singular covariance, e.g. due to collinear columns
+            ridge = 1e-6 * np.trace(cov) / n_features
+            chol = np.linalg.cholesky(cov + ridge * np.eye(n_features))
+        y = np.linalg.solve(chol, (x - mean).T)
+        return np.sum(y**2, axis=0)
+
+    # initial support: rows closest to the coordinate-wise median
+
+    support = np.argsort(np.sum(fit_data**2, axis=1), kind="stable")[:n_support]
+
+    # concentration steps
+
+    for _ in range(max_iter):
+        mean, cov = _estimate(fit_data[support])
+        distance2 = _distance2(fit_data, mean, cov)
+        new_support = np.argsort(distance2, kind="stable")[:n_support]
+        if np.array_equal(np.sort(new_support), np.sort(support)):
+            break
+        support = new_support
+
+    # consistency correction of the covariance, and scoring of all rows
+
+    cov = cov * np.median(distance2) / chi2.ppf(0.5, n_features)
+    distance2 = _distance2(data, mean, cov)
+
+    return np.sqrt(distance2), chi2.sf(distance2, n_features)
+
+
 # ------------------------------------------------------------------------------
 # main function
 
@@ -893,6 +1100,12 @@ def outlierDetection(
     hypothalamus=False,
     hippocampus=False,
     hippocampus_label=None,
+    save_summary=False,
+    sample_summaries=None,
+    strata=None,
+    multivariate=False,
+    max_memory=None,
+    n_threads=8,
 ):
     """
     Evaluate outliers in aseg.stats, [lr]h.aparc, and optional hypothalamic/hippocampal values.
@@ -905,8 +1118,9 @@ def outlierDetection(
         Path to the FreeSurfer subjects directory.
     output_dir : str
         Path to the output directory for saving results.
-    outlierDict : dict
-        Dictionary containing outlier thresholds for different measures.
+    outlierDict : dict or NormativeBounds
+        Dictionary containing outlier thresholds for different measures, or
+        normative bounds that may be stratified (e.g., by age and sex).
     min_no_subjects : int, optional
         Minimum number of subjects required for analysis.
     hypothalamus : bool, optional
@@ -915,123 +1129,101 @@ def outlierDetection(
         Flag to include hippocampal values in the analysis.
     hippocampus_label : str or None, optional
         Label to identify the hippocampus (e.g., "Hippocampus").
+    save_summary : bool, optional
+        If True, save a summary of the sample as fsqc-sample-summary.npz in
+        the output directory, which can be merged with the summaries of other
+        parts of a cohort. Default is False.
+    sample_summaries : list of str or None, optional
+        Sample summary files (fsqc-sample-summary.npz) of disjoint parts of a
+        cohort, e.g. of several runs on subsets of the cohort. If given, the
+        sample statistics are computed from the merged summaries instead of
+        the given subjects only, and the subjects are compared against the
+        whole cohort.
+    strata : dict or None, optional
+        Stratum of each subject (e.g., "F_60-69"), used to select the
+        normative bounds. Subjects without a stratum are compared against the
+        bounds that apply to all subjects.
+    multivariate : bool, optional
+        Also compute robust multivariate outlier scores (Mahalanobis distances
+        and p-values) from all regions without missing values.
+    max_memory : int or None, optional
+        Memory budget in bytes for the subjects x regions table and the
+        temporary copies made from it. Larger tables are memory-mapped to
+        temporary files within the output directory. If None, the memory
+        usage is not limited.
+    n_threads : int, optional
+        Number of threads for reading the stats files, default is 8.
 
     Returns
     -------
-    None
-        This function returns nothing but saves results in the specified output directory.
+    outlierSampleNonparNum : dict
+        Number of nonparametric sample outliers of each subject.
+    outlierSampleParamNum : dict
+        Number of parametric sample outliers of each subject.
+    outlierNormsNum : dict
+        Number of normative outliers of each subject.
+    outlierMultivariate : dict
+        Only if multivariate is True: dictionary with the robust Mahalanobis
+        distance ("outlier_multivariate_distance") and its p-value
+        ("outlier_multivariate_pvalue") of each subject.
+
+    Results are also saved in the specified output directory.
     """
     # imports
 
     import csv
     import os
+    from concurrent.futures import ThreadPoolExecutor
 
     import numpy as np
-    import pandas as pd
 
-    # create a dictionary with all data from all subjects, and create a list of all available keys
+    from fsqc.utils._cohort_store import CohortStore, block_size
+    from fsqc.utils._norms import NormativeBounds
+    from fsqc.utils._sample_summary import SampleSummary
 
-    regions = dict()
+    # read the data of all subjects into the cohort store, which keeps the data
+    # from previous runs; only subjects with new or changed stats files are read
 
-    all_regions_keys = list()
+    store = CohortStore(output_dir, max_memory=max_memory)
 
-    for subject in subjects:
-        # aseg
+    statsReaders = [
+        subjectStatsReaders(
+            subjects_dir,
+            subject,
+            hypothalamus=hypothalamus,
+            hippocampus=hippocampus,
+            hippocampus_label=hippocampus_label,
+        )
+        for subject in subjects
+    ]
 
-        path_aseg_stats = os.path.join(subjects_dir, subject, "stats", "aseg.stats")
-        aseg_stats = readAsegStats(path_aseg_stats)
-        regions[subject] = aseg_stats.copy()
-        all_regions_keys.extend(list(aseg_stats.keys()))
+    # the stats files are small and reading them is dominated by the latency
+    # of the file system (e.g., on network file systems), so they are checked
+    # and read by a pool of threads
 
-        # aparc
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        signatures = list(executor.map(subjectStatsSignature, statsReaders))
 
-        path_aparc_stats = os.path.join(
-            subjects_dir, subject, "stats", "lh.aparc.stats"
-        )
-        aparc_header, aparc_stats, aparc_thickness = readAparcStats(
-            path_aparc_stats, hemi="lh"
-        )
-        regions[subject].update(aparc_thickness)
-        all_regions_keys.extend(list(aparc_thickness.keys()))
+        outdated = [
+            i
+            for i, (subject, signature) in enumerate(zip(subjects, signatures))
+            if not store.has(subject, signature)
+        ]
 
-        path_aparc_stats = os.path.join(
-            subjects_dir, subject, "stats", "rh.aparc.stats"
-        )
-        aparc_header, aparc_stats, aparc_thickness = readAparcStats(
-            path_aparc_stats, hemi="rh"
-        )
-        regions[subject].update(aparc_thickness)
-        all_regions_keys.extend(list(aparc_thickness.keys()))
+        for i, subject_stats in zip(
+            outdated,
+            executor.map(readSubjectStats, [statsReaders[i] for i in outdated]),
+        ):
+            store.set(subjects[i], signatures[i], subject_stats)
 
-        # hypothalamus
+    store.save()
 
-        if hypothalamus is True:
-            path_hypothalamus_stats = os.path.join(
-                subjects_dir, subject, "mri", "hypothalamic_subunits_volumes.v1.csv"
-            )
-            if os.path.exists(path_hypothalamus_stats):
-                hypothalamus_stats = readHypothalamusStats(path_hypothalamus_stats)
-                regions[subject].update(hypothalamus_stats)
-                all_regions_keys.extend(list(hypothalamus_stats.keys()))
-
-        # hippocampus + amygdala
-
-        if hippocampus is True and hippocampus_label is not None:
-            path_hippocampus_stats = os.path.join(
-                subjects_dir,
-                subject,
-                "mri",
-                "lh.hippoSfVolumes-" + hippocampus_label + ".txt",
-            )
-            if os.path.exists(path_hippocampus_stats):
-                hippocampus_stats = readHippocampusStats(
-                    path_hippocampus_stats, hemi="lh", prefix="hippocampus"
-                )
-                regions[subject].update(hippocampus_stats)
-                all_regions_keys.extend(list(hippocampus_stats.keys()))
-
-            path_hippocampus_stats = os.path.join(
-                subjects_dir,
-                subject,
-                "mri",
-                "rh.hippoSfVolumes-" + hippocampus_label + ".txt",
-            )
-            if os.path.exists(path_hippocampus_stats):
-                hippocampus_stats = readHippocampusStats(
-                    path_hippocampus_stats, hemi="rh", prefix="hippocampus"
-                )
-                regions[subject].update(hippocampus_stats)
-                all_regions_keys.extend(list(hippocampus_stats.keys()))
-
-            path_hippocampus_stats = os.path.join(
-                subjects_dir,
-                subject,
-                "mri",
-                "lh.amygNucVolumes-" + hippocampus_label + ".txt",
-            )
-            if os.path.exists(path_hippocampus_stats):
-                hippocampus_stats = readHippocampusStats(
-                    path_hippocampus_stats, hemi="lh", prefix="amygdala"
-                )
-                regions[subject].update(hippocampus_stats)
-                all_regions_keys.extend(list(hippocampus_stats.keys()))
-
-            path_hippocampus_stats = os.path.join(
-                subjects_dir,
-                subject,
-                "mri",
-                "rh.amygNucVolumes-" + hippocampus_label + ".txt",
-            )
-            if os.path.exists(path_hippocampus_stats):
-                hippocampus_stats = readHippocampusStats(
-                    path_hippocampus_stats, hemi="rh", prefix="amygdala"
-                )
-                regions[subject].update(hippocampus_stats)
-                all_regions_keys.extend(list(hippocampus_stats.keys()))
+    # create a subjects x regions table with all data from all subjects; the
+    # table is memory-mapped to a temporary file if it exceeds max_memory
 
-    # sort keys
+    all_regions_keys = store.columns(subjects)
 
-    all_regions_keys = set(all_regions_keys)
+    # sort keys
 
     all_regions_keys = (
         sorted(list(filter(lambda x: "aseg." in x, list(all_regions_keys))))
@@ -1041,175 +1233,242 @@ def outlierDetection(
         + sorted(list(filter(lambda x: "hypothalamus." in x, list(all_regions_keys))))
     )
 
-    # compare individual data against sample statistics (if more than min_no_subjects cases)
-
-    outlierSampleNonpar = dict()
-    outlierSampleParam = dict()
-
-    outlierSampleNonparNum = dict()
-    outlierSampleParamNum = dict()
+    df = store.table(subjects, all_regions_keys)
+
+    regions = df.to_numpy(dtype=float, copy=False)
+
+    # the sample statistics are computed in blocks of columns, and the
+    # comparisons in blocks of rows, such that the temporary copies stay
+    # within max_memory; the outlier flags are never held for all subjects at
+    # once, but computed for each block of rows when they are counted and
+    # when they are written. Cells of the csv files are converted to strings,
+    # which take about as much memory as 48 float64 values each.
+
+    column_step = block_size(len(all_regions_keys), len(subjects), max_memory, factor=4)
+    row_step = block_size(len(subjects), len(all_regions_keys), max_memory, factor=4)
+    csv_step = block_size(len(subjects), len(all_regions_keys), max_memory, factor=48)
+
+    column_blocks = [
+        slice(start, start + column_step)
+        for start in range(0, len(all_regions_keys), column_step)
+    ]
+    row_blocks = [
+        slice(start, start + row_step) for start in range(0, len(subjects), row_step)
+    ]
+    csv_blocks = [
+        slice(start, start + csv_step) for start in range(0, len(subjects), csv_step)
+    ]
+
+    # save a summary of the sample, which can be merged with the summaries of
+    # other parts of a cohort
+
+    if save_summary is True:
+        SampleSummary.from_table(df, max_memory=max_memory).save(
+            os.path.join(output_dir, "fsqc-sample-summary.npz")
+        )
 
-    if len(subjects) >= min_no_subjects:
-        # compute means, sd, medians, and quantiles based on sample
+    if sample_summaries is not None:
+        summary = SampleSummary.merged(
+            [SampleSummary.load(filename) for filename in sample_summaries]
+        )
+        n_sample = summary.n_subjects
+    else:
+        n_sample = len(subjects)
+
+    # compare individual data against sample statistics (if more than
+    # min_no_subjects cases); comparisons are done for all subjects and
+    # regions at once, missing values are never flagged
+
+    if n_sample >= min_no_subjects:
+        # compute means, sd, medians, and quantiles based on sample, or based
+        # on the merged summaries of the cohort
+
+        if sample_summaries is None:
+            sample_q25 = np.full(len(all_regions_keys), np.nan)
+            sample_q75 = np.full(len(all_regions_keys), np.nan)
+            sample_mean = np.full(len(all_regions_keys), np.nan)
+            sample_std = np.full(len(all_regions_keys), np.nan)
+            for block in column_blocks:
+                df_block = df.iloc[:, block]
+                sample_q25[block] = np.percentile(df_block, 25, axis=0)
+                sample_q75[block] = np.percentile(df_block, 75, axis=0)
+                sample_mean[block] = df_block.mean(axis=0).to_numpy()
+                sample_std[block] = df_block.std(axis=0, ddof=0).to_numpy()
+        else:
+            sample_q25 = summary.get_percentile(25, regions=all_regions_keys)
+            sample_q75 = summary.get_percentile(75, regions=all_regions_keys)
+            sample_mean = summary.get_mean(regions=all_regions_keys)
+            sample_std = summary.get_std(regions=all_regions_keys)
+
+        iqr = sample_q75 - sample_q25
+
+        sample_nonpar_lower = sample_q25 - 1.5 * iqr
+        sample_nonpar_upper = sample_q75 + 1.5 * iqr
+
+        sample_param_lower = sample_mean - 2 * sample_std
+        sample_param_upper = sample_mean + 2 * sample_std
 
-        df = pd.DataFrame.from_dict(regions).transpose()
+        # compare individual data against sample statistics
 
-        iqr = np.percentile(df, 75, axis=0) - np.percentile(df, 25, axis=0)
+        sampleNonparBounds = (sample_nonpar_lower, sample_nonpar_upper)
+        sampleParamBounds = (sample_param_lower, sample_param_upper)
 
-        sample_nonpar_lower = dict(
-            zip(df.columns, np.percentile(df, 25, axis=0) - 1.5 * iqr)
-        )
-        sample_nonpar_upper = dict(
-            zip(df.columns, np.percentile(df, 75, axis=0) + 1.5 * iqr)
-        )
+    else:
+        sampleNonparBounds = None
+        sampleParamBounds = None
 
-        sample_param_lower = dict(np.mean(df, axis=0) - 2 * np.std(df, axis=0))
-        sample_param_upper = dict(np.mean(df, axis=0) + 2 * np.std(df, axis=0))
+    # compare individual data against normative values; there are no prefixes
+    # in the outlier table, and regions that are not in the table are not
+    # flagged
 
-        # compare individual data against sample statistics
+    if isinstance(outlierDict, NormativeBounds):
+        norms = outlierDict
+    else:
+        norms = NormativeBounds.from_dict(outlierDict)
 
-        for subject in regions:
-            nonparDict = dict()
-            paramDict = dict()
+    outlierKeys = list()
+    for key in all_regions_keys:
+        outlierKey = key
+        for prefix in ["aseg.", "aparc.", "hippocampus.", "amygdala."]:
+            if key.startswith(prefix):
+                outlierKey = key.replace(prefix, "")
+                break
+        outlierKeys.append(outlierKey)
 
-            for key in regions[subject]:
-                if (regions[subject][key] < sample_nonpar_lower[key]) or (
-                    regions[subject][key] > sample_nonpar_upper[key]
-                ):
-                    nonparDict.update({key: True})
-                else:
-                    nonparDict.update({key: False})
+    # bounds are looked up once per stratum, with one row per stratum
 
-                if (regions[subject][key] < sample_param_lower[key]) or (
-                    regions[subject][key] > sample_param_upper[key]
-                ):
-                    paramDict.update({key: True})
-                else:
-                    paramDict.update({key: False})
+    if strata is None:
+        subject_strata = [None] * len(subjects)
+    else:
+        subject_strata = [strata.get(subject) for subject in subjects]
+    unique_strata = list(dict.fromkeys(subject_strata))
+    strata_index = dict(zip(unique_strata, range(len(unique_strata))))
+    subject_strata = np.array([strata_index[s] for s in subject_strata], dtype=int)
 
-            outlierSampleNonpar.update({subject: nonparDict})
-            outlierSampleParam.update({subject: paramDict})
+    norms_lower, norms_upper = norms.get_bounds(outlierKeys, unique_strata)
 
-            outlierSampleNonparNum.update({subject: np.sum(list(nonparDict.values()))})
-            outlierSampleParamNum.update({subject: np.sum(list(paramDict.values()))})
+    in_norms = ~np.isnan(norms_lower)
 
-    else:
-        for subject in regions:
-            nonparDict = dict()
-            paramDict = dict()
-
-            for key in regions[subject]:
-                nonparDict.update({key: np.nan})
-                paramDict.update({key: np.nan})
-
-            outlierSampleNonpar.update({subject: nonparDict})
-            outlierSampleParam.update({subject: paramDict})
-
-            outlierSampleNonparNum.update({subject: np.nan})
-            outlierSampleParamNum.update({subject: np.nan})
-
-    # compare individual data against normative values
-
-    outlierNorms = dict()
-
-    outlierNormsNum = dict()
-
-    for subject in regions:
-        normsDict = dict()
-
-        for key in regions[subject]:
-            # no prefixes in outlier table
-            if key.startswith("aseg."):
-                outlierKey = key.replace("aseg.", "")
-            elif key.startswith("aparc."):
-                outlierKey = key.replace("aparc.", "")
-            elif key.startswith("hippocampus."):
-                outlierKey = key.replace("hippocampus.", "")
-            elif key.startswith("amygdala."):
-                outlierKey = key.replace("amygdala.", "")
-            elif key.startswith("hypothalamus."):
-                outlierKey = key.replace("aseg.", "")
-
-            if outlierKey in outlierDict:
-                if (regions[subject][key] < outlierDict[outlierKey]["lower"]) or (
-                    regions[subject][key] > outlierDict[outlierKey]["upper"]
-                ):
-                    normsDict.update({key: True})
-                else:
-                    normsDict.update({key: False})
+    normsBounds = (norms_lower, norms_upper)
 
-            else:
-                normsDict.update({key: np.nan})
+    def _flags(values, rows, bounds):
+        # outlier flags of the values of some rows; the bounds of the norms
+        # have one row per stratum
+        lower, upper = bounds
+        if lower.ndim == 2:
+            lower = lower[subject_strata[rows]]
+            upper = upper[subject_strata[rows]]
+        return (values < lower) | (values > upper)
 
-        outlierNorms.update({subject: normsDict})
+    # count the outliers of each subject, and find the regions without
+    # missing values
 
-        outlierNormsNum.update({subject: np.nansum(list(normsDict.values()))})
+    if sampleNonparBounds is not None:
+        outlierSampleNonparNum = np.zeros(len(subjects), dtype=int)
+        outlierSampleParamNum = np.zeros(len(subjects), dtype=int)
+    else:
+        outlierSampleNonparNum = np.full(len(subjects), np.nan)
+        outlierSampleParamNum = np.full(len(subjects), np.nan)
+    outlierNormsNum = np.zeros(len(subjects))
+    complete = np.ones(len(all_regions_keys), dtype=bool)
+
+    for block in row_blocks:
+        values = regions[block]
+        if sampleNonparBounds is not None:
+            outlierSampleNonparNum[block] = _flags(
+                values, block, sampleNonparBounds
+            ).sum(axis=1)
+            outlierSampleParamNum[block] = _flags(values, block, sampleParamBounds).sum(
+                axis=1
+            )
+        outlierNormsNum[block] = _flags(values, block, normsBounds).sum(axis=1)
+        complete &= ~np.isnan(values).any(axis=0)
+
+    # compute robust multivariate outlier scores from all regions without
+    # missing values
+
+    if multivariate is True:
+        if len(subjects) >= min_no_subjects and complete.any():
+            distance, pvalue = robustMahalanobis(regions[:, complete])
+        else:
+            distance = np.full(len(subjects), np.nan)
+            pvalue = np.full(len(subjects), np.nan)
+
+        outlierMultivariate = dict()
+        for subject, distance_i, pvalue_i in zip(subjects, distance, pvalue):
+            outlierMultivariate.update(
+                {
+                    subject: {
+                        "outlier_multivariate_distance": distance_i,
+                        "outlier_multivariate_pvalue": pvalue_i,
+                    }
+                }
+            )
 
     # write to csv files
 
     regionsFieldnames = ["subject"]
     regionsFieldnames.extend(all_regions_keys)
 
-    with open(os.path.join(output_dir, "all.regions.stats"), "w") as datafile:
-        csvwriter = csv.DictWriter(
-            datafile,
-            fieldnames=regionsFieldnames,
-            delimiter=",",
-            quotechar='"',
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        csvwriter.writeheader()
-        for subject in sorted(list(regions.keys())):
-            tmp = regions[subject]
-            tmp.update({"subject": subject})
-            csvwriter.writerow(tmp)
-
-    with open(
-        os.path.join(output_dir, "all.outliers.sample.nonpar.stats"), "w"
-    ) as datafile:
-        csvwriter = csv.DictWriter(
-            datafile,
-            fieldnames=regionsFieldnames,
-            delimiter=",",
-            quotechar='"',
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        csvwriter.writeheader()
-        for subject in sorted(list(outlierSampleNonpar.keys())):
-            tmp = outlierSampleNonpar[subject]
-            tmp.update({"subject": subject})
-            csvwriter.writerow(tmp)
-
-    with open(
-        os.path.join(output_dir, "all.outliers.sample.param.stats"), "w"
-    ) as datafile:
-        csvwriter = csv.DictWriter(
-            datafile,
-            fieldnames=regionsFieldnames,
-            delimiter=",",
-            quotechar='"',
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        csvwriter.writeheader()
-        for subject in sorted(list(outlierSampleParam.keys())):
-            tmp = outlierSampleParam[subject]
-            tmp.update({"subject": subject})
-            csvwriter.writerow(tmp)
-
-    with open(os.path.join(output_dir, "all.outliers.norms.stats"), "w") as datafile:
-        csvwriter = csv.DictWriter(
-            datafile,
-            fieldnames=regionsFieldnames,
-            delimiter=",",
-            quotechar='"',
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        csvwriter.writeheader()
-        for subject in sorted(list(outlierNorms.keys())):
-            tmp = outlierNorms[subject]
-            tmp.update({"subject": subject})
-            csvwriter.writerow(tmp)
+    order = np.argsort(np.array(subjects, dtype=str), kind="stable")
+
+    for filename, bounds, valid in [
+        ("all.regions.stats", None, None),
+        ("all.outliers.sample.nonpar.stats", sampleNonparBounds, None),
+        ("all.outliers.sample.param.stats", sampleParamBounds, None),
+        ("all.outliers.norms.stats", normsBounds, in_norms),
+    ]:
+        with open(os.path.join(output_dir, filename), "w") as datafile:
+            csvwriter = csv.writer(
+                datafile,
+                delimiter=",",
+                quotechar='"',
+                quoting=csv.QUOTE_MINIMAL,
+            )
+            csvwriter.writerow(regionsFieldnames)
+            # cells are converted to strings in blocks of rows
+            for block in csv_blocks:
+                rows = order[block]
+                values = regions[rows]
+                if filename == "all.regions.stats":
+                    cells = values.astype(str)
+                elif bounds is None:
+                    cells = np.full(values.shape, "nan")
+                else:
+                    cells = np.where(_flags(values, rows, bounds), "True", "False")
+                if valid is not None:
+                    cells = np.where(valid[subject_strata[rows]], cells, "nan")
+                # missing values are left empty
+                cells = np.where(np.isnan(values), "", cells)
+                for subject_index, row in zip(rows, cells.tolist()):
+                    csvwriter.writerow([subjects[subject_index]] + row)
+
+    if multivariate is True:
+        with open(
+            os.path.join(output_dir, "all.outliers.multivariate.stats"), "w"
+        ) as datafile:
+            csvwriter = csv.writer(
+                datafile,
+                delimiter=",",
+                quotechar='"',
+                quoting=csv.QUOTE_MINIMAL,
+            )
+            csvwriter.writerow(["subject", "distance", "pvalue"])
+            for j in order:
+                csvwriter.writerow([subjects[j], distance[j], pvalue[j]])
 
     # return
 
-    return outlierSampleNonparNum, outlierSampleParamNum, outlierNormsNum
+    if multivariate is True:
+        return (
+            dict(zip(subjects, outlierSampleNonparNum)),
+            dict(zip(subjects, outlierSampleParamNum)),
+            dict(zip(subjects, outlierNormsNum)),
+            outlierMultivariate,
+        )
+
+    return (
+        dict(zip(subjects, outlierSampleNonparNum)),
+        dict(zip(subjects, outlierSampleParamNum)),
+        dict(zip(subjects, outlierNormsNum)),
+    )
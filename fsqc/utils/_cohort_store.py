@@ -0,0 +1,374 @@
+"""Columnar store of the regional stats of a cohort."""
+
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ._imports import import_optional_dependency
+
+
+def allocate(shape, max_memory=None, directory=None, fill_value=np.nan):
+    """Allocate a float64 matrix, memory-mapped if it exceeds a memory budget.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the matrix.
+    max_memory : int | None
+        Memory budget in bytes. If the matrix is larger, it is backed by an
+        anonymous temporary file. If None, the size is not limited.
+    directory : str | None
+        Directory of the temporary file; default is the system temp directory.
+    fill_value : float
+        Initial value of all elements, default is NaN.
+
+    Returns
+    -------
+    numpy.ndarray
+        The matrix; a numpy.memmap if the memory budget is exceeded.
+    """
+    nbytes = int(np.prod(shape)) * np.dtype(float).itemsize
+    if max_memory is not None and nbytes > max_memory:
+        # the file is removed as soon as the matrix is garbage-collected
+        with tempfile.TemporaryFile(dir=directory) as f:
+            matrix = np.memmap(f, dtype=float, mode="w+", shape=shape)
+    else:
+        matrix = np.empty(shape, dtype=float)
+    matrix.fill(fill_value)
+    return matrix
+
+
+def block_size(n, n_other, max_memory=None, factor=1):
+    """Get the number of rows or columns of a block within a memory budget.
+
+    Parameters
+    ----------
+    n : int
+        Number of rows or columns to be split into blocks.
+    n_other : int
+        Length of the other dimension.
+    max_memory : int | None
+        Memory budget in bytes; if None, a single block is used.
+    factor : int
+        Number of float64 copies of a block needed for processing it.
+
+    Returns
+    -------
+    int
+        Block size, at least 1.
+    """
+    if max_memory is None:
+        return max(n, 1)
+    bytes_per_item = max(n_other, 1) * np.dtype(float).itemsize * factor
+    return int(min(max(max_memory // bytes_per_item, 1), max(n, 1)))
+
+
+class CohortStore:
+    """Columnar store of the regional stats of a cohort.
+
+    The store holds one row per subject and one column per region, together
+    with a signature of the stats files the row was read from. It is kept as
+    a Parquet file if pyarrow is available, and as an NPZ file otherwise. On
+    a re-run, only subjects whose stats files have changed need to be read
+    again.
+
+    In memory, the table is a preallocated float64 matrix with maps from
+    subjects and regions to rows and columns. Added subjects are written into
+    the matrix in chunks. If the matrix exceeds the memory budget, it is
+    memory-mapped to a temporary file instead.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the store file; an existing store will be read.
+    max_memory : int | None
+        Memory budget in bytes for the table. If None, the size is not
+        limited.
+    """
+
+    # number of added subjects that are collected before they are written
+    # into the matrix
+    chunk_size = 256
+
+    def __init__(self, directory: str, max_memory: Optional[int] = None):
+        if import_optional_dependency("pyarrow", raise_error=False) is not None:
+            self.filename = os.path.join(directory, "fsqc-cohort-stats.parquet")
+        else:
+            self.filename = os.path.join(directory, "fsqc-cohort-stats.npz")
+
+        self.directory = directory
+        self.max_memory = max_memory
+
+        self._subjects = dict()
+        self._columns = dict()
+        self._values = allocate((0, 0))
+        self._signatures = dict()
+        self._updates = dict()
+
+        if os.path.isfile(self.filename):
+            self._read()
+
+    def _read(self):
+        """Read the store file, in blocks of rows."""
+        if self.filename.endswith(".parquet"):
+            pq = import_optional_dependency("pyarrow.parquet")
+            parquet = pq.ParquetFile(self.filename)
+            index = parquet.schema_arrow.pandas_metadata["index_columns"][0]
+            keys = parquet.read(columns=[index, "signature"])
+            subjects = [str(subject) for subject in keys.column(index).to_pylist()]
+            columns = [
+                str(column)
+                for column in parquet.schema_arrow.names
+                if column not in (index, "signature")
+            ]
+            signatures = [
+                str(signature) for signature in keys.column("signature").to_pylist()
+            ]
+        else:
+            npz = np.load(self.filename, allow_pickle=False)
+            subjects = [str(subject) for subject in npz["subjects"]]
+            columns = [str(column) for column in npz["columns"]]
+            signatures = [str(signature) for signature in npz["signatures"]]
+        self._subjects = {subject: i for i, subject in enumerate(subjects)}
+        self._columns = {column: j for j, column in enumerate(columns)}
+        self._values = allocate(
+            (len(subjects), len(columns)), self.max_memory, self.directory
+        )
+        self._signatures = dict(zip(subjects, signatures))
+
+        step = block_size(len(subjects), len(columns), self.max_memory, factor=2)
+        if self.filename.endswith(".parquet"):
+            start = 0
+            for batch in parquet.iter_batches(batch_size=step, columns=columns):
+                for j, column in enumerate(batch.columns):
+                    self._values[start : start + batch.num_rows, j] = column.to_numpy(
+                        zero_copy_only=False
+                    )
+                start += batch.num_rows
+        else:
+            # the values are read from the uncompressed npy member of the file
+            with npz, npz.zip.open("values.npy") as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                if fortran_order:
+                    self._values[:] = npz["values"]
+                else:
+                    for start in range(0, shape[0], step):
+                        n = min(step, shape[0] - start)
+                        block = np.frombuffer(
+                            f.read(n * shape[1] * dtype.itemsize), dtype=dtype
+                        )
+                        self._values[start : start + n] = block.reshape(n, shape[1])
+
+    def _merge(self):
+        """Write added or replaced subjects into the matrix."""
+        if not self._updates:
+            return
+
+        n_rows = len(self._subjects)
+        for subject, values in self._updates.items():
+            if subject not in self._subjects:
+                self._subjects[subject] = len(self._subjects)
+            for column in values:
+                if column not in self._columns:
+                    self._columns[column] = len(self._columns)
+
+        # grow the matrix if needed; rows are allocated in advance to avoid
+        # copying the matrix for every chunk
+        shape = self._values.shape
+        if len(self._subjects) > shape[0] or len(self._columns) > shape[1]:
+            if len(self._subjects) > shape[0]:
+                n_alloc = max(len(self._subjects), 2 * shape[0])
+            else:
+                n_alloc = shape[0]
+            values = allocate(
+                (n_alloc, len(self._columns)), self.max_memory, self.directory
+            )
+            values[:n_rows, : shape[1]] = self._values[:n_rows]
+            self._values = values
+
+        for subject, values in self._updates.items():
+            row = self._subjects[subject]
+            self._values[row] = np.nan
+            columns = [self._columns[column] for column in values]
+            self._values[row, columns] = list(values.values())
+
+        self._updates = dict()
+
+    def has(self, subject: str, signature: str) -> bool:
+        """Check if the current stats of a subject are in the store.
+
+        Parameters
+        ----------
+        subject : str
+            The subject ID.
+        signature : str
+            Signature of the current stats files of the subject.
+
+        Returns
+        -------
+        bool
+            True if the subject is in the store and its stats files have not
+            changed.
+        """
+        return self._signatures.get(subject) == signature
+
+    def get(self, subject: str, signature: str):
+        """Get the stats of a subject.
+
+        Parameters
+        ----------
+        subject : str
+            The subject ID.
+        signature : str
+            Signature of the current stats files of the subject.
+
+        Returns
+        -------
+        values : dict | None
+            The stats of the subject, keyed by region, or None if the subject
+            is not in the store or if its stats files have changed.
+        """
+        if not self.has(subject, signature):
+            return None
+        if subject in self._updates:
+            return self._updates[subject]
+        row = self._values[self._subjects[subject]]
+        return {
+            column: float(row[j])
+            for column, j in self._columns.items()
+            if not np.isnan(row[j])
+        }
+
+    def set(self, subject: str, signature: str, values: dict):
+        """Add or replace the stats of a subject.
+
+        Parameters
+        ----------
+        subject : str
+            The subject ID.
+        signature : str
+            Signature of the stats files of the subject.
+        values : dict
+            The stats of the subject, keyed by region.
+        """
+        self._updates[subject] = values
+        self._signatures[subject] = signature
+        if len(self._updates) >= self.chunk_size:
+            self._merge()
+
+    def _rows(self, subjects):
+        """Get the rows of subjects."""
+        if subjects is None:
+            return np.arange(len(self._subjects))
+        return np.array([self._subjects[subject] for subject in subjects], dtype=int)
+
+    def columns(self, subjects=None) -> list:
+        """Get the regions with values for any of the given subjects.
+
+        Parameters
+        ----------
+        subjects : list of str, optional
+            Subjects to consider. Default is all subjects.
+
+        Returns
+        -------
+        list of str
+            The regions, in the order of the store.
+        """
+        self._merge()
+        rows = self._rows(subjects)
+        n_columns = len(self._columns)
+        has_values = np.zeros(n_columns, dtype=bool)
+        step = block_size(len(rows), n_columns, self.max_memory)
+        for start in range(0, len(rows), step):
+            block = self._values[rows[start : start + step], :n_columns]
+            has_values |= ~np.isnan(block).all(axis=0)
+        return [column for column, j in self._columns.items() if has_values[j]]
+
+    def table(self, subjects=None, columns=None) -> pd.DataFrame:
+        """Get the stats as a table.
+
+        Parameters
+        ----------
+        subjects : list of str, optional
+            Subjects to include, in this order. Default is all subjects.
+        columns : list of str, optional
+            Regions to include, in this order. Default is all regions with
+            values for any of the subjects.
+
+        Returns
+        -------
+        df : pandas.DataFrame
+            Table with one row per subject and one column per region. Missing
+            values are NaN. The table is backed by a memory-mapped file if it
+            exceeds the memory budget.
+        """
+        if columns is None:
+            columns = self.columns(subjects)
+        else:
+            self._merge()
+        if subjects is None:
+            subjects = list(self._subjects.keys())
+        rows = self._rows(subjects)
+        cols = np.array([self._columns[column] for column in columns], dtype=int)
+        values = allocate((len(rows), len(cols)), self.max_memory, self.directory)
+        step = block_size(len(rows), len(self._columns), self.max_memory)
+        for start in range(0, len(rows), step):
+            block = self._values[rows[start : start + step]]
+            values[start : start + step] = block[:, cols]
+        return pd.DataFrame(
+            values, index=list(subjects), columns=list(columns), copy=False
+        )
+
+    def save(self):
+        """Write the store file.
+
+        The whole store is written at once, rather than appending the added
+        subjects, since added regions and replaced subjects also change the
+        existing rows. Rows are written in blocks within the memory budget.
+        The file is written to a temporary file first and then renamed.
+        """
+        self._merge()
+        subjects = list(self._subjects.keys())
+        columns = list(self._columns.keys())
+        values = self._values[: len(subjects), : len(columns)]
+        signatures = [self._signatures[subject] for subject in subjects]
+        tmpfile = self.filename + ".tmp"
+        if self.filename.endswith(".parquet"):
+            pa = import_optional_dependency("pyarrow")
+            pq = import_optional_dependency("pyarrow.parquet")
+            # each block of rows is written as a row group
+            step = block_size(len(subjects), len(columns), self.max_memory, factor=2)
+            writer = None
+            try:
+                for start in range(0, max(len(subjects), 1), step):
+                    block = slice(start, start + step)
+                    df = pd.DataFrame(
+                        values[block], index=subjects[block], columns=columns
+                    )
+                    df["signature"] = signatures[block]
+                    table = pa.Table.from_pandas(df, preserve_index=True)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmpfile, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            # the values are written from the matrix in blocks by numpy
+            with open(tmpfile, "wb") as f:
+                np.savez(
+                    f,
+                    subjects=np.array(subjects, dtype=str),
+                    columns=np.array(columns, dtype=str),
+                    values=values,
+                    signatures=np.array(signatures, dtype=str),
+                )
+        os.replace(tmpfile, self.filename)
@@ -0,0 +1,163 @@
+"""On-disk cache of decompressed image volumes."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+
+
+class DiskCache:
+    """On-disk cache of decompressed image volumes.
+
+    The data of each volume is stored as an uncompressed .npy file, which is
+    memory-mapped when it is loaded again. Entries are keyed by the absolute
+    path, size, and modification time of the source file, such that modified
+    files are not loaded from the cache. Entries are written atomically, so
+    the cache can be shared by parallel processes. If the total size of the
+    cache exceeds its maximum size, the least recently used entries are
+    removed. Temporary files of entries that are still being written count
+    towards the size of the cache; those that were left behind by terminated
+    processes are removed once they are older than ``stale_after`` seconds.
+
+    Parameters
+    ----------
+    directory : str
+        The cache directory. Will be created if it does not exist.
+    max_size : int | None
+        Maximum size of the cache in bytes. If None, the size is not limited.
+    source_dir : str | None
+        If given, only files within this directory (e.g., the subjects
+        directory) are cached, but not, e.g., intermediate files that are
+        re-created in every run.
+    """
+
+    stale_after = 600
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: Optional[int] = None,
+        source_dir: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        self.source_dir = None if source_dir is None else os.path.abspath(source_dir)
+        os.makedirs(directory, exist_ok=True)
+
+    def is_cacheable(self, filename: str) -> bool:
+        """Check if a file is eligible for caching.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the source file.
+
+        Returns
+        -------
+        bool
+            True for compressed files (.mgz, .gz) within the source directory.
+        """
+        filename = os.path.abspath(filename)
+        if not filename.endswith((".mgz", ".gz")):
+            return False
+        if self.source_dir is not None:
+            return filename.startswith(os.path.join(self.source_dir, ""))
+        return True
+
+    def _path(self, filename: str) -> str:
+        """Get the path of the cache entry for a source file."""
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        key = f"{filename}:{stat.st_size}:{stat.st_mtime_ns}"
+        return os.path.join(
+            self.directory, hashlib.sha1(key.encode()).hexdigest() + ".npy"
+        )
+
+    def load(self, filename: str):
+        """Load the data of a volume from the cache.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the source file.
+
+        Returns
+        -------
+        data : numpy.ndarray | None
+            Read-only, memory-mapped data, or None if the volume is not cached.
+        """
+        path = self._path(filename)
+        try:
+            data = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def save(self, filename: str, data: np.ndarray):
+        """Save the data of a volume to the cache.
+
+        Parameters
+        ----------
+        filename : str
+            Path to the source file.
+        data : numpy.ndarray
+            The data of the volume.
+        """
+        path = self._path(filename)
+        fd, tmpfile = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(data))
+            os.replace(tmpfile, path)
+        except OSError as e:
+            logging.warning("Could not write to volume cache: " + str(e))
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove stale temporary files and the least recently used entries.
+
+        Temporary files older than ``stale_after`` seconds are removed. If the
+        total size of the cache exceeds the maximum size, the least recently
+        used entries are removed until it fits.
+        """
+        stale = time.time() - self.stale_after
+        entries = list()
+        size = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith((".npy", ".tmp")):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp") and stat.st_mtime < stale:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            size += stat.st_size
+            if entry.name.endswith(".npy"):
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        if self.max_size is None:
+            return
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
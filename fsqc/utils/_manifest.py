@@ -0,0 +1,246 @@
+"""Manifest of processed subjects and modules for incremental runs."""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+# Version of the manifest file format; manifests with a different format
+# version are discarded.
+MANIFEST_FORMAT = 1
+
+
+def _to_json(obj):
+    """Convert numpy types for JSON serialization."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.floating):
+        # use the shortest representation, such that e.g. float32 values are
+        # written to the results table in the same way as without the manifest
+        return float(str(obj))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _normalize(obj):
+    """Normalize an object to its JSON representation (e.g., tuples to lists)."""
+    return json.loads(json.dumps(obj, default=_to_json))
+
+
+def file_signature(files, checksums: bool = False) -> dict:
+    """Compute the signature of a list of files.
+
+    Parameters
+    ----------
+    files : list of str
+        The files.
+    checksums : bool, default=False
+        If True, include the SHA-256 hash of the file contents.
+
+    Returns
+    -------
+    signature : dict
+        Dictionary with the size and modification time (and, optionally, the
+        hash) of each file. Missing files are recorded as None.
+    """
+    signature = dict()
+    for file in files:
+        if not os.path.isfile(file):
+            signature[file] = None
+            continue
+        stat = os.stat(file)
+        signature[file] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if checksums:
+            sha256 = hashlib.sha256()
+            with open(file, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(chunk)
+            signature[file]["sha256"] = sha256.hexdigest()
+    return signature
+
+
+def _same_signature(recorded: dict, current: dict) -> bool:
+    """Compare two file signatures.
+
+    Files are considered unchanged if their hashes match or, if no hashes are
+    available, if their sizes and modification times match.
+    """
+    if recorded.keys() != current.keys():
+        return False
+    for file, rec in recorded.items():
+        cur = current[file]
+        if rec is None or cur is None:
+            if rec is not cur:
+                return False
+        elif rec["size"] != cur["size"]:
+            return False
+        elif "sha256" in rec and "sha256" in cur:
+            if rec["sha256"] != cur["sha256"]:
+                return False
+        elif rec["mtime_ns"] != cur["mtime_ns"]:
+            return False
+    return True
+
+
+def lookup_module(
+    records: dict,
+    module: str,
+    files,
+    settings: dict,
+    version: str,
+    checksums: bool = False,
+):
+    """Look up the results of a module from a previous run.
+
+    Parameters
+    ----------
+    records : dict
+        The manifest records of a subject, see `Manifest.get`.
+    module : str
+        Name of the module.
+    files : list of str
+        Input files of the module.
+    settings : dict
+        Settings of the module.
+    version : str
+        Current fsqc version.
+    checksums : bool, default=False
+        If True, compare the contents of the input files using hashes.
+
+    Returns
+    -------
+    result : dict | None
+        The recorded results of the module, or None if the module needs to be
+        run again, i.e. if it was not recorded, if the fsqc version, the
+        settings, or the input files changed, or if any of its output files
+        no longer exists.
+    """
+    record = records.get(module)
+    if record is None:
+        return None
+    if record["version"] != version or record["settings"] != _normalize(settings):
+        return None
+    if not _same_signature(record["inputs"], file_signature(files, checksums)):
+        return None
+    if not all(os.path.exists(output) for output in record["outputs"]):
+        return None
+    return record["result"]
+
+
+def record_module(
+    records: dict,
+    module: str,
+    files,
+    settings: dict,
+    version: str,
+    result: dict,
+    outputs=(),
+    checksums: bool = False,
+):
+    """Record the results of a module.
+
+    Parameters
+    ----------
+    records : dict
+        The manifest records of a subject, see `Manifest.get`. Will be updated
+        in-place.
+    module : str
+        Name of the module.
+    files : list of str
+        Input files of the module.
+    settings : dict
+        Settings of the module.
+    version : str
+        Current fsqc version.
+    result : dict
+        Results of the module; must be JSON serializable (numpy types are
+        converted).
+    outputs : list of str
+        Output files or directories of the module; the recorded results are
+        only reused while these exist.
+    checksums : bool, default=False
+        If True, record hashes of the input files.
+    """
+    records[module] = _normalize(
+        {
+            "version": version,
+            "settings": settings,
+            "inputs": file_signature(files, checksums),
+            "outputs": list(outputs),
+            "result": result,
+        }
+    )
+
+
+class Manifest:
+    """Manifest of processed subjects and modules.
+
+    The manifest is stored as a JSON file and contains, for each subject and
+    module, the fsqc version, the module settings, the signature of the
+    input files, and the results of the module.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the manifest file. An existing manifest will be read.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.subjects = dict()
+
+        if os.path.isfile(filename):
+            try:
+                with open(filename) as f:
+                    manifest = json.load(f)
+                if manifest.get("format") == MANIFEST_FORMAT:
+                    self.subjects = manifest["subjects"]
+                else:
+                    logging.info("Discarding manifest with different format")
+            except Exception as e:
+                logging.warning("Could not read manifest " + filename + ": " + str(e))
+
+    def get(self, subject: str) -> dict:
+        """Get the records of a subject.
+
+        Parameters
+        ----------
+        subject : str
+            The subject ID.
+
+        Returns
+        -------
+        records : dict
+            A copy of the records of the subject, keyed by module name.
+        """
+        return dict(self.subjects.get(subject, dict()))
+
+    def set(self, subject: str, records: dict):
+        """Set the records of a subject.
+
+        Parameters
+        ----------
+        subject : str
+            The subject ID.
+        records : dict
+            The records of the subject, keyed by module name.
+        """
+        self.subjects[subject] = records
+
+    def save(self):
+        """Write the manifest file.
+
+        The file is written to a temporary file first and then renamed, such
+        that an interrupted run does not leave a corrupted manifest.
+        """
+        tmpfile = self.filename + ".tmp"
+        with open(tmpfile, "w") as f:
+            json.dump(
+                {"format": MANIFEST_FORMAT, "subjects": self.subjects},
+                f,
+                default=_to_json,
+            )
+        os.replace(tmpfile, self.filename)
@@ -0,0 +1,234 @@
+"""Compiled normative bounds for outlier detection."""
+
+import csv
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class NormativeBounds:
+    """Lower and upper normative bounds, keyed by region and stratum.
+
+    The bounds are kept as dense arrays with one row per stratum (e.g., an
+    age group and sex) and one column per region label. The stratum ``""``
+    holds the bounds that apply to all subjects; they are used for subjects
+    without a stratum and for regions that are missing in a stratum. Bounds
+    can be compiled from a csv table and saved as an NPZ file, which is
+    faster to load than re-parsing the table.
+
+    Parameters
+    ----------
+    labels : list of str
+        Region labels, without prefixes (e.g., "Left-Hippocampus").
+    strata : list of str
+        Strata names.
+    lower : numpy.ndarray
+        Lower bounds, shape (n_strata, n_labels); NaN if not available.
+    upper : numpy.ndarray
+        Upper bounds, shape (n_strata, n_labels); NaN if not available.
+    """
+
+    def __init__(self, labels, strata, lower, upper):
+        self.labels = list(labels)
+        self.strata = list(strata)
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+
+    @classmethod
+    def from_dict(cls, outlierDict):
+        """Create bounds from a dictionary.
+
+        Parameters
+        ----------
+        outlierDict : dict
+            Dictionary with region labels as keys, and dictionaries with
+            "lower" and "upper" keys as values, as returned by outlierTable().
+
+        Returns
+        -------
+        norms : NormativeBounds
+            Bounds that apply to all subjects.
+        """
+        labels = list(outlierDict.keys())
+        lower = [[outlierDict[label]["lower"] for label in labels]]
+        upper = [[outlierDict[label]["upper"] for label in labels]]
+        return cls(labels, [""], lower, upper)
+
+    @classmethod
+    def from_csv(cls, filename: str):
+        """Compile bounds from a csv table.
+
+        Parameters
+        ----------
+        filename : str
+            Table with headers `label`, `lower`, and `upper`, and an optional
+            `stratum` column. Rows with an empty or missing stratum apply to
+            all subjects.
+
+        Returns
+        -------
+        norms : NormativeBounds
+            The compiled bounds.
+        """
+        bounds = dict()
+        with open(filename, newline="") as csvfile:
+            for row in csv.DictReader(csvfile, delimiter=","):
+                stratum = row.get("stratum") or ""
+                bounds.setdefault(stratum, dict())[row["label"]] = (
+                    float(row["lower"]),
+                    float(row["upper"]),
+                )
+
+        strata = [""] + sorted(stratum for stratum in bounds if stratum != "")
+        labels = list(dict.fromkeys(label for b in bounds.values() for label in b))
+        lower = np.full((len(strata), len(labels)), np.nan)
+        upper = np.full((len(strata), len(labels)), np.nan)
+        for i, stratum in enumerate(strata):
+            for j, label in enumerate(labels):
+                if label in bounds.get(stratum, dict()):
+                    lower[i, j], upper[i, j] = bounds[stratum][label]
+        return cls(labels, strata, lower, upper)
+
+    @classmethod
+    def from_file(cls, filename: str, cache_dir: Optional[str] = None):
+        """Load bounds from a csv table or a compiled NPZ file.
+
+        Parameters
+        ----------
+        filename : str
+            A csv table (see from_csv) or an NPZ file written by save().
+        cache_dir : str, optional
+            If given, a compiled copy of a csv table is kept in this directory
+            and reused as long as the table has not changed.
+
+        Returns
+        -------
+        norms : NormativeBounds
+            The bounds.
+        """
+        if filename.endswith(".npz"):
+            return cls.load(filename)
+
+        stat = os.stat(filename)
+        source = json.dumps([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns])
+
+        if cache_dir is not None:
+            cachefile = os.path.join(cache_dir, "fsqc-norms.npz")
+            if os.path.isfile(cachefile):
+                norms, cached_source = cls.load(cachefile, return_source=True)
+                if cached_source == source:
+                    return norms
+
+        norms = cls.from_csv(filename)
+
+        if cache_dir is not None:
+            norms.save(cachefile, source=source)
+
+        return norms
+
+    def save(self, filename: str, source: str = ""):
+        """Write the compiled bounds to an NPZ file.
+
+        The file is written to a temporary file first and then renamed.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the NPZ file.
+        source : str, optional
+            Signature of the table the bounds were compiled from.
+        """
+        tmpfile = filename + ".tmp"
+        with open(tmpfile, "wb") as f:
+            np.savez(
+                f,
+                labels=np.array(self.labels, dtype=str),
+                strata=np.array(self.strata, dtype=str),
+                lower=self.lower,
+                upper=self.upper,
+                source=np.array(source, dtype=str),
+            )
+        os.replace(tmpfile, filename)
+
+    @classmethod
+    def load(cls, filename: str, return_source: bool = False):
+        """Read compiled bounds from an NPZ file.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the NPZ file.
+        return_source : bool, optional
+            Also return the signature of the table the bounds were compiled
+            from.
+
+        Returns
+        -------
+        norms : NormativeBounds
+            The bounds.
+        source : str
+            Only if return_source is True.
+        """
+        with np.load(filename, allow_pickle=False) as npz:
+            norms = cls(
+                [str(label) for label in npz["labels"]],
+                [str(stratum) for stratum in npz["strata"]],
+                npz["lower"],
+                npz["upper"],
+            )
+            source = str(npz["source"])
+        if return_source:
+            return norms, source
+        return norms
+
+    def get_bounds(self, labels, strata=None):
+        """Get the bounds for a subjects x regions table.
+
+        Parameters
+        ----------
+        labels : list of str
+            Region labels of the columns of the table.
+        strata : list of str or None, optional
+            Stratum of each subject, or None for subjects without a stratum
+            and unknown strata. If None, all subjects use the bounds that
+            apply to all subjects, and the returned arrays have a single row.
+
+        Returns
+        -------
+        lower : numpy.ndarray
+            Lower bounds, shape (n_subjects, n_labels); NaN if not available.
+        upper : numpy.ndarray
+            Upper bounds, shape (n_subjects, n_labels); NaN if not available.
+        """
+        # align columns, with an extra all-NaN column for unknown labels
+        lookup = {label: j for j, label in enumerate(self.labels)}
+        columns = np.array([lookup.get(label, -1) for label in labels], dtype=int)
+        nan_column = np.full((len(self.strata), 1), np.nan)
+        lower = np.hstack([self.lower, nan_column])[:, columns]
+        upper = np.hstack([self.upper, nan_column])[:, columns]
+
+        # use the bounds for all subjects where a stratum has none
+        if "" in self.strata:
+            default = self.strata.index("")
+            missing = np.isnan(lower)
+            lower = np.where(missing, lower[default], lower)
+            upper = np.where(missing, upper[default], upper)
+        else:
+            default = None
+
+        if strata is None:
+            rows = np.array([-1 if default is None else default])
+        else:
+            lookup = {stratum: i for i, stratum in enumerate(self.strata)}
+            fallback = -1 if default is None else default
+            rows = np.array(
+                [lookup.get(stratum, fallback) for stratum in strata], dtype=int
+            )
+
+        # append an all-NaN row for subjects without any applicable bounds
+        lower = np.vstack([lower, np.full((1, len(labels)), np.nan)])[rows]
+        upper = np.vstack([upper, np.full((1, len(labels)), np.nan)])[rows]
+
+        return lower, upper
@@ -0,0 +1,185 @@
+"""Memory usage of the QC modules across runs."""
+
+import json
+import os
+import threading
+from typing import Optional
+
+import psutil
+
+# Version of the resources file format; files with a different format version
+# are discarded.
+RESOURCES_FORMAT = 1
+
+
+def rss() -> float:
+    """Get the resident memory of the current process.
+
+    Returns
+    -------
+    float
+        Resident set size in MB.
+    """
+    return psutil.Process().memory_info().rss / 1024**2
+
+
+class MemoryMonitor:
+    """Peak resident memory of the current process while a task runs.
+
+    The resident memory is sampled in a background thread. The peak is taken
+    relative to the memory at the start of the task; if other tasks run in
+    other threads of the same process at the same time, their memory is
+    included, and the peak has to be shared among the concurrent tasks.
+
+    Parameters
+    ----------
+    interval : float
+        Sampling interval in seconds, default is 0.05.
+
+    Attributes
+    ----------
+    peak : float
+        Peak memory in MB above the memory at the start; available after the
+        monitor has been exited.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._max = max(self._max, rss())
+
+    def __enter__(self):
+        self._start = rss()
+        self._max = self._start
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self._max, rss()) - self._start
+        return False
+
+
+class ResourceLog:
+    """Peak memory of the QC modules, as observed in earlier runs.
+
+    For each module, the peak memory is kept, along with the resident memory
+    of a process at the start of a subject (``baseline``). Within a run, the
+    largest peak of all subjects is taken. Across runs, the stored peak of a
+    module decays with each run in which the module is observed again, such
+    that a single outlying run does not inflate the expected memory forever.
+    The log is kept as fsqc-resources.json in the output directory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the log file; an existing log will be read.
+    decay : float
+        Factor applied to the stored peak of a module when it is observed
+        again, default is 0.8. The new peak is the larger of the decayed
+        peak and the largest peak of the current run.
+
+    Attributes
+    ----------
+    peaks : dict
+        Peak memory in MB of earlier runs, keyed by module name.
+    """
+
+    def __init__(self, directory: str, decay: float = 0.8):
+        self.filename = os.path.join(directory, "fsqc-resources.json")
+        self.decay = decay
+        self.peaks = dict()
+        self._observed = dict()
+
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename) as f:
+                    contents = json.load(f)
+                if contents.get("format") == RESOURCES_FORMAT:
+                    self.peaks = {
+                        name: float(value)
+                        for name, value in contents["peak_memory_mb"].items()
+                    }
+            except (OSError, ValueError, KeyError, AttributeError):
+                self.peaks = dict()
+
+    def get(self, name: str, default: Optional[float] = None):
+        """Get the peak memory of a module in earlier runs.
+
+        Parameters
+        ----------
+        name : str
+            Name of the module, or "baseline".
+        default : float, optional
+            Value to return if the module has not been observed.
+
+        Returns
+        -------
+        float
+            The peak memory in MB.
+        """
+        return self.peaks.get(name, default)
+
+    def update(self, peaks: dict):
+        """Add peak memory values observed in the current run.
+
+        Parameters
+        ----------
+        peaks : dict
+            Peak memory in MB, keyed by module name (or "baseline").
+        """
+        for name, peak in peaks.items():
+            self._observed[name] = max(self._observed.get(name, 0.0), float(peak))
+
+    def save(self):
+        """Write the log file, including the peaks of the current run.
+
+        The file is written to a temporary file first and then renamed. It
+        may be saved several times during a run.
+        """
+        peaks = dict(self.peaks)
+        for name, peak in self._observed.items():
+            peaks[name] = max(peak, self.decay * self.peaks.get(name, 0.0))
+
+        tmpfile = self.filename + ".tmp"
+        with open(tmpfile, "w") as f:
+            json.dump(
+                {
+                    "format": RESOURCES_FORMAT,
+                    "peak_memory_mb": {
+                        name: round(peak, 1) for name, peak in sorted(peaks.items())
+                    },
+                },
+                f,
+                indent=2,
+            )
+        os.replace(tmpfile, self.filename)
+
+
+def expected_memory(estimates, baseline=0.0, n_concurrent=1) -> float:
+    """Get the expected peak memory of a subject.
+
+    Parameters
+    ----------
+    estimates : list of float
+        Expected peak memory of each task of the subject (e.g., each module
+        or part of a module).
+    baseline : float
+        Memory of a process before the first task has started.
+    n_concurrent : int
+        Number of tasks that run at the same time.
+
+    Returns
+    -------
+    float
+        The baseline plus the sum of the ``n_concurrent`` largest estimates.
+    """
+    return baseline + sum(sorted(estimates, reverse=True)[: max(n_concurrent, 1)])
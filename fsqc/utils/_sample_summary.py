@@ -0,0 +1,324 @@
+"""Mergeable summary of the regional stats of a sample."""
+
+import os
+from typing import Optional
+
+import numpy as np
+
+
+def _compress(means, weights, compression):
+    """Compress a quantile sketch.
+
+    Sorts the centroids and, if there are more than ``compression`` of them,
+    merges neighboring centroids such that each merged centroid covers at
+    most one unit of the scale function k(q) = compression / (2 * pi) *
+    arcsin(2 * q - 1). Centroids near the tails of the distribution thus
+    remain small, as in a t-digest.
+    """
+    order = np.argsort(means, kind="stable")
+    means = means[order]
+    weights = weights[order]
+    if len(means) <= compression:
+        return means, weights
+    q = (np.cumsum(weights) - weights / 2) / weights.sum()
+    k = compression / (2 * np.pi) * np.arcsin(2 * q - 1) + compression / 4
+    groups = np.floor(k).astype(int)
+    starts = np.flatnonzero(np.diff(groups, prepend=-1))
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return merged_means, merged_weights
+
+
+class SampleSummary:
+    """Mergeable summary of the regional stats of a sample.
+
+    For each region, the number of values, their mean, and the sum of squared
+    deviations from the mean are kept for the parametric outlier bounds, and a
+    t-digest-like quantile sketch for the nonparametric bounds. Summaries of
+    disjoint parts of a cohort (e.g., shards processed by separate jobs) can
+    be merged to obtain the statistics of the whole cohort without loading
+    all of its data at once. Missing values are ignored.
+
+    Parameters
+    ----------
+    compression : int, optional
+        Maximum number of centroids of the quantile sketch of each region
+        before it is compressed. Percentiles are exact as long as a region
+        has at most this number of values. Default is 200.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.n_subjects = 0
+        self.regions = list()
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.centroids = list()
+
+    @classmethod
+    def from_table(cls, df, compression: int = 200, max_memory: Optional[int] = None):
+        """Summarize a table of regional stats.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Table with one row per subject and one column per region; missing
+            values are NaN.
+        compression : int, optional
+            Compression of the quantile sketches, default is 200.
+        max_memory : int, optional
+            Memory budget in bytes for temporary copies of the table, which is
+            processed in blocks of columns. Default is None (no limit).
+
+        Returns
+        -------
+        summary : SampleSummary
+            The summary of the table.
+        """
+        from ._cohort_store import block_size
+
+        summary = cls(compression=compression)
+        n_subjects, n_regions = df.shape
+        summary.n_subjects = n_subjects
+        summary.regions = [str(region) for region in df.columns]
+        summary.count = np.zeros(n_regions)
+        summary.mean = np.zeros(n_regions)
+        summary.m2 = np.zeros(n_regions)
+
+        step = block_size(n_regions, n_subjects, max_memory, factor=4)
+        for start in range(0, n_regions, step):
+            block = slice(start, start + step)
+            values = df.iloc[:, block].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            count = present.sum(axis=0).astype(float)
+            mean = np.divide(
+                np.where(present, values, 0).sum(axis=0),
+                count,
+                out=np.zeros(values.shape[1]),
+                where=count > 0,
+            )
+            summary.count[block] = count
+            summary.mean[block] = mean
+            summary.m2[block] = (np.where(present, values - mean, 0) ** 2).sum(axis=0)
+            summary.centroids.extend(
+                _compress(
+                    values[present[:, i], i],
+                    np.ones(present[:, i].sum()),
+                    compression,
+                )
+                for i in range(values.shape[1])
+            )
+        return summary
+
+    def add(self, df):
+        """Add a table of regional stats of further subjects.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Table with one row per subject and one column per region.
+        """
+        self.merge(SampleSummary.from_table(df, compression=self.compression))
+
+    def merge(self, other):
+        """Merge the summary of a disjoint sample into this summary.
+
+        Parameters
+        ----------
+        other : SampleSummary
+            The summary to be merged.
+        """
+        new_regions = [region for region in other.regions if region not in self.regions]
+        if new_regions:
+            self.regions.extend(new_regions)
+            self.count = np.concatenate([self.count, np.zeros(len(new_regions))])
+            self.mean = np.concatenate([self.mean, np.zeros(len(new_regions))])
+            self.m2 = np.concatenate([self.m2, np.zeros(len(new_regions))])
+            self.centroids.extend([(np.zeros(0), np.zeros(0))] * len(new_regions))
+
+        index = self._index(other.regions)
+
+        # combine means and sums of squared deviations (Chan et al., 1979)
+        count_a = self.count[index]
+        count_b = other.count
+        count = count_a + count_b
+        delta = other.mean - self.mean[index]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean[index] = np.where(
+                count > 0, self.mean[index] + delta * count_b / count, 0
+            )
+            self.m2[index] = np.where(
+                count > 0,
+                self.m2[index] + other.m2 + delta**2 * count_a * count_b / count,
+                0,
+            )
+        self.count[index] = count
+
+        for i, (means, weights) in zip(index, other.centroids):
+            self.centroids[i] = _compress(
+                np.concatenate([self.centroids[i][0], means]),
+                np.concatenate([self.centroids[i][1], weights]),
+                self.compression,
+            )
+
+        self.n_subjects += other.n_subjects
+
+    @classmethod
+    def merged(cls, summaries):
+        """Merge several summaries.
+
+        Parameters
+        ----------
+        summaries : list of SampleSummary
+            The summaries of disjoint samples.
+
+        Returns
+        -------
+        summary : SampleSummary
+            The summary of all samples.
+        """
+        summary = cls(compression=max([s.compression for s in summaries], default=200))
+        for other in summaries:
+            summary.merge(other)
+        return summary
+
+    def _index(self, regions):
+        """Get the indices of regions, or -1 for unknown regions."""
+        lookup = {region: i for i, region in enumerate(self.regions)}
+        return np.array([lookup.get(region, -1) for region in regions], dtype=int)
+
+    def _select(self, values, regions):
+        """Select values of regions, with NaN for unknown regions."""
+        if regions is None:
+            return values
+        if len(values) == 0:
+            return np.full(len(regions), np.nan)
+        index = self._index(regions)
+        return np.where(index >= 0, values[index], np.nan)
+
+    def get_mean(self, regions=None):
+        """Get the mean of each region.
+
+        Parameters
+        ----------
+        regions : list of str, optional
+            Regions to return, in this order. Default is all regions.
+
+        Returns
+        -------
+        numpy.ndarray
+            Means, NaN for regions without values.
+        """
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        return self._select(mean, regions)
+
+    def get_std(self, regions=None):
+        """Get the (population) standard deviation of each region.
+
+        Parameters
+        ----------
+        regions : list of str, optional
+            Regions to return, in this order. Default is all regions.
+
+        Returns
+        -------
+        numpy.ndarray
+            Standard deviations, NaN for regions without values.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.where(self.count > 0, self.m2 / self.count, np.nan))
+        return self._select(std, regions)
+
+    def get_percentile(self, q, regions=None):
+        """Get a percentile of each region.
+
+        Percentiles are interpolated linearly between the centroids of the
+        quantile sketch; as long as the sketch is not compressed, they are
+        identical to numpy.percentile.
+
+        Parameters
+        ----------
+        q : float
+            Percentile, between 0 and 100.
+        regions : list of str, optional
+            Regions to return, in this order. Default is all regions.
+
+        Returns
+        -------
+        numpy.ndarray
+            Percentiles, NaN for regions without values.
+        """
+        percentile = np.full(len(self.regions), np.nan)
+        for i, (means, weights) in enumerate(self.centroids):
+            total = weights.sum()
+            if total == 0:
+                continue
+            if total == 1:
+                percentile[i] = means[0]
+                continue
+            position = (np.cumsum(weights) - weights / 2 - 0.5) / (total - 1)
+            percentile[i] = np.interp(q / 100, position, means)
+        return self._select(percentile, regions)
+
+    def save(self, filename: str):
+        """Write the summary to a file.
+
+        The file is written to a temporary file first and then renamed.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+        """
+        lengths = [len(means) for means, _ in self.centroids]
+        tmpfile = filename + ".tmp"
+        with open(tmpfile, "wb") as f:
+            np.savez(
+                f,
+                compression=self.compression,
+                n_subjects=self.n_subjects,
+                regions=np.array(self.regions, dtype=str),
+                count=self.count,
+                mean=self.mean,
+                m2=self.m2,
+                centroid_offsets=np.cumsum([0] + lengths),
+                centroid_means=np.concatenate(
+                    [means for means, _ in self.centroids] + [np.zeros(0)]
+                ),
+                centroid_weights=np.concatenate(
+                    [weights for _, weights in self.centroids] + [np.zeros(0)]
+                ),
+            )
+        os.replace(tmpfile, filename)
+
+    @classmethod
+    def load(cls, filename: str):
+        """Read a summary from a file.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+
+        Returns
+        -------
+        summary : SampleSummary
+            The summary.
+        """
+        with np.load(filename, allow_pickle=False) as npz:
+            summary = cls(compression=int(npz["compression"]))
+            summary.n_subjects = int(npz["n_subjects"])
+            summary.regions = [str(region) for region in npz["regions"]]
+            summary.count = npz["count"]
+            summary.mean = npz["mean"]
+            summary.m2 = npz["m2"]
+            offsets = npz["centroid_offsets"]
+            # each access of a member reads it from the file again
+            centroid_means = npz["centroid_means"]
+            centroid_weights = npz["centroid_weights"]
+            summary.centroids = [
+                (centroid_means[start:stop], centroid_weights[start:stop])
+                for start, stop in zip(offsets[:-1], offsets[1:])
+            ]
+        return summary
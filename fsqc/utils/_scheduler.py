@@ -0,0 +1,163 @@
+"""Concurrent execution of a graph of tasks."""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, NamedTuple, Optional
+
+
+class Task(NamedTuple):
+    """A task of a task graph.
+
+    Attributes
+    ----------
+    function : callable
+        Function that runs the task; called without arguments.
+    requires : tuple of str
+        Names of the tasks that must have finished successfully before this
+        task can start.
+    memory : float
+        Expected peak memory of the task, in the unit of the memory budget.
+    exclusive : str or None
+        Name of a resource that the task needs exclusively (e.g., a renderer
+        that is not thread-safe); tasks with the same resource do not run at
+        the same time. None if the task needs no such resource.
+    """
+
+    function: Callable
+    requires: tuple = ()
+    memory: float = 0
+    exclusive: Optional[str] = None
+
+
+def run_task_graph(
+    tasks,
+    n_jobs=1,
+    max_memory=None,
+    stop_on_error=False,
+    executor=None,
+    callback=None,
+):
+    """Run a graph of tasks concurrently in a thread pool.
+
+    A task is started as soon as all tasks it requires have finished, a
+    worker is available, no running task needs the same exclusive resource,
+    and its expected memory fits into the memory budget along with the tasks
+    that are already running. Tasks are started in the order in which they
+    are given; a task that does not fit into the budget waits (and so do the
+    tasks after it) until enough running tasks have finished, whereas tasks
+    after a task that waits for its requirements or its exclusive resource
+    may start before it. A task that exceeds the budget on its own is run
+    when no other task is running.
+
+    Parameters
+    ----------
+    tasks : dict of str to Task
+        The tasks, keyed by name, in the order in which they should start.
+    n_jobs : int
+        Maximum number of tasks that run at the same time, default is 1.
+    max_memory : float | None
+        Memory budget for the tasks that run at the same time. If None, the
+        memory is not limited.
+    stop_on_error : bool
+        If True, no further tasks are started once a task has failed, and the
+        tasks that are still running are not waited for; they are neither
+        included in the results nor in the errors. A given executor can then
+        be shut down to stop them, whereas the default thread pool lets them
+        finish before returning.
+    executor : concurrent.futures.Executor, optional
+        Executor to run the tasks in (e.g., a process pool); it should have at
+        least ``n_jobs`` workers. By default, a thread pool with ``n_jobs``
+        workers is used.
+    callback : callable, optional
+        Function that is called with the name and the return value of each
+        successful task as soon as the task has finished, in the calling
+        thread.
+
+    Returns
+    -------
+    results : dict
+        Return values of the successful tasks, keyed by name.
+    errors : dict
+        Exceptions of the failed tasks, keyed by name. Tasks that require a
+        failed task are not run, and fail with a RuntimeError.
+
+    Raises
+    ------
+    ValueError
+        If a task requires an unknown task, or if the tasks have cyclic
+        requirements.
+    """
+    for name, task in tasks.items():
+        unknown = [dep for dep in task.requires if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task {name} requires unknown tasks {unknown}.")
+
+    pending = dict(tasks)
+    running = dict()
+    running_memory = 0
+    results = dict()
+    errors = dict()
+
+    if executor is None:
+        context = ThreadPoolExecutor(max_workers=max(n_jobs, 1))
+    else:
+        context = nullcontext(executor)
+
+    with context as executor:
+        while pending or running:
+            # tasks that require a failed task fail as well
+            for name, task in list(pending.items()):
+                failed = [dep for dep in task.requires if dep in errors]
+                if failed:
+                    errors[name] = RuntimeError(
+                        f"Task {name} was not run, because {failed[0]} failed."
+                    )
+                    del pending[name]
+
+            # start tasks, in order, as long as workers and memory are available
+            if not (stop_on_error and errors):
+                for name, task in list(pending.items()):
+                    if len(running) >= max(n_jobs, 1):
+                        break
+                    if any(dep not in results for dep in task.requires):
+                        continue
+                    if task.exclusive is not None and any(
+                        tasks[other].exclusive == task.exclusive
+                        for other in running.values()
+                    ):
+                        continue
+                    if (
+                        running
+                        and max_memory is not None
+                        and running_memory + task.memory > max_memory
+                    ):
+                        break
+                    running[executor.submit(task.function)] = name
+                    running_memory += task.memory
+                    del pending[name]
+
+            if not running:
+                if pending and not (stop_on_error and errors):
+                    raise ValueError(f"Tasks {list(pending)} have cyclic requirements.")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                running_memory -= tasks[name].memory
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+                else:
+                    if callback is not None:
+                        callback(name, results[name])
+
+            # once a task has failed, the tasks that are still running are
+            # cancelled if they have not started yet, and not waited for
+            if stop_on_error and errors:
+                for future in running:
+                    future.cancel()
+                break
+
+    return results, errors
@@ -0,0 +1,67 @@
+"""Test checkTopology.py"""
+
+import numpy as np
+import pytest
+
+from ...checkTopology import checkTopology
+
+
+def _run(lh, rh, holes=(10, 12), headers=True):
+    """Get the recon-all.log lines of a run with topology fixing."""
+    lines = ["New invocation of recon-all", "mri_convert orig/001.mgz orig.mgz"]
+    for hemi, values in [("lh", lh), ("rh", rh)]:
+        if values is None:
+            continue
+        if headers:
+            lines.append(f"#@# Fix Topology {hemi} Mon Jan 1 00:00:00 UTC 2024")
+        lines.append(f"{values[0]} defects found, arbitrating ambiguous regions...")
+        lines.append(f"topology fixing took {values[1]} minutes")
+    if holes is not None:
+        lines.append(f"orig.nofix lhholes = {holes[0]}, rhholes = {holes[1]}, x")
+    return lines
+
+
+def _check(tmp_path, lines):
+    scripts_dir = tmp_path / "sub01" / "scripts"
+    scripts_dir.mkdir(parents=True, exist_ok=True)
+    (scripts_dir / "recon-all.log").write_text("\n".join(lines))
+    return checkTopology(str(tmp_path), "sub01")
+
+
+def _assert_equal(result, expected):
+    np.testing.assert_array_equal(np.array(result, dtype=float), expected)
+
+
+def test_check_topology(tmp_path):
+    """Test several runs, incomplete runs, and empty logfiles."""
+    # Test a single run, and the types of the values
+    result = _check(tmp_path, _run((30, 5.5), (40, 6.25)))
+    assert result == (10, 12, 30, 40, 5.5, 6.25)
+    assert [type(value) for value in result] == [int] * 4 + [float] * 2
+
+    # Test that the last complete run is used
+    lines = _run((30, 5.5), (40, 6.25)) + _run((31, 5.0), (41, 6.0), holes=(9, 11))
+    assert _check(tmp_path, lines) == (9, 11, 31, 41, 5.0, 6.0)
+    lines = _run((30, 5.5), (40, 6.25)) + _run((31, 5.0), None, holes=None)
+    assert _check(tmp_path, lines) == (10, 12, 30, 40, 5.5, 6.25)
+
+    # Test that values of both hemispheres are taken from the same run if
+    # no run is complete
+    lines = _run((30, 5.5), (40, 6.25), holes=None) + _run((31, 5.0), None)
+    _assert_equal(_check(tmp_path, lines), [10, 12, 30, 40, 5.5, 6.25])
+
+    # Test that values are attributed to the hemisphere of their section
+    _assert_equal(
+        _check(tmp_path, _run(None, (40, 6.25))), [10, 12, np.nan, 40, np.nan, 6.25]
+    )
+
+    # Test logfiles without sections
+    lines = _run((30, 5.5), (40, 6.25), headers=False)
+    _assert_equal(_check(tmp_path, lines), [10, 12, 30, 40, 5.5, 6.25])
+    lines = _run(None, (40, 6.25), headers=False)
+    _assert_equal(_check(tmp_path, lines), [10, 12] + [np.nan] * 4)
+
+    # Test empty and missing logfiles
+    _assert_equal(_check(tmp_path, []), [np.nan] * 6)
+    with pytest.warns(UserWarning):
+        _assert_equal(checkTopology(str(tmp_path), "missing"), [np.nan] * 6)
@@ -0,0 +1,116 @@
+"""Test _cohort_store.py"""
+
+import numpy as np
+import pytest
+
+from .. import _cohort_store
+from .._cohort_store import CohortStore
+
+
+def test_cohort_store(tmp_path):
+    """Test adding, replacing, and reloading subjects."""
+    store = CohortStore(str(tmp_path))
+    assert store.get("sub01", "a") is None
+
+    store.set("sub01", "a", {"aseg.x": 1.0, "aparc.y": 2.0})
+    store.set("sub02", "b", {"aseg.x": 3.0})
+    store.save()
+
+    # Test reloading
+    store = CohortStore(str(tmp_path))
+    assert store.get("sub01", "a") == {"aseg.x": 1.0, "aparc.y": 2.0}
+    assert store.get("sub02", "b") == {"aseg.x": 3.0}
+    assert store.has("sub02", "b")
+    assert not store.has("sub02", "changed")
+    assert store.get("sub02", "changed") is None
+
+    # Test replacing a subject and selecting subjects
+    store.set("sub02", "c", {"aseg.x": 4.0, "hypothalamus.z": 5.0})
+    df = store.table(["sub02", "sub01"])
+    assert list(df.index) == ["sub02", "sub01"]
+    np.testing.assert_array_equal(df["aseg.x"], [4.0, 1.0])
+    assert np.isnan(df.loc["sub01", "hypothalamus.z"])
+    assert list(store.table(["sub01"]).columns) == ["aseg.x", "aparc.y"]
+
+
+def test_cohort_store_memory_budget(tmp_path):
+    """Test filling the table in chunks, and spilling to a memory-mapped file."""
+    values = np.arange(600, dtype=float).reshape(300, 2)
+    for max_memory in [None, 1000]:
+        store = CohortStore(str(tmp_path), max_memory=max_memory)
+        for i in range(300):
+            store.set(
+                f"sub{i:03d}", "a", {"aseg.x": values[i, 0], "aseg.y": values[i, 1]}
+            )
+        df = store.table(columns=["aseg.y", "aseg.x"])
+        np.testing.assert_array_equal(df.to_numpy(), values[:, ::-1])
+        assert isinstance(store._values, np.memmap) == (max_memory is not None)
+
+
+@pytest.mark.parametrize("backend", ["npz", "parquet"])
+def test_cohort_store_backends(tmp_path, monkeypatch, backend):
+    """Test reloading the store from NPZ and Parquet files."""
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(
+            _cohort_store, "import_optional_dependency", lambda *args, **kwargs: None
+        )
+
+    store = CohortStore(str(tmp_path))
+    assert store.filename.endswith("." + backend)
+    store.set("001", '["a"]', {"aseg.x": 1.5, "aparc.lh.y": 2.0})
+    store.set("002", '["b"]', {"aseg.x": np.nan, "hypothalamus.z": 3.0})
+    store.save()
+
+    store = CohortStore(str(tmp_path))
+    assert store.get("001", '["a"]') == {"aseg.x": 1.5, "aparc.lh.y": 2.0}
+    assert store.get("002", '["b"]') == {"hypothalamus.z": 3.0}
+    assert store.columns() == ["aseg.x", "aparc.lh.y", "hypothalamus.z"]
+
+    # Test replacing a subject of a reloaded store
+    store.set("001", '["c"]', {"aseg.x": 4.0})
+    store.save()
+    store = CohortStore(str(tmp_path))
+    assert not store.has("001", '["a"]')
+    assert store.get("001", '["c"]') == {"aseg.x": 4.0}
+
+
+@pytest.mark.parametrize("backend", ["npz", "parquet"])
+def test_cohort_store_blocks(tmp_path, monkeypatch, backend):
+    """Test reading and writing the store file in blocks of rows."""
+    if backend == "parquet":
+        pq = pytest.importorskip("pyarrow.parquet")
+    else:
+        monkeypatch.setattr(
+            _cohort_store, "import_optional_dependency", lambda *args, **kwargs: None
+        )
+
+    # an empty store
+    CohortStore(str(tmp_path)).save()
+    assert CohortStore(str(tmp_path)).columns() == []
+
+    values = np.arange(300, dtype=float).reshape(100, 3)
+    values[5, 1] = np.nan
+    store = CohortStore(str(tmp_path), max_memory=240)
+    for i in range(100):
+        store.set(
+            f"sub{i:03d}",
+            str(i),
+            {"aseg.x": values[i, 0], "aseg.y": values[i, 1], "aseg.z": values[i, 2]},
+        )
+    store.save()
+    if backend == "parquet":
+        assert pq.ParquetFile(store.filename).num_row_groups > 1
+
+    store = CohortStore(str(tmp_path), max_memory=240)
+    np.testing.assert_array_equal(store.table().to_numpy(), values)
+    assert store.has("sub042", "42")
+
+    # stores written as a whole by earlier versions can still be read
+    if backend == "parquet":
+        df = store.table().assign(signature=[str(i) for i in range(100)])
+        df.to_parquet(store.filename)
+        store = CohortStore(str(tmp_path), max_memory=240)
+        np.testing.assert_array_equal(store.table().to_numpy(), values)
+        assert store.has("sub099", "99")
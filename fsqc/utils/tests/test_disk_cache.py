@@ -0,0 +1,61 @@
+"""Test _disk_cache.py"""
+
+import os
+
+import numpy as np
+
+from .._disk_cache import DiskCache
+
+
+def test_disk_cache(tmp_path):
+    """Test saving, loading, and evicting cached volumes."""
+    source = tmp_path / "subjects"
+    source.mkdir()
+    files = [source / f"vol{i}.mgz" for i in range(3)]
+    for file in files:
+        file.write_bytes(b"")
+    data = np.arange(1000, dtype=">i4").reshape(10, 10, 10)
+
+    # Test eligible files
+    cache = DiskCache(str(tmp_path / "cache"), source_dir=str(source))
+    assert cache.is_cacheable(str(files[0]))
+    assert not cache.is_cacheable(str(source / "vol.mgh"))
+    assert not cache.is_cacheable(str(tmp_path / "vol.mgz"))
+
+    # Test round trip
+    assert cache.load(str(files[0])) is None
+    cache.save(str(files[0]), data)
+    cached = cache.load(str(files[0]))
+    assert isinstance(cached, np.memmap)
+    assert cached.dtype == data.dtype
+    np.testing.assert_array_equal(cached, data)
+
+    # Test modified source file
+    files[0].write_bytes(b"modified")
+    assert cache.load(str(files[0])) is None
+
+    # Test eviction of least recently used entries
+    cache = DiskCache(str(tmp_path / "lru"), max_size=2 * data.nbytes + 500)
+    for i, file in enumerate(files):
+        cache.save(str(file), data)
+        # make sure that modification times differ
+        for entry in os.scandir(cache.directory):
+            stat = entry.stat()
+            os.utime(entry.path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+        if i == 1:
+            cache.load(str(files[0]))
+    assert cache.load(str(files[0])) is not None
+    assert cache.load(str(files[1])) is None
+    assert cache.load(str(files[2])) is not None
+
+    # Test stale temporary files of terminated processes
+    stale = tmp_path / "lru" / "stale.tmp"
+    stale.write_bytes(b"0" * 100)
+    os.utime(stale, (0, 0))
+    current = tmp_path / "lru" / "current.tmp"
+    current.write_bytes(b"0" * data.nbytes)
+    cache.evict()
+    assert not stale.exists() and current.exists()
+    # temporary files that are being written count towards the size
+    assert cache.load(str(files[0])) is None
+    assert cache.load(str(files[2])) is not None
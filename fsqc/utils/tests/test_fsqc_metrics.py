@@ -0,0 +1,130 @@
+"""Test fsqcMetrics.py"""
+
+import os
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from ...fsqcMetrics import (
+    METRICS,
+    Metric,
+    SubjectContext,
+    _cast,
+    computeMetrics,
+    metricInputs,
+)
+
+
+def _fail(context):
+    raise RuntimeError("cannot compute")
+
+
+METRICS_TEST = [
+    Metric("first", lambda context: (1.5, 2), {"a": float, "b": int}, ["mri/x.mgz"]),
+    Metric("failing", _fail, {"c": float, "d": int}, ["stats/aseg.stats"]),
+    Metric("wrong", lambda context: (1,), {"e": float, "f": float}, []),
+    Metric("last", lambda context: (np.int64(3),), {"g": int}, ["mri/x.mgz"]),
+]
+
+
+def test_cast():
+    """Test converting metric values to their types."""
+    assert _cast(3, float) == 3.0 and type(_cast(3, float)) is float
+    assert _cast(3.0, int) == 3 and type(_cast(3.0, int)) is int
+    assert _cast("4", int) == 4
+
+    # numpy scalars of the right kind are kept
+    value = np.float32(0.1)
+    assert _cast(value, float) is value
+    value = np.int64(7)
+    assert _cast(value, int) is value
+
+    # NaNs are kept, also for integer columns
+    assert np.isnan(_cast(np.nan, int))
+    assert np.isnan(_cast(np.float32("nan"), float))
+
+
+def test_compute_metrics(tmp_path, caplog):
+    """Test computing metrics, with NaNs for failed metrics."""
+    context = SubjectContext(str(tmp_path), "subject")
+
+    record, ok = computeMetrics(context, metrics=METRICS_TEST)
+
+    assert ok is False
+    assert list(record) == ["a", "b", "c", "d", "e", "f", "g"]
+    assert record["a"] == 1.5 and record["b"] == 2 and type(record["b"]) is int
+    assert record["g"] == 3
+    # a raising metric and a metric returning the wrong number of values
+    for column in ["c", "d", "e", "f"]:
+        assert np.isnan(record[column])
+    assert "failing failed for subject" in caplog.text
+    assert "expected 2 values, got 1" in caplog.text
+
+    record, ok = computeMetrics(context, metrics=METRICS_TEST[:1])
+    assert ok is True and record == {"a": 1.5, "b": 2}
+
+    with pytest.raises(RuntimeError, match="cannot compute"):
+        computeMetrics(context, metrics=METRICS_TEST, exit_on_error=True)
+
+
+def test_metric_inputs(tmp_path):
+    """Test the paths of the inputs of the metrics."""
+    context = SubjectContext(str(tmp_path), "subject", aparc_image="aparc.mgz")
+
+    assert metricInputs(context, metrics=METRICS_TEST) == [
+        os.path.join(str(tmp_path), "subject", "mri", "x.mgz"),
+        os.path.join(str(tmp_path), "subject", "stats", "aseg.stats"),
+    ]
+    assert context.path("mri/{aparc_image}") == os.path.join(
+        str(tmp_path), "subject", "mri", "aparc.mgz"
+    )
+    assert "scripts/recon-all.log" in [
+        filename for metric in METRICS for filename in metric.inputs
+    ]
+
+
+def test_subject_context_load(tmp_path):
+    """Test loading image volumes through the shared volume cache."""
+    (tmp_path / "subject" / "mri").mkdir(parents=True)
+    data = np.arange(27, dtype=np.int32).reshape(3, 3, 3)
+    nib.save(nib.MGHImage(data, np.eye(4)), tmp_path / "subject" / "mri" / "x.mgz")
+
+    context = SubjectContext(str(tmp_path), "subject")
+    img, loaded = context.load("mri/x.mgz")
+
+    np.testing.assert_array_equal(loaded, data)
+    assert context.load("mri/x.mgz")[1] is loaded
+    assert context.volume_cache.load(context.path("mri/x.mgz"))[1] is loaded
+
+
+def test_subject_context_read(tmp_path):
+    """Test that parsed inputs are read once and shared among metrics."""
+    calls = list()
+
+    def reader(path):
+        calls.append(path)
+        return {"path": path}
+
+    context = SubjectContext(str(tmp_path), "subject")
+    path = context.path("stats/aseg.stats")
+    assert context.read(path, reader) is context.read(path, reader)
+    assert calls == [path]
+
+    # the core metrics read their inputs through the context
+    (tmp_path / "subject" / "scripts").mkdir(parents=True)
+    log = tmp_path / "subject" / "scripts" / "recon-all.log"
+    log.write_text(
+        "orig.nofix lhholes = 5, rhholes = 7\n"
+        "#@# Fix Topology lh\n12 defects found\ntopology fixing took 1.5 minutes\n"
+        "#@# Fix Topology rh\n9 defects found\ntopology fixing took 2.5 minutes\n"
+    )
+    topology = [metric for metric in METRICS if metric.name == "Topology check"]
+
+    record, ok = computeMetrics(context, metrics=topology)
+    assert ok is True
+    assert list(record.values()) == [5, 7, 12, 9, 1.5, 2.5]
+
+    # a rewritten logfile is not read again within the same context
+    log.write_text("")
+    assert computeMetrics(context, metrics=topology)[0] == record
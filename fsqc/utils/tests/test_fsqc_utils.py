@@ -0,0 +1,288 @@
+"""Test fsqcUtils.py"""
+
+import os
+
+import nibabel as nb
+import numpy as np
+import pytest
+from scipy.ndimage import binary_erosion
+
+from ...checkSNR import checkSNR
+from ...fsqcUtils import (
+    VolumeCache,
+    _readAsegStatsFile,
+    applyTransform,
+    erodeMask,
+    importMGH,
+    labelMask,
+    levelsetsChain,
+    levelsetsTria,
+    loadVolume,
+    readAsegStatsFile,
+)
+
+ASEG_STATS = """# Title Segmentation Statistics
+# Measure BrainSeg, BrainSegVol, Brain Segmentation Volume, 1243340.000000, mm^3
+# Measure EstimatedTotalIntraCranialVol, eTIV, Estimated TIV, {etiv}, mm^3
+# ColHeaders  Index SegId NVoxels Volume_mm3 StructName normMean normStdDev
+  1   4   6563   6562.6  Left-Lateral-Ventricle   32.1  11.2
+  2 251    913    912.8  CC_Posterior             97.3   8.4
+  3 255   1021   1020.5  CC_Anterior              95.1   9.0
+"""
+
+
+def test_read_aseg_stats_file(tmp_path):
+    """Test parsing, memoization, and rewritten aseg.stats files."""
+    path = tmp_path / "aseg.stats"
+    path.write_text(ASEG_STATS.format(etiv="1500000.000000"))
+
+    stats = readAsegStatsFile(str(path))
+    assert stats.measures == {
+        "BrainSeg": 1243340.0,
+        "EstimatedTotalIntraCranialVol": 1500000.0,
+    }
+    assert stats.structures == {
+        "Left-Lateral-Ventricle": 6562.6,
+        "CC_Posterior": 912.8,
+        "CC_Anterior": 1020.5,
+    }
+    assert readAsegStatsFile(str(path)) is stats
+
+    # Test that a rewritten file is read again
+    path.write_text(ASEG_STATS.format(etiv="1600000.000000"))
+    os.utime(path, ns=(0, 0))
+    stats = readAsegStatsFile(str(path))
+    assert stats.measures["EstimatedTotalIntraCranialVol"] == 1600000.0
+
+    # Test that the memoization is bounded
+    assert _readAsegStatsFile.cache_info().maxsize is not None
+
+
+def test_volume_cache(tmp_path):
+    """Test native data types, read-only sharing, and reloading of volumes."""
+    rng = np.random.default_rng(0)
+    aseg = rng.choice([0, 2, 4, 41, 1024], size=(8, 9, 10)).astype(np.int32)
+    filename = str(tmp_path / "aseg.mgz")
+    nb.save(nb.MGHImage(aseg, np.eye(4)), filename)
+
+    cache = VolumeCache()
+    img, data = cache.load(filename)
+    assert data.dtype.kind == "i" and data.dtype.itemsize == 4
+    np.testing.assert_array_equal(data, aseg)
+    assert cache.load(filename)[1] is data
+    np.testing.assert_array_equal(loadVolume(filename)[1], aseg)
+    assert loadVolume(filename, volume_cache=cache)[1] is data
+
+    # Test that shared arrays cannot be modified in-place
+    with pytest.raises(ValueError):
+        data[0, 0, 0] = 1
+    mask = cache.loadLabelMask(filename, [2, 41])
+    np.testing.assert_array_equal(mask, np.isin(aseg, [2, 41]))
+    assert cache.loadLabelMask(filename, [41, 2]) is mask
+    with pytest.raises(ValueError):
+        mask[0, 0, 0] = True
+
+    # Test that a rewritten file is reloaded, along with its masks
+    nb.save(nb.MGHImage(aseg + 1, np.eye(4)), filename)
+    os.utime(filename, ns=(0, 0))
+    np.testing.assert_array_equal(cache.load(filename)[1], aseg + 1)
+    np.testing.assert_array_equal(
+        cache.loadLabelMask(filename, [2, 41]), np.isin(aseg + 1, [2, 41])
+    )
+
+    cache.clear()
+    assert cache.load(filename)[1] is not data
+
+
+def _grid_mesh(n):
+    """Create a triangulated, perturbed n x n grid in the plane z = 0."""
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.arange(n, dtype=float), np.arange(n, dtype=float))
+    v = np.column_stack([x.ravel(), y.ravel(), np.zeros(n * n)])
+    v[:, :2] += rng.uniform(-0.2, 0.2, size=(n * n, 2))
+    i = np.arange(n * n).reshape(n, n)[:-1, :-1].ravel()
+    t = np.concatenate(
+        [np.column_stack([i, i + 1, i + n + 1]), np.column_stack([i, i + n + 1, i + n])]
+    )
+    return v, t
+
+
+def test_levelsets_tria():
+    """Test the intersection of triangles with level sets."""
+    # Test known values for a unit square
+    v = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=float)
+    t = np.array([[0, 1, 2], [0, 2, 3]])
+    vLVL, lLVL, iLVL = levelsetsTria(v, t, v[:, 0], [0.5, 0.25])
+    assert vLVL[0] == [[0.5, 0.0, 0.0], [0.5, 0.5, 0.0], [0.5, 1.0, 0.0]]
+    assert vLVL[1] == [[0.25, 0.0, 0.0], [0.25, 0.25, 0.0], [0.25, 1.0, 0.0]]
+    assert [list(map(tuple, x)) for x in lLVL] == [[(1, 2), (2, 3)]] * 2
+    np.testing.assert_array_equal(iLVL[0], [0, 1])
+
+    # Test a level set of a linear function on a larger mesh: each crossing
+    # edge yields one shared vertex, which lies on the level set
+    v, t = _grid_mesh(20)
+    p = v @ np.array([1.0, 0.5, 0.0])
+    vLVL, lLVL, iLVL = levelsetsTria(v, t, p, 9.3)
+    points = np.array(vLVL[0])
+    np.testing.assert_allclose(points @ np.array([1.0, 0.5, 0.0]), 9.3)
+
+    edges = np.sort(np.concatenate([t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]]), 1)
+    edges = np.unique(edges, axis=0)
+    crossing = (p[edges[:, 0]] > 9.3) != (p[edges[:, 1]] > 9.3)
+    assert len(points) == np.count_nonzero(crossing)
+    assert len(np.unique(points, axis=0)) == len(points)
+
+    segments = np.array(lLVL[0])
+    assert len(segments) == len(iLVL[0])
+    assert segments.min() == 1 and segments.max() == len(points)
+
+
+def test_levelsets_chain():
+    """Test linking level set segments into polylines."""
+    # Test open and closed polylines, reversed and degenerate segments
+    lines = levelsetsChain([(2, 3), (5, 6), (2, 1), (4, 4), (7, 5), (6, 7)])
+    assert [line.tolist() for line in lines] == [[0, 1, 2], [4, 5, 6, 4]]
+
+    # Test a closed contour of a circle on a larger mesh
+    v, t = _grid_mesh(20)
+    p = np.linalg.norm(v[:, :2] - 9.5, axis=1)
+    vLVL, lLVL, iLVL = levelsetsTria(v, t, p, 6.0)
+    lines = levelsetsChain(lLVL[0])
+    assert len(lines) == 1
+    line = lines[0]
+    assert line[0] == line[-1]
+    assert len(line) == len(lLVL[0]) + 1
+    assert sorted(line[:-1]) == list(range(len(vLVL[0])))
+    segments = {frozenset(segment) for segment in lLVL[0]}
+    assert all(frozenset((a + 1, b + 1)) in segments for a, b in zip(line, line[1:]))
+
+
+def test_label_mask():
+    """Test label masks against comparisons with each label."""
+    rng = np.random.default_rng(0)
+    data = rng.choice([0, 2, 4, 41, 1024, 2035, 3001], size=(6, 7, 8))
+    for labels in [[2, 41], [0], [2035, 4, 3001], [5000]]:
+        for dtype in [np.int32, np.int64, np.uint16, np.float32]:
+            np.testing.assert_array_equal(
+                labelMask(data.astype(dtype), labels), np.isin(data, labels)
+            )
+
+    # Test labels that exceed the range of the data type
+    data = rng.integers(0, 256, size=(6, 7, 8)).astype(np.uint8)
+    np.testing.assert_array_equal(
+        labelMask(data, [3, 255, 1000]), np.isin(data, [3, 255])
+    )
+
+
+def test_erode_mask():
+    """Test the cropped, separable erosion against a full-volume erosion."""
+    rng = np.random.default_rng(0)
+    mask = np.zeros((20, 21, 22), dtype=bool)
+    mask[2:15, 0:18, 5:22] = rng.random((13, 18, 17)) > 0.05
+    mask[16:20, 3:9, 1:4] = True
+    for size in [1, 2, 3, 4, 5]:
+        np.testing.assert_array_equal(
+            erodeMask(mask, size),
+            binary_erosion(mask, np.ones((size,) * 3), border_value=1),
+        )
+    assert not erodeMask(np.zeros((5, 5, 5)), 3).any()
+
+
+def test_check_snr(tmp_path):
+    """Test the SNR of a synthetic subject against full-volume erosion."""
+    rng = np.random.default_rng(0)
+    aseg = np.zeros((24, 24, 24), dtype=np.int32)
+    aseg[3:21, 3:21, 3:21] = 3
+    aseg[6:18, 6:12, 6:18] = 2
+    aseg[6:18, 12:18, 6:18] = 41
+    aparc = aseg.copy()
+    aparc[aparc == 3] = 1000
+    aparc[8:10, 8:10, 8:10] = 251
+    norm = rng.normal(100, 10, size=aseg.shape).astype(np.float32)
+    orig = rng.integers(0, 256, size=aseg.shape).astype(np.uint8)
+
+    mri_dir = tmp_path / "sub01" / "mri"
+    mri_dir.mkdir(parents=True)
+    for name, data in [
+        ("aseg.mgz", aseg),
+        ("aparc+aseg.mgz", aparc),
+        ("norm.mgz", norm),
+        ("orig.mgz", orig),
+    ]:
+        nb.save(nb.MGHImage(data, np.eye(4)), str(mri_dir / name))
+
+    wm = binary_erosion(
+        np.isin(aparc, [2, 41, 7, 46, 251, 252, 253, 254, 255, 77, 78, 79]),
+        np.ones((3, 3, 3)),
+        border_value=1,
+    )
+    gm = np.isin(aseg, [3, 42])
+
+    snr = checkSNR(
+        str(tmp_path),
+        "sub01",
+        3,
+        ref_image=["norm.mgz", "orig.mgz"],
+        volume_cache=VolumeCache(),
+    )
+    for (wm_snr, gm_snr), data in zip(snr, [norm, orig]):
+        data = data.astype(np.float64)
+        assert wm_snr == np.mean(data[wm]) / np.std(data[wm])
+        assert gm_snr == np.mean(data[gm]) / np.std(data[gm])
+    assert checkSNR(str(tmp_path), "sub01", 3) == snr[0]
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int32, np.float32, np.int16])
+@pytest.mark.parametrize("extension", [".mgh", ".mgz"])
+def test_import_mgh(tmp_path, dtype, extension):
+    """Test reading MGH files of all data types against nibabel."""
+    rng = np.random.default_rng(0)
+    data = (rng.random((5, 6, 1, 7)) * 100).astype(dtype)
+    filename = str(tmp_path / ("vol" + extension))
+    nb.save(nb.MGHImage(data, np.diag([2.0, 3.0, 4.0, 1.0])), filename)
+
+    vol = importMGH(filename)
+    assert vol.dtype == np.dtype(dtype).newbyteorder(">")
+    assert vol.shape == (5, 6, 7)
+    np.testing.assert_array_equal(vol, np.squeeze(nb.load(filename).get_fdata()))
+
+    with pytest.warns(UserWarning):
+        assert np.isnan(importMGH(str(tmp_path / "missing.mgz")))
+
+
+def test_apply_transform(tmp_path):
+    """Test that transformed images are written as float64."""
+    rng = np.random.default_rng(0)
+    data = rng.choice([0, 250, 251], size=(6, 7, 8)).astype(np.int32)
+    nb.save(nb.MGHImage(data, np.eye(4)), tmp_path / "aseg.mgz")
+
+    # vox2vox transform with a translation by one voxel
+    m = np.eye(4)
+    m[:3, 3] = [1, 0, 0]
+    lines = ["type      = 0", "nxforms   = 1", "mean      = 0 0 0", "sigma     = 1"]
+    lines += ["1 4 4"] + [" ".join(f"{x:.15e}" for x in row) for row in m]
+    for volume in ["src", "dst"]:
+        lines += [
+            volume + " volume info",
+            "valid = 1  # volume info valid",
+            "filename = aseg.mgz",
+            "volume = 6 7 8",
+            "voxelsize = 1.0 1.0 1.0",
+            "xras   = 1.0 0.0 0.0",
+            "yras   = 0.0 1.0 0.0",
+            "zras   = 0.0 0.0 1.0",
+            "cras   = 0.0 0.0 0.0",
+        ]
+    (tmp_path / "shift.lta").write_text("\n".join(lines) + "\n")
+
+    applyTransform(
+        str(tmp_path / "aseg.mgz"),
+        str(tmp_path / "shifted.nii.gz"),
+        str(tmp_path / "shift.lta"),
+        interp="nearest",
+    )
+
+    img = nb.load(tmp_path / "shifted.nii.gz")
+    assert img.get_data_dtype() == np.float64
+    np.testing.assert_array_equal(img.get_fdata()[1:], data[:-1])
+    np.testing.assert_array_equal(img.get_fdata()[0], 0)
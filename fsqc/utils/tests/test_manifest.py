@@ -0,0 +1,53 @@
+"""Test _manifest.py"""
+
+import os
+
+import numpy as np
+
+from .._manifest import Manifest, lookup_module, record_module
+
+
+def test_manifest(tmp_path):
+    """Test recording and looking up module results."""
+    infile = tmp_path / "norm.mgz"
+    infile.write_bytes(b"abc")
+    outfile = tmp_path / "out.png"
+    outfile.write_bytes(b"")
+    files = [str(infile), str(tmp_path / "missing.mgz")]
+    settings = {"views": ("x=0", "y=0")}
+    result = {"metrics": {"snr": np.float32(1.5), "holes": np.int64(3)}}
+
+    # Test round trip through the manifest file
+    records = dict()
+    record_module(records, "metrics", files, settings, "1.0", result, [str(outfile)])
+    manifest = Manifest(str(tmp_path / "fsqc-manifest.json"))
+    manifest.set("sub01", records)
+    manifest.save()
+    records = Manifest(str(tmp_path / "fsqc-manifest.json")).get("sub01")
+    cached = lookup_module(records, "metrics", files, settings, "1.0")
+    assert cached == {"metrics": {"snr": 1.5, "holes": 3}}
+
+    # Test changed settings, version, and missing modules
+    assert lookup_module(records, "metrics", files, {"views": []}, "1.0") is None
+    assert lookup_module(records, "metrics", files, settings, "2.0") is None
+    assert lookup_module(records, "shape", files, settings, "1.0") is None
+
+    # Test changed input and removed output
+    stat = os.stat(infile)
+    os.utime(infile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert lookup_module(records, "metrics", files, settings, "1.0") is None
+    record_module(records, "metrics", files, settings, "1.0", result, [str(outfile)])
+    outfile.unlink()
+    assert lookup_module(records, "metrics", files, settings, "1.0") is None
+
+    # Test checksums
+    records = dict()
+    record_module(records, "metrics", files, settings, "1.0", result, checksums=True)
+    os.utime(infile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2000))
+    assert lookup_module(records, "metrics", files, settings, "1.0", True) is not None
+    infile.write_bytes(b"abd")
+    assert lookup_module(records, "metrics", files, settings, "1.0", True) is None
+
+    # Test corrupted manifest
+    (tmp_path / "fsqc-manifest.json").write_text("{")
+    assert Manifest(str(tmp_path / "fsqc-manifest.json")).get("sub01") == dict()
@@ -0,0 +1,33 @@
+"""Test _norms.py"""
+
+import numpy as np
+
+from .._norms import NormativeBounds
+
+
+def test_normative_bounds(tmp_path):
+    """Test compiling and looking up stratified bounds."""
+    table = tmp_path / "norms.csv"
+    table.write_text(
+        "label,lower,upper,stratum\n" "a,0,10,\n" "b,0,20,\n" "a,1,5,F\n" "c,2,3,F\n"
+    )
+
+    # Test compiling, caching, and re-loading
+    norms = NormativeBounds.from_file(str(table), cache_dir=str(tmp_path))
+    assert (tmp_path / "fsqc-norms.npz").is_file()
+    cached = NormativeBounds.from_file(str(table), cache_dir=str(tmp_path))
+    assert cached.labels == norms.labels == ["a", "b", "c"]
+    assert cached.strata == norms.strata == ["", "F"]
+    np.testing.assert_array_equal(cached.lower, norms.lower)
+
+    # Test lookup with fallback to the bounds for all subjects
+    lower, upper = norms.get_bounds(["c", "a", "x", "b"], ["F", None, "M"])
+    np.testing.assert_array_equal(
+        lower, [[2, 1, np.nan, 0], [np.nan, 0, np.nan, 0], [np.nan, 0, np.nan, 0]]
+    )
+    np.testing.assert_array_equal(upper[0], [3, 5, np.nan, 20])
+
+    # Test bounds from a dictionary
+    norms = NormativeBounds.from_dict({"a": {"lower": 1.0, "upper": 2.0}})
+    lower, upper = norms.get_bounds(["b", "a"])
+    np.testing.assert_array_equal(lower, [[np.nan, 1.0]])
@@ -0,0 +1,175 @@
+"""Test outlierDetection.py"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+from ...outlierDetection import outlierDetection, outlierTable, robustMahalanobis
+
+ASEG_STRUCTURES = ["Left-Caudate", "Right-Caudate", "Brain-Stem", "CC_Anterior"]
+APARC_STRUCTURES = ["bankssts", "insula"]
+
+
+def _write_cohort(subjects_dir, n_subjects):
+    """Write aseg.stats and aparc.stats files of a synthetic cohort."""
+    rng = np.random.default_rng(0)
+    subjects = [f"sub{i:02d}" for i in range(n_subjects)]
+    for i, subject in enumerate(subjects):
+        stats_dir = subjects_dir / subject / "stats"
+        stats_dir.mkdir(parents=True)
+        etiv = rng.normal(1.5e6, 1e5)
+        lines = [
+            "# Title Segmentation Statistics",
+            f"# Measure EstimatedTotalIntraCranialVol, eTIV, Estimated TIV, {etiv}, mm^3",
+            "# ColHeaders  Index SegId NVoxels Volume_mm3 StructName",
+        ]
+        for k, structure in enumerate(ASEG_STRUCTURES):
+            # one missing value, and a few values far off
+            if i == 3 and structure == "Right-Caudate":
+                continue
+            volume = rng.normal(3500, 400) * (3 if i in (5, 11) else 1)
+            lines.append(f"{k + 1} {k + 10} {int(volume)} {volume:.1f} {structure}")
+        (stats_dir / "aseg.stats").write_text("\n".join(lines) + "\n")
+        for hemi in ["lh", "rh"]:
+            lines = [
+                "# Measure Cortex, MeanThickness, Mean Thickness, 2.5, mm",
+                "# ColHeaders StructName NumVert SurfArea GrayVol ThickAvg ThickStd",
+            ]
+            for structure in APARC_STRUCTURES:
+                thickness = rng.normal(2.5, 0.2) + (1.5 if i == 7 else 0)
+                lines.append(f"{structure} 3000 2000 5000 {thickness:.3f} 0.5")
+            (stats_dir / f"{hemi}.aparc.stats").write_text("\n".join(lines) + "\n")
+    return subjects
+
+
+def test_outlier_flags(tmp_path):
+    """Test blocked outlier flags against a comparison of each value."""
+    subjects = _write_cohort(tmp_path / "subjects", 20)
+    outlierDict = outlierTable()
+
+    results = dict()
+    for name, max_memory in [("full", None), ("blocked", 200)]:
+        output_dir = tmp_path / name
+        output_dir.mkdir()
+        results[name] = outlierDetection(
+            subjects,
+            str(tmp_path / "subjects"),
+            str(output_dir),
+            outlierDict,
+            min_no_subjects=5,
+            max_memory=max_memory,
+        )
+    assert results["full"] == results["blocked"]
+    for filename in [
+        "all.regions.stats",
+        "all.outliers.sample.nonpar.stats",
+        "all.outliers.sample.param.stats",
+        "all.outliers.norms.stats",
+    ]:
+        assert (tmp_path / "full" / filename).read_text() == (
+            tmp_path / "blocked" / filename
+        ).read_text()
+
+    # compare each value against the sample and normative bounds; missing
+    # values and regions without bounds are never flagged
+    df = pd.read_csv(tmp_path / "full" / "all.regions.stats", index_col="subject")
+    q25 = np.percentile(df, 25, axis=0)
+    q75 = np.percentile(df, 75, axis=0)
+    mean = df.mean(axis=0).to_numpy()
+    std = df.std(axis=0, ddof=0).to_numpy()
+    nonparNum, paramNum, normsNum = results["full"]
+    for subject in subjects:
+        nonpar = param = norms = 0
+        for j, region in enumerate(df.columns):
+            value = df.loc[subject, region]
+            if np.isnan(value):
+                continue
+            iqr = q75[j] - q25[j]
+            nonpar += value < q25[j] - 1.5 * iqr or value > q75[j] + 1.5 * iqr
+            param += value < mean[j] - 2 * std[j] or value > mean[j] + 2 * std[j]
+            bounds = outlierDict.get(region.split(".", 1)[1])
+            if bounds is not None:
+                norms += value < bounds["lower"] or value > bounds["upper"]
+        assert nonparNum[subject] == nonpar
+        assert paramNum[subject] == param
+        assert normsNum[subject] == norms
+    assert nonparNum["sub05"] > 0 and nonparNum["sub07"] > 0
+
+
+def test_sample_summaries(tmp_path):
+    """Test saving the sample summary only on request, and merging summaries."""
+    subjects = _write_cohort(tmp_path / "subjects", 20)
+    outlierDict = outlierTable()
+
+    results = dict()
+    for name, save_summary in [("plain", False), ("summary", True)]:
+        (tmp_path / name).mkdir()
+        results[name] = outlierDetection(
+            subjects,
+            str(tmp_path / "subjects"),
+            str(tmp_path / name),
+            outlierDict,
+            min_no_subjects=5,
+            save_summary=save_summary,
+        )
+    assert not (tmp_path / "plain" / "fsqc-sample-summary.npz").exists()
+    assert results["plain"] == results["summary"]
+
+    # summaries of two halves of the cohort, merged for each half; percentiles
+    # are exact for small samples
+    summaries = list()
+    for name, part in [("first", subjects[:10]), ("second", subjects[10:])]:
+        (tmp_path / name).mkdir()
+        outlierDetection(
+            part,
+            str(tmp_path / "subjects"),
+            str(tmp_path / name),
+            outlierDict,
+            min_no_subjects=5,
+            save_summary=True,
+        )
+        summaries.append(str(tmp_path / name / "fsqc-sample-summary.npz"))
+    merged = [
+        outlierDetection(
+            part,
+            str(tmp_path / "subjects"),
+            str(tmp_path / "summary"),
+            outlierDict,
+            min_no_subjects=5,
+            sample_summaries=summaries,
+        )
+        for part in [subjects[:10], subjects[10:]]
+    ]
+    # the parametric and normative counts; the nonparametric bounds of a
+    # sample are NaN for regions with missing values, unlike those of the
+    # summaries
+    for k in [1, 2]:
+        assert {**merged[0][k], **merged[1][k]} == results["plain"][k]
+
+
+def test_robust_mahalanobis():
+    """Test robust distances of correlated data with planted outliers."""
+    rng = np.random.default_rng(0)
+    cov = np.array([[1.0, 0.8, 0.2], [0.8, 1.0, 0.1], [0.2, 0.1, 1.0]])
+    data = rng.multivariate_normal([10.0, 20.0, 30.0], cov, size=400)
+    # outliers along the direction of least variance, which are hardly
+    # outlying in any single column
+    data[:5] += np.array([2.5, -2.5, 0.0])
+
+    distance, pvalue = robustMahalanobis(data)
+    assert set(np.argsort(distance)[-5:]) == set(range(5))
+    np.testing.assert_allclose(pvalue, chi2.sf(distance**2, 3))
+    np.testing.assert_allclose(np.median(distance**2), chi2.ppf(0.5, 3))
+
+    # Test that constant columns are ignored
+    constant = np.column_stack([data, np.full(len(data), 7.0)])
+    np.testing.assert_allclose(robustMahalanobis(constant)[0], distance)
+    assert np.isnan(robustMahalanobis(np.ones((10, 2)))[0]).all()
+
+    # Test the estimates from a random subset of rows
+    distance, pvalue = robustMahalanobis(data, max_samples=200)
+    assert set(np.argsort(distance)[-5:]) == set(range(5))
+
+    # Test more columns than rows
+    distance, pvalue = robustMahalanobis(rng.normal(size=(20, 30)))
+    assert np.isfinite(distance).all()
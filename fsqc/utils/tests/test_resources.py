@@ -0,0 +1,49 @@
+"""Test _resources.py"""
+
+import time
+
+import numpy as np
+
+from .._resources import MemoryMonitor, ResourceLog, expected_memory
+
+
+def test_memory_monitor():
+    """Test measuring the peak memory of a task."""
+    with MemoryMonitor(interval=0.01) as monitor:
+        data = np.ones(50 * 1024**2 // 8)
+        time.sleep(0.1)
+        del data
+    assert monitor.peak > 40
+
+
+def test_resource_log(tmp_path):
+    """Test keeping the decayed peak memory across runs."""
+    log = ResourceLog(str(tmp_path))
+    assert log.get("screenshots", 1500) == 1500
+
+    log.update({"screenshots": 800.0, "baseline": 200.0})
+    log.save()
+    log = ResourceLog(str(tmp_path))
+    log.update({"screenshots": 500.0, "fornix": 900.0})
+    log.update({"screenshots": 600.0, "fornix": 700.0})
+    assert log.get("screenshots") == 800.0
+    log.save()
+    log.save()
+
+    # the largest peak of a run, or the decayed peak of the earlier runs
+    log = ResourceLog(str(tmp_path))
+    assert log.get("screenshots") == 640.0
+    assert log.get("fornix") == 900.0
+    assert log.get("baseline") == 200.0
+
+    log.update({"screenshots": 700.0})
+    log.save()
+    assert ResourceLog(str(tmp_path)).get("screenshots") == 700.0
+
+    # Test a corrupt file
+    (tmp_path / "fsqc-resources.json").write_text("{")
+    assert ResourceLog(str(tmp_path)).peaks == dict()
+
+    # Test the expected memory of a subject
+    assert expected_memory([300, 800, 500], baseline=200) == 1000
+    assert expected_memory([300, 800, 500], baseline=200, n_concurrent=2) == 1500
@@ -0,0 +1,38 @@
+"""Test _sample_summary.py"""
+
+import numpy as np
+import pandas as pd
+
+from .._sample_summary import SampleSummary
+
+
+def test_sample_summary(tmp_path):
+    """Test merging and saving summaries of shards of a sample."""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 3))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    df = pd.DataFrame(values, columns=["aseg.a", "aseg.b", "aparc.c"])
+
+    # Test exact statistics of a small sample
+    summary = SampleSummary.from_table(df.iloc[:50])
+    for q in [25, 75]:
+        np.testing.assert_allclose(
+            summary.get_percentile(q), np.nanpercentile(values[:50], q, axis=0)
+        )
+
+    # Test merging of shards, including regions missing in a shard
+    shards = [df.iloc[i : i + 150] for i in range(0, 1000, 150)]
+    shards[0] = shards[0].drop(columns="aparc.c")
+    for i, shard in enumerate(shards):
+        SampleSummary.from_table(shard).save(str(tmp_path / f"{i}.npz"))
+    merged = SampleSummary.merged(
+        [SampleSummary.load(str(tmp_path / f"{i}.npz")) for i in range(len(shards))]
+    )
+    values[:150, 2] = np.nan
+    assert merged.n_subjects == 1000
+    np.testing.assert_allclose(merged.get_mean(), np.nanmean(values, axis=0))
+    np.testing.assert_allclose(merged.get_std(), np.nanstd(values, axis=0))
+    np.testing.assert_allclose(
+        merged.get_percentile(75), np.nanpercentile(values, 75, axis=0), atol=0.02
+    )
+    assert np.isnan(merged.get_mean(regions=["aseg.a", "unknown"])[1])
@@ -0,0 +1,99 @@
+"""Test _scheduler.py"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from .._scheduler import Task, run_task_graph
+
+
+def test_run_task_graph():
+    """Test requirements, failures, and the memory budget."""
+    lock = threading.Lock()
+    active = {"memory": 0, "peak": 0}
+    order = list()
+
+    def work(name, memory=0, fail=False):
+        def function():
+            with lock:
+                active["memory"] += memory
+                active["peak"] = max(active["peak"], active["memory"])
+            time.sleep(0.05)
+            with lock:
+                active["memory"] -= memory
+                order.append(name)
+            if fail:
+                raise OSError(name)
+            return name
+
+        return function
+
+    tasks = {
+        "a": Task(work("a", 3), memory=3),
+        "b": Task(work("b", 3), memory=3),
+        "c": Task(work("c", 2), memory=2),
+        "d": Task(work("d"), requires=("a", "b")),
+        "e": Task(work("e", fail=True)),
+        "f": Task(work("f"), requires=("e",)),
+    }
+    finished = list()
+    results, errors = run_task_graph(
+        tasks,
+        n_jobs=3,
+        max_memory=5,
+        callback=lambda name, result: finished.append((name, result)),
+    )
+    assert results == {name: name for name in "abcd"}
+    assert sorted(finished) == [(name, name) for name in "abcd"]
+    assert set(errors) == {"e", "f"}
+    assert isinstance(errors["e"], OSError)
+    assert isinstance(errors["f"], RuntimeError)
+    assert active["peak"] <= 5
+    assert order.index("d") > max(order.index("a"), order.index("b"))
+
+    # Test tasks that need the same exclusive resource
+    active["peak"] = 0
+    tasks = {
+        "a": Task(work("a", 1), exclusive="renderer"),
+        "b": Task(work("b", 1), exclusive="renderer"),
+        "c": Task(work("c", 1)),
+    }
+    order.clear()
+    results, errors = run_task_graph(tasks, n_jobs=3)
+    assert len(results) == 3 and not errors
+    assert active["peak"] == 2
+    assert order.index("b") == 2
+
+    # Test a task that exceeds the budget on its own
+    results, errors = run_task_graph({"a": Task(work("a"), memory=10)}, max_memory=5)
+    assert results == {"a": "a"} and not errors
+
+    # Test stopping after the first failure
+    tasks = {"e": Task(work("e", fail=True)), "a": Task(work("a"))}
+    results, errors = run_task_graph(tasks, stop_on_error=True)
+    assert not results and set(errors) == {"e"}
+
+    # Test not waiting for running tasks after the first failure
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.5)
+        finished.set()
+
+    tasks = {"e": Task(work("e", fail=True)), "s": Task(slow)}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results, errors = run_task_graph(
+            tasks, n_jobs=2, stop_on_error=True, executor=executor
+        )
+        assert not finished.is_set()
+        assert not results and set(errors) == {"e"}
+
+    # Test invalid graphs
+    with pytest.raises(ValueError, match="unknown"):
+        run_task_graph({"a": Task(work("a"), requires=("x",))})
+    with pytest.raises(ValueError, match="cyclic"):
+        run_task_graph(
+            {"a": Task(work("a"), requires=("b",)), "b": Task(work("b"), ("a",))}
+        )